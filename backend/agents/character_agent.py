@@ -14,16 +14,26 @@ Expected response:
 
 The agent also returns a list of new characters it discovered so the comic-level
 speaker registry can be updated consistently.
+
+Windowed mode (``ATTRIBUTION_MODE=windowed``) attributes a window of whole
+pages per request instead of one panel at a time.  Windows run in parallel,
+each with its own speaker ids, and ``merge_window_attributions``
+reconciles them afterwards, so there is no serial dependency on a growing
+speaker registry.
 """
 
 from __future__ import annotations
 
 import base64
 import json
+import mimetypes
+import re
+from collections import Counter
+from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
 from backend.config import settings
-from backend.models import Bubble, Panel, Speaker
+from backend.models import Bubble, Page, Panel, Speaker
 from backend.pipeline.openrouter_client import chat_completion, extract_json
 
 if TYPE_CHECKING:
@@ -89,7 +99,7 @@ async def attribute_speakers(
     tuple[list[Bubble], list[Speaker]]
         Updated bubbles list and any newly discovered Speaker objects.
     """
-    from backend.pipeline.gemini_files import upload_image
+    from backend.pipeline.gemini_files import generate_content, upload_image
 
     known_list = [
         {"speaker_id": s.speaker_id, "label": s.inferred_label}
@@ -110,15 +120,7 @@ async def attribute_speakers(
 
     if uri:
         # ── Gemini Files API path ──────────────────────────────────────────────
-        import google.generativeai as genai  # type: ignore
-
-        genai.configure(api_key=settings.google_ai_api_key)
-        model = genai.GenerativeModel(settings.vision_model)
-        file_ref = genai.get_file(uri)
-        response = model.generate_content(
-            [_SYSTEM_PROMPT, file_ref, json.dumps(user_payload)]
-        )
-        raw = response.text.strip()
+        raw = await generate_content(_SYSTEM_PROMPT, [uri], json.dumps(user_payload))
     else:
         # ── Base64 fallback (existing OpenRouter path) ─────────────────────────
         b64 = _encode_image(panel.image_path)
@@ -170,3 +172,253 @@ async def attribute_speakers(
         )
 
     return bubbles, new_speakers
+
+
+# ── Windowed (page-level) attribution ─────────────────────────────────────────
+
+_WINDOW_SYSTEM_PROMPT = """\
+You are a comic character recognition agent. You are given consecutive comic
+pages (one image per page, in order) and every speech/thought/narration bubble
+on them with its text, panel and position (page pixels). Assign each bubble to
+the character who is speaking or thinking it.
+
+Rules:
+- Use visual proximity (a tail pointing toward a character) and context to
+  attribute each bubble.
+- The same character must keep the same speaker_id across all the pages.
+- If a character matches one of the character_profiles, use that profile's
+  character_id as the speaker_id.
+- Use "narrator" as the speaker_id for narration boxes with no visual speaker.
+- Otherwise invent ids "char_1", "char_2", … and give each a human-readable
+  label (best-guess name or a descriptor like "tall man in hat").
+
+Respond ONLY with a JSON object:
+{
+  "attributions": [
+    {"bubble_id": "...", "speaker_id": "..."}
+  ],
+  "speakers": [
+    {"speaker_id": "...", "label": "...", "gender": "...", "age_group": "..."}
+  ]
+}
+No markdown, no explanation.
+"""
+
+
+@dataclass
+class WindowAttribution:
+    """Raw result of one window request; speaker ids are local to the window."""
+    attributions: dict[str, str]          # bubble_id → local speaker_id
+    speakers: list[Speaker]               # local speakers, in first-seen order
+
+
+def page_windows(pages: list[Page], size: int, overlap: int) -> list[list[Page]]:
+    """Split *pages* into windows of *size* pages sharing *overlap* pages."""
+    size = max(1, size)
+    step = max(1, size - max(0, overlap))
+    windows: list[list[Page]] = []
+    start = 0
+    while start < len(pages):
+        windows.append(pages[start:start + size])
+        if start + size >= len(pages):
+            break
+        start += step
+    return windows
+
+
+async def attribute_speakers_for_window(
+    pages: list[Page],
+    character_profiles: "list[CharacterProfile] | None" = None,
+) -> WindowAttribution:
+    """Attribute every bubble on *pages* with a single vision request."""
+    from backend.pipeline.gemini_files import generate_content, upload_image
+
+    bubble_list = [
+        {
+            "bubble_id": b.bubble_id,
+            "page": page.page_number,
+            "panel_id": panel.panel_id,
+            "type": b.bubble_type.value,
+            "text": b.text,
+            "bbox": {
+                "x": panel.bbox.x + b.bbox.x, "y": panel.bbox.y + b.bbox.y,
+                "w": b.bbox.w, "h": b.bbox.h,
+            },
+        }
+        for page in pages
+        for panel in page.panels
+        for b in panel.bubbles
+    ]
+    user_payload: dict = {
+        "pages": [p.page_number for p in pages],
+        "bubbles": bubble_list,
+    }
+    if character_profiles:
+        user_payload["character_profiles"] = [
+            cp.model_dump() for cp in character_profiles
+        ]
+
+    uris = [await upload_image(p.image_path) for p in pages]
+
+    if all(u is not None for u in uris):
+        # ── Gemini Files API path ──────────────────────────────────────────────
+        raw = await generate_content(
+            _WINDOW_SYSTEM_PROMPT, uris, json.dumps(user_payload)  # type: ignore[arg-type]
+        )
+    else:
+        # ── Base64 fallback (OpenRouter path) ──────────────────────────────────
+        content: list[dict] = []
+        for page in pages:
+            b64 = _encode_image(page.image_path)
+            mime = mimetypes.guess_type(page.image_path)[0] or "image/png"
+            content.append(
+                {"type": "image_url", "image_url": {"url": f"data:{mime};base64,{b64}"}}
+            )
+        content.append({"type": "text", "text": json.dumps(user_payload)})
+        messages = [
+            {"role": "system", "content": _WINDOW_SYSTEM_PROMPT},
+            {"role": "user", "content": content},
+        ]
+        result = await chat_completion(settings.vision_model, messages)
+        raw = result["choices"][0]["message"]["content"].strip()
+
+    data = extract_json(
+        raw, context=f"character_agent pages={pages[0].page_id}…{pages[-1].page_id}"
+    )
+    return WindowAttribution(
+        attributions={
+            a["bubble_id"]: a["speaker_id"] for a in data.get("attributions", [])
+        },
+        speakers=[
+            Speaker(
+                speaker_id=s["speaker_id"],
+                inferred_label=s.get("label", ""),
+                gender=s.get("gender", ""),
+                age_group=s.get("age_group", ""),
+            )
+            for s in data.get("speakers", [])
+        ],
+    )
+
+
+def _normalise_label(label: str) -> str:
+    words = re.sub(r"[^\w\s]", " ", label.lower()).split()
+    return " ".join(w for w in words if w not in ("the", "a", "an"))
+
+
+def merge_window_attributions(
+    windows: list[WindowAttribution],
+    character_profiles: "list[CharacterProfile] | None" = None,
+) -> tuple[dict[str, str], list[Speaker]]:
+    """
+    Reconcile window-local speaker ids into one comic-wide registry.
+
+    Deterministic: windows are merged in page order and each local speaker is
+    resolved by the first rule that applies —
+
+    1. bubbles on overlapping pages already attributed by an earlier window
+       link the local id to that global id (majority vote, ties by id);
+    2. ``"narrator"`` stays ``"narrator"``;
+    3. a story-bible ``character_id``, or a label equal to a profile name,
+       maps to that profile's ``character_id``;
+    4. a label equal (after normalisation) to an existing speaker's label
+       reuses that speaker;
+    5. otherwise a new ``char_N`` is allocated in order of first appearance.
+
+    Earlier windows win for bubbles attributed twice.  Returns
+    ``(bubble_id → speaker_id, speakers)``.
+    """
+    profiles = character_profiles or []
+    profile_ids = {p.character_id: p for p in profiles}
+    profile_names = {_normalise_label(p.name): p for p in profiles if p.name}
+
+    speakers: dict[str, Speaker] = {}        # global id → Speaker, insertion order
+    by_label: dict[str, str] = {}            # normalised label → global id
+    final: dict[str, str] = {}               # bubble_id → global id
+    next_char = 0
+
+    def _register(global_id: str, local: Speaker) -> None:
+        if global_id not in speakers:
+            speakers[global_id] = local.model_copy(update={"speaker_id": global_id})
+            label = _normalise_label(local.inferred_label)
+            if label:
+                by_label.setdefault(label, global_id)
+
+    for window in windows:
+        local_speakers = {s.speaker_id: s for s in window.speakers}
+        for local_id in window.attributions.values():
+            local_speakers.setdefault(local_id, Speaker(speaker_id=local_id))
+
+        local_map: dict[str, str] = {}
+
+        # 1. Overlap evidence
+        votes = Counter(
+            (local_id, final[bubble_id])
+            for bubble_id, local_id in window.attributions.items()
+            if bubble_id in final
+        )
+        for (local_id, global_id), _ in sorted(
+            votes.items(), key=lambda kv: (-kv[1], kv[0])
+        ):
+            local_map.setdefault(local_id, global_id)
+
+        # 2–5. Identity rules, in the window's first-seen order
+        for local_id, local in local_speakers.items():
+            if local_id in local_map:
+                continue
+            label = _normalise_label(local.inferred_label)
+            if local_id == "narrator":
+                global_id = "narrator"
+            elif local_id in profile_ids:
+                global_id = local_id
+            elif label and label in profile_names:
+                global_id = profile_names[label].character_id
+            elif label and label in by_label:
+                global_id = by_label[label]
+            else:
+                while f"char_{next_char}" in speakers or f"char_{next_char}" in profile_ids:
+                    next_char += 1
+                global_id = f"char_{next_char}"
+            local_map[local_id] = global_id
+            _register(global_id, local)
+
+        for bubble_id, local_id in window.attributions.items():
+            final.setdefault(bubble_id, local_map[local_id])
+
+    return final, list(speakers.values())
+
+
+async def attribute_speakers_windowed(
+    pages: list[Page],
+    character_profiles: "list[CharacterProfile] | None" = None,
+) -> list[Speaker]:
+    """
+    Attribute all bubbles on *pages* with parallel page-window requests.
+
+    Windows of ``settings.attribution_window_pages`` pages (sharing
+    ``settings.attribution_window_overlap`` pages with the previous window)
+    run concurrently, up to ``settings.attribution_window_concurrency`` at a
+    time; ``merge_window_attributions`` then reconciles their speaker ids.
+    Sets ``speaker_id`` on every bubble in place and returns the speakers.
+    """
+    from backend.pipeline.concurrency import gather_bounded
+
+    pages_with_bubbles = [
+        p for p in pages if any(panel.bubbles for panel in p.panels)
+    ]
+    windows = page_windows(
+        pages_with_bubbles,
+        settings.attribution_window_pages,
+        settings.attribution_window_overlap,
+    )
+    results = await gather_bounded(
+        (attribute_speakers_for_window(w, character_profiles) for w in windows),
+        settings.attribution_window_concurrency,
+    )
+    assignments, speakers = merge_window_attributions(results, character_profiles)
+
+    for page in pages:
+        for panel in page.panels:
+            for bubble in panel.bubbles:
+                bubble.speaker_id = assignments.get(bubble.bubble_id)
+    return speakers
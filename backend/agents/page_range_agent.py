@@ -9,6 +9,7 @@ from __future__ import annotations
 
 import base64
 import json
+import mimetypes
 
 from backend.config import settings
 from backend.models import CharacterProfile, StoryFragment
@@ -51,6 +52,16 @@ Rules:
 """
 
 
+def _parse_response(raw: str):
+    """Strip markdown fences and parse the model's JSON reply."""
+    raw = raw.strip()
+    if raw.startswith("```"):
+        raw = raw.split("```")[1]
+        if raw.startswith("json"):
+            raw = raw[4:]
+    return json.loads(raw)
+
+
 def _encode_image(image_path: str) -> str:
     with open(image_path, "rb") as f:
         return base64.b64encode(f.read()).decode()
@@ -82,7 +93,7 @@ async def analyse_page_range(
     StoryFragment
         Parsed and validated story fragment for this page range.
     """
-    from backend.pipeline.gemini_files import upload_image
+    from backend.pipeline.gemini_files import generate_content, upload_image
 
     known_characters_json = json.dumps(
         [cp.model_dump() for cp in known_characters], indent=2
@@ -100,22 +111,17 @@ async def analyse_page_range(
     use_files_api = all(u is not None for u in uris)
 
     if use_files_api:
-        import google.generativeai as genai  # type: ignore
-
-        genai.configure(api_key=settings.google_ai_api_key)
-        model = genai.GenerativeModel(settings.vision_model)
-        file_refs = [genai.get_file(u) for u in uris]  # type: ignore[arg-type]
-        response = model.generate_content([_SYSTEM_PROMPT, *file_refs, user_text])
-        raw = response.text.strip()
+        raw = await generate_content(_SYSTEM_PROMPT, uris, user_text)  # type: ignore[arg-type]
     else:
         # Base64 fallback
         content_parts: list[dict] = []
         for path in page_image_paths:
             b64 = _encode_image(path)
+            mime = mimetypes.guess_type(path)[0] or "image/png"
             content_parts.append(
                 {
                     "type": "image_url",
-                    "image_url": {"url": f"data:image/png;base64,{b64}"},
+                    "image_url": {"url": f"data:{mime};base64,{b64}"},
                 }
             )
         content_parts.append({"type": "text", "text": user_text})
@@ -124,16 +130,10 @@ async def analyse_page_range(
             {"role": "system", "content": _SYSTEM_PROMPT},
             {"role": "user", "content": content_parts},
         ]
-        result = await chat_completion(settings.vision_model, messages)
+        result = await chat_completion(settings.vision_model, messages, validate=_parse_response)
         raw = result["choices"][0]["message"]["content"].strip()
 
-    # Strip markdown fences
-    if raw.startswith("```"):
-        raw = raw.split("```")[1]
-        if raw.startswith("json"):
-            raw = raw[4:]
-
-    data = json.loads(raw)
+    data = _parse_response(raw)
     # Normalise page_range from list to tuple if necessary
     if isinstance(data.get("page_range"), list):
         data["page_range"] = tuple(data["page_range"])
@@ -58,6 +58,16 @@ No markdown, no explanation — raw JSON only.
 """
 
 
+def _parse_response(raw: str):
+    """Strip markdown fences and parse the model's JSON reply."""
+    raw = raw.strip()
+    if raw.startswith("```"):
+        raw = raw.split("```")[1]
+        if raw.startswith("json"):
+            raw = raw[4:]
+    return json.loads(raw)
+
+
 async def synthesise_story_bible(
     fragments: list[StoryFragment],
     comic_id: str,
@@ -95,15 +105,10 @@ async def synthesise_story_bible(
         {"role": "user", "content": user_text},
     ]
 
-    result = await chat_completion(settings.vision_model, messages)
+    result = await chat_completion(settings.vision_model, messages, validate=_parse_response)
     raw = result["choices"][0]["message"]["content"].strip()
 
-    if raw.startswith("```"):
-        raw = raw.split("```")[1]
-        if raw.startswith("json"):
-            raw = raw[4:]
-
-    data = json.loads(raw)
+    data = _parse_response(raw)
     data["comic_id"] = comic_id
     data["created_at"] = datetime.now(timezone.utc).isoformat()
 
@@ -25,7 +25,8 @@ from __future__ import annotations
 import json
 
 from backend.config import settings
-from backend.models import Bubble, Comic, Speaker
+from backend.models import Bubble, Comic, Page, Speaker
+from backend.pipeline.concurrency import gather_bounded
 from backend.pipeline.openrouter_client import chat_completion
 
 # ── Static voice assignment heuristic ────────────────────────────────────────
@@ -46,6 +47,16 @@ _VOICE_MAP: dict[tuple[str, str], str] = {
 _NARRATOR_VOICE = "sage"
 
 
+def _parse_response(raw: str):
+    """Strip markdown fences and parse the model's JSON reply."""
+    raw = raw.strip()
+    if raw.startswith("```"):
+        raw = raw.split("```")[1]
+        if raw.startswith("json"):
+            raw = raw[4:]
+    return json.loads(raw)
+
+
 def assign_voices(speakers: list[Speaker]) -> list[Speaker]:
     """
     Assign a TTS voice_id to each speaker using the static heuristic.
@@ -79,9 +90,59 @@ No markdown, no explanation.
 """
 
 
+# Rough size of a request: ~4 characters per token for JSON-ish English text
+_CHARS_PER_TOKEN = 4
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // _CHARS_PER_TOKEN + 1
+
+
+def pack_by_token_budget(items: list[dict], budget: int) -> list[list[dict]]:
+    """
+    Greedily pack *items* (in order) into batches of at most *budget* tokens.
+
+    The system prompt counts against every batch.  An item too large for an
+    empty batch is sent on its own.
+    """
+    available = max(1, budget - _estimate_tokens(_EMOTION_SYSTEM_PROMPT))
+    batches: list[list[dict]] = []
+    current: list[dict] = []
+    used = 0
+    for item in items:
+        cost = _estimate_tokens(json.dumps(item))
+        if current and used + cost > available:
+            batches.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def _tag_emotion_batch(bubble_list: list[dict]) -> dict[str, str]:
+    """One emotion request; returns ``bubble_id → emotion``."""
+    messages = [
+        {"role": "system", "content": _EMOTION_SYSTEM_PROMPT},
+        {"role": "user", "content": json.dumps(bubble_list)},
+    ]
+
+    result = await chat_completion(settings.vision_model, messages, validate=_parse_response)
+    raw = result["choices"][0]["message"]["content"].strip()
+
+    emotion_data: list[dict] = _parse_response(raw)
+    return {e["bubble_id"]: e["emotion"] for e in emotion_data}
+
+
 async def tag_emotions(bubbles: list[Bubble], speakers: list[Speaker]) -> list[Bubble]:
     """
     Tag each bubble with an emotion using Gemini.
+
+    Bubbles may come from any number of panels.  They are packed into
+    requests of up to ``settings.emotion_batch_token_budget`` tokens, sent
+    concurrently (``settings.emotion_batch_concurrency`` at a time), and the
+    results are merged back by ``bubble_id``.
     """
     speaker_map = {s.speaker_id: s.inferred_label for s in speakers}
     bubble_list = [
@@ -97,21 +158,13 @@ async def tag_emotions(bubbles: list[Bubble], speakers: list[Speaker]) -> list[B
     if not bubble_list:
         return bubbles
 
-    messages = [
-        {"role": "system", "content": _EMOTION_SYSTEM_PROMPT},
-        {"role": "user", "content": json.dumps(bubble_list)},
-    ]
-
-    result = await chat_completion(settings.vision_model, messages)
-    raw = result["choices"][0]["message"]["content"].strip()
-
-    if raw.startswith("```"):
-        raw = raw.split("```")[1]
-        if raw.startswith("json"):
-            raw = raw[4:]
-
-    emotion_data: list[dict] = json.loads(raw)
-    emotion_map = {e["bubble_id"]: e["emotion"] for e in emotion_data}
+    batches = pack_by_token_budget(bubble_list, settings.emotion_batch_token_budget)
+    emotion_map: dict[str, str] = {}
+    for batch_result in await gather_bounded(
+        (_tag_emotion_batch(batch) for batch in batches),
+        settings.emotion_batch_concurrency,
+    ):
+        emotion_map.update(batch_result)
 
     for bubble in bubbles:
         if bubble.bubble_id in emotion_map:
@@ -120,16 +173,37 @@ async def tag_emotions(bubbles: list[Bubble], speakers: list[Speaker]) -> list[B
     return bubbles
 
 
+async def run_voice_tone_agent_for_page(page: Page, speakers: list[Speaker]) -> Page:
+    """
+    Voice/tone pass over a single page.
+
+    Used by the page-streaming orchestrator: *speakers* is the registry built
+    so far, which already contains every speaker attributed on this page.
+    Voice assignment is a pure heuristic, so re-running it as the registry
+    grows is cheap and gives the same voice_id for an existing speaker.
+    Bubbles from all panels on the page are tagged together, so a typical
+    page costs one emotion request rather than one per panel.
+    """
+    assign_voices(speakers)
+
+    await tag_emotions(
+        [b for panel in page.panels for b in panel.bubbles], speakers
+    )
+
+    return page
+
+
 async def run_voice_tone_agent(comic: Comic) -> Comic:
     """
     Full voice/tone pass over the comic:
     1. Assign TTS voices to all speakers.
-    2. Tag emotions on all bubbles.
+    2. Tag emotions on all bubbles, packed comic-wide into token-budget batches.
     """
     comic.speakers = assign_voices(comic.speakers)
 
-    for page in comic.pages:
-        for panel in page.panels:
-            panel.bubbles = await tag_emotions(panel.bubbles, comic.speakers)
+    await tag_emotions(
+        [b for page in comic.pages for panel in page.panels for b in panel.bubbles],
+        comic.speakers,
+    )
 
     return comic
@@ -10,6 +10,7 @@ POST   /comics/{comic_id}/reprocess Force a fresh pipeline run
 GET    /comics/{comic_id}/story-bible  Story bible built by Track B (if available)
 GET    /play/{token}                Resolve token → redirect to manifest URL
 GET    /api/health                  Liveness probe
+GET    /api/metrics                 Cache / retry / governor stats for this worker
 POST   /api/reload-config           Hot-reload .env without restart
 """
 
@@ -17,39 +18,29 @@ from __future__ import annotations
 
 import asyncio
 import json
-import tempfile
 from pathlib import Path
+from typing import AsyncIterator
 
-from fastapi import APIRouter, BackgroundTasks, HTTPException, UploadFile
+from fastapi import APIRouter, HTTPException, Query, UploadFile
 from fastapi.responses import JSONResponse, RedirectResponse
 
-from backend.cache import store
+from backend.cache import jobs, store
 from backend.config import settings, reload_settings
-from backend.models import CacheRecord, Comic, ProcessingStage
-from backend.orchestrator import run_pipeline
+from backend.models import Comic, ProcessingStage
 
 router = APIRouter()
 
-# ── Background task registry ──────────────────────────────────────────────────
-# Maps comic_id → asyncio.Task so we can check if processing is running.
-_running: dict[str, asyncio.Task] = {}
+# Read uploads in chunks of this size so peak memory per upload stays constant
+_UPLOAD_CHUNK_BYTES = 1024 * 1024
 
+# Upload priorities are client-supplied, so keep them to a small range: one
+# client cannot jump every queued job with an arbitrarily large value
+_MAX_UPLOAD_PRIORITY = 10
 
-async def _process_in_background(
-    pdf_path: str,
-    comic_id: str,
-    record: CacheRecord,
-    normalization_enabled: bool,
-    title: str,
-    page_range: tuple[int, int] | None,
-) -> None:
-    try:
-        await run_pipeline(
-            pdf_path, comic_id, record, normalization_enabled, title,
-            page_range=page_range,
-        )
-    finally:
-        _running.pop(comic_id, None)
+
+async def _iter_upload(file: UploadFile) -> AsyncIterator[bytes]:
+    while chunk := await file.read(_UPLOAD_CHUNK_BYTES):
+        yield chunk
 
 
 # ── Endpoints ─────────────────────────────────────────────────────────────────
@@ -60,23 +51,20 @@ async def pdf_info(file: UploadFile):
     Return the page count of an uploaded PDF without starting any processing.
 
     Used by the frontend page-range picker to populate the min/max bounds.
-    The file is read into memory and immediately discarded — nothing is stored.
+    The file is streamed to a spool file and deleted straight away — nothing
+    is kept.
     """
-    import tempfile as _tmp
     from backend.pipeline.pdf_to_images import pdfinfo_from_path
 
-    pdf_bytes = await file.read()
-    with _tmp.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
-        tmp.write(pdf_bytes)
-        tmp_path = tmp.name
+    tmp_path, _ = await store.spool_pdf(_iter_upload(file))
 
     try:
-        info = pdfinfo_from_path(tmp_path)
+        info = pdfinfo_from_path(str(tmp_path))
         page_count = int(info.get("Pages", 1))
     except Exception as exc:
         raise HTTPException(status_code=422, detail=f"Could not read PDF: {exc}") from exc
     finally:
-        Path(tmp_path).unlink(missing_ok=True)
+        tmp_path.unlink(missing_ok=True)
 
     return {"page_count": page_count, "filename": file.filename}
 
@@ -84,15 +72,20 @@ async def pdf_info(file: UploadFile):
 @router.post("/comics", status_code=202)
 async def upload_comic(
     file: UploadFile,
-    background_tasks: BackgroundTasks,
     normalization: bool = False,
     force_reprocess: bool = False,
     page_start: int = 1,
     page_end: int | None = None,
+    priority: int = Query(0, ge=0, le=_MAX_UPLOAD_PRIORITY),
 ):
     """
     Upload a PDF comic. Returns immediately with comic_id and processing status.
 
+    Processing is queued in the persistent job queue and picked up by a
+    worker when a slot is free (see ``backend.worker``); ``priority`` (0–10)
+    moves the job ahead of lower-priority uploads; values outside that range
+    are rejected with 422.
+
     If the same PDF was processed before and force_reprocess is False, the
     existing comic_id is returned and processing is skipped.
 
@@ -100,13 +93,14 @@ async def upload_comic(
     only a sub-range of pages.  When only ``page_start`` is given the full
     document from that page onwards is processed.
     """
-    pdf_bytes = await file.read()
-    pdf_hash = store.hash_pdf(pdf_bytes)
+    # Stream to disk while hashing — the PDF is never held in memory whole
+    spool_path, pdf_hash = await store.spool_pdf(_iter_upload(file))
 
     existing_id = store.lookup_by_hash(pdf_hash)
     if existing_id and not force_reprocess:
         record = store.load_record(existing_id)
         if record and record.processing_stage == ProcessingStage.done:
+            spool_path.unlink(missing_ok=True)
             return {
                 "comic_id": existing_id,
                 "stage": record.processing_stage,
@@ -123,26 +117,26 @@ async def upload_comic(
         # (pdf_to_images will cap at the actual last page)
         page_range = (page_start, 999_999)
 
-    # Save PDF to a temp file that persists long enough for background processing
-    tmp_dir = Path(tempfile.mkdtemp())
-    pdf_path = str(tmp_dir / (file.filename or "comic.pdf"))
-    Path(pdf_path).write_bytes(pdf_bytes)
-
-    record = store.create_record(pdf_hash, title=file.filename or "")
-    record.page_range = page_range
-    store.save_record(record)
-
-    task = asyncio.create_task(
-        _process_in_background(
-            pdf_path,
-            record.comic_id,
-            record,
-            normalization,
-            title=file.filename or "",
-            page_range=page_range,
-        )
+    try:
+        record = store.create_record(pdf_hash, title=file.filename or "")
+        record.page_range = page_range
+        store.save_record(record)
+
+        # Move the spooled upload into the comic folder (a rename, not a copy)
+        pdf_path = str(store.adopt_source_pdf(spool_path, record.comic_id))
+    except BaseException:
+        spool_path.unlink(missing_ok=True)
+        raise
+
+    await asyncio.to_thread(
+        jobs.enqueue,
+        record.comic_id,
+        pdf_path,
+        title=file.filename or "",
+        normalization_enabled=normalization,
+        page_range=page_range,
+        priority=priority,
     )
-    _running[record.comic_id] = task
 
     return {
         "comic_id": record.comic_id,
@@ -161,6 +155,11 @@ async def get_status(comic_id: str):
         "stage": record.processing_stage,
         "progress_pct": record.progress_pct,
         "error": record.error_message,
+        "queue_position": (
+            await asyncio.to_thread(jobs.queue_position, comic_id)
+            if record.processing_stage == ProcessingStage.queued
+            else None
+        ),
     }
 
 
@@ -198,7 +197,7 @@ async def reprocess_comic(comic_id: str, normalization: bool = False):
     record = store.load_record(comic_id)
     if not record:
         raise HTTPException(status_code=404, detail="Comic not found")
-    if comic_id in _running:
+    if await asyncio.to_thread(jobs.is_active, comic_id):
         raise HTTPException(status_code=409, detail="Processing already in progress")
 
     # We need the original PDF — look it up in the temp dir or return an error
@@ -238,6 +237,41 @@ async def health_check():
     return {"ok": True}
 
 
+@router.get("/api/metrics")
+async def metrics():
+    """
+    Return cache, retry, governor, render-pool and panel-detection statistics.
+
+    ``sfx_cache.per_comic`` holds the SFX prompt-cache hit rate of the most
+    recent comics this worker processed.
+
+    Cache sizes are shared by every worker; hit/miss and retry counters and
+    governor and render pool state are per process, so with several uvicorn workers each
+    reports its own traffic.
+    """
+    from backend.pipeline import governor, openrouter_client, retry
+    from backend.pipeline.normalizer import fill_cache_stats
+    from backend.pipeline.panel_detection import panel_detection_stats
+    from backend.pipeline.render_pool import get_render_pool
+    from backend.pipeline.sfx_client import sfx_client
+    from backend.pipeline.sfx_generation import sfx_cache_stats
+    from backend.pipeline.transcode import transcode_stats
+    from backend.pipeline.tts_generation import tts_cache_stats
+
+    return {
+        "llm_cache": openrouter_client.cache_stats(),
+        "retries": retry.retry_stats(),
+        "governor": governor.governor_stats(),
+        "render_pool": get_render_pool().stats(),
+        "panel_detection": panel_detection_stats(),
+        "tts_cache": tts_cache_stats(),
+        "sfx_cache": sfx_cache_stats(),
+        "sfx_client": sfx_client.stats(),
+        "sfx_transcode": transcode_stats(),
+        "fill_cache": fill_cache_stats(),
+    }
+
+
 @router.post("/api/reload-config")
 async def reload_config():
     """
@@ -0,0 +1,229 @@
+"""
+Content-addressed blob cache.
+
+A ``BlobCache`` stores opaque blobs (model responses, audio clips, images)
+under a caller-supplied content key — normally a SHA-256 digest of whatever
+inputs fully determine the blob.  Identical inputs therefore map to a single
+stored file no matter which comic asked for it.
+
+Layout on disk:
+  storage/cache/{name}/
+    index.db                 ← key → size, last access (for LRU eviction)
+    {key[:2]}/{key}{suffix}  ← blob files, sharded by key prefix
+
+Callers that need the blob at a path of their own (e.g. per-comic audio
+folders) use ``link_from`` / ``link_to``, which hardlink instead of copying;
+a linked file outlives the eviction of its cache entry.
+
+The total size is bounded: after every insert the least recently used blobs
+are evicted until the cache is back under ``max_bytes``.  Hit and miss
+counters are kept per process and reported by ``stats()``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+try:
+    from python_ulid import ULID  # type: ignore[import]
+except ModuleNotFoundError:
+    from ulid import ULID  # python-ulid >= 3.x uses the 'ulid' package name
+
+from backend.cache.db import connect
+from backend.config import settings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    key          TEXT PRIMARY KEY,
+    size         INTEGER NOT NULL,
+    last_access  REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS blobs_by_access ON blobs (last_access);
+"""
+
+
+def content_key(*parts: Any) -> str:
+    """
+    Return a stable SHA-256 hex digest for JSON-serialisable *parts*.
+
+    Dict keys are sorted so logically equal inputs give the same key.
+    """
+    encoded = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def file_digest(path: Path) -> str:
+    """Return the SHA-256 hex digest of the file at *path*, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _materialise(src: Path, dest: Path) -> None:
+    """Hardlink *src* to *dest* (copy across devices), replacing *dest* atomically."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dest.with_name(f".{dest.name}.{ULID()}.tmp")
+    try:
+        os.link(src, tmp)
+    except FileNotFoundError:
+        raise
+    except OSError:
+        shutil.copyfile(src, tmp)
+    tmp.replace(dest)
+
+
+class BlobCache:
+    """Size-bounded, content-addressed file cache with LRU eviction."""
+
+    def __init__(
+        self,
+        name: str,
+        max_bytes: Callable[[], int],
+        suffix: str = "",
+    ) -> None:
+        # max_bytes is read on every insert so settings hot-reload applies
+        self.name = name
+        self.suffix = suffix
+        self._max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    # ── Paths ─────────────────────────────────────────────────────────────────
+
+    @property
+    def root(self) -> Path:
+        return Path(settings.storage_root) / "cache" / self.name
+
+    def _index(self):
+        return connect(self.root / "index.db", _SCHEMA)
+
+    def path_for(self, key: str) -> Path:
+        """Return where the blob for *key* lives (whether or not it exists)."""
+        return self.root / key[:2] / f"{key}{self.suffix}"
+
+    # ── Lookup ────────────────────────────────────────────────────────────────
+
+    def get_path(self, key: str) -> Optional[Path]:
+        """Return the blob path for *key* and mark it recently used, or None."""
+        path = self.path_for(key)
+        with self._index() as conn:
+            cur = conn.execute(
+                "UPDATE blobs SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            found = cur.rowcount == 1 and path.exists()
+            if cur.rowcount == 1 and not found:
+                # Index row without a file (e.g. deleted by hand) — drop it
+                conn.execute("DELETE FROM blobs WHERE key = ?", (key,))
+        if found:
+            self.hits += 1
+            return path
+        self.misses += 1
+        return None
+
+    def link_to(self, key: str, dest: Path) -> Optional[Path]:
+        """
+        Materialise the blob for *key* at *dest* and return *dest*, or None.
+
+        *dest* is a hardlink to the cached blob (a copy across filesystems),
+        so it survives eviction of the cache entry.  An existing *dest* is
+        replaced atomically.
+        """
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            _materialise(path, dest)
+        except FileNotFoundError:
+            # Evicted between lookup and link
+            return None
+        return dest
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """Return the blob for *key*, or None on a miss."""
+        path = self.get_path(key)
+        return path.read_bytes() if path is not None else None
+
+    # ── Insert ────────────────────────────────────────────────────────────────
+
+    def put_bytes(self, key: str, data: bytes) -> Path:
+        """Store *data* under *key* and return its path."""
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{ULID()}.tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)  # atomic: readers never see a partial blob
+        self._register(key, len(data))
+        return path
+
+    def put_file(self, key: str, src: Path) -> Path:
+        """Move the file at *src* into the cache under *key* and return its path."""
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        size = src.stat().st_size
+        os.replace(src, path)
+        self._register(key, size)
+        return path
+
+    def link_from(self, key: str, src: Path) -> Path:
+        """Add the file at *src* under *key* by hardlink, keeping *src* in place."""
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        _materialise(src, path)
+        self._register(key, path.stat().st_size)
+        return path
+
+    def discard(self, key: str) -> None:
+        """Remove the blob for *key*, if any."""
+        with self._index() as conn:
+            conn.execute("DELETE FROM blobs WHERE key = ?", (key,))
+        self.path_for(key).unlink(missing_ok=True)
+
+    def _register(self, key: str, size: int) -> None:
+        with self._index() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO blobs (key, size, last_access) VALUES (?, ?, ?)",
+                (key, size, time.time()),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Delete least recently used blobs until the cache fits ``max_bytes``."""
+        (total,) = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()
+        limit = self._max_bytes()
+        if total <= limit:
+            return
+        for row in conn.execute(
+            "SELECT key, size FROM blobs ORDER BY last_access"
+        ).fetchall():
+            if total <= limit:
+                break
+            self.path_for(row["key"]).unlink(missing_ok=True)
+            conn.execute("DELETE FROM blobs WHERE key = ?", (row["key"],))
+            total -= row["size"]
+
+    # ── Stats ─────────────────────────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        """Return entry count, size on disk, and this process's hit/miss counts."""
+        with self._index() as conn:
+            entries, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self._max_bytes(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,54 @@
+"""
+SQLite connection helper for the storage-volume databases.
+
+Every database lives on the storage volume next to the comic folders so it is
+shared by all uvicorn workers (``start.sh --prod`` runs four).  Connections
+use WAL journaling so readers never block the single writer, and a busy
+timeout so concurrent writers from other processes wait instead of failing.
+
+Connections are short-lived (one per operation): SQLite opens are cheap and
+this keeps the helpers safe to call from any thread or process.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+_BUSY_TIMEOUT_SEC = 30.0
+
+# Database paths whose schema has already been applied in this process
+_initialised: set[str] = set()
+_init_lock = threading.Lock()
+
+
+@contextmanager
+def connect(db_path: Path, schema: str) -> Iterator[sqlite3.Connection]:
+    """
+    Open *db_path*, apply *schema* once per process, and yield a connection.
+
+    The transaction is committed when the block exits normally and rolled
+    back if it raises.  Rows are returned as ``sqlite3.Row`` (dict-like).
+    """
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=_BUSY_TIMEOUT_SEC)
+    conn.row_factory = sqlite3.Row
+    try:
+        key = str(db_path.resolve())
+        if key not in _initialised:
+            with _init_lock:
+                if key not in _initialised:
+                    conn.execute("PRAGMA journal_mode=WAL")
+                    conn.executescript(schema)
+                    _initialised.add(key)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
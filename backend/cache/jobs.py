@@ -0,0 +1,258 @@
+"""
+Persistent job queue.
+
+Pipeline runs are queued in a SQLite database on the storage volume
+(``storage/jobs.db``) instead of being spawned as in-process tasks, so:
+
+- every uvicorn worker sees the same queue (``start.sh --prod`` runs four);
+- queued and interrupted jobs survive a restart;
+- at most ``settings.job_max_concurrent`` pipelines run at once across all
+  processes — upload bursts wait in the queue instead of all hitting
+  OpenRouter together.
+
+Leases
+------
+A worker that claims a job holds a lease until ``lease_expires`` and must
+renew it while the pipeline runs.  If the worker dies the lease lapses and
+the job becomes claimable again; after ``settings.job_max_attempts`` claims
+it is marked failed instead.
+
+Jobs are claimed by priority (higher first), then in submission order.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from pathlib import Path
+
+from backend.cache import store
+from backend.cache.db import connect
+from backend.config import settings
+from backend.models import Job, JobStatus, ProcessingStage
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    comic_id        TEXT    NOT NULL,
+    payload         TEXT    NOT NULL,
+    priority        INTEGER NOT NULL DEFAULT 0,
+    status          TEXT    NOT NULL,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    lease_owner     TEXT,
+    lease_expires   REAL    NOT NULL DEFAULT 0,
+    error_message   TEXT,
+    created_at      REAL    NOT NULL,
+    updated_at      REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status
+    ON jobs (status, priority DESC, job_id);
+CREATE INDEX IF NOT EXISTS jobs_by_comic
+    ON jobs (comic_id, status);
+"""
+
+_LEASE_EXHAUSTED = "Processing was interrupted too many times (worker lease expired)"
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+def _db_path() -> Path:
+    return Path(settings.storage_root) / "jobs.db"
+
+
+def _row_to_job(row: sqlite3.Row) -> Job:
+    payload = json.loads(row["payload"])
+    return Job(
+        job_id=row["job_id"],
+        comic_id=row["comic_id"],
+        priority=row["priority"],
+        status=JobStatus(row["status"]),
+        attempts=row["attempts"],
+        lease_owner=row["lease_owner"],
+        lease_expires=row["lease_expires"],
+        error_message=row["error_message"],
+        **payload,
+    )
+
+
+def _reap_expired(conn: sqlite3.Connection, now: float) -> None:
+    """Requeue (or fail) running jobs whose worker stopped renewing the lease."""
+    exhausted = conn.execute(
+        "SELECT job_id, comic_id FROM jobs"
+        " WHERE status = ? AND lease_expires <= ? AND attempts >= ?",
+        (JobStatus.running.value, now, settings.job_max_attempts),
+    ).fetchall()
+    for row in exhausted:
+        conn.execute(
+            "UPDATE jobs SET status = ?, lease_owner = NULL, error_message = ?,"
+            " updated_at = ? WHERE job_id = ?",
+            (JobStatus.failed.value, _LEASE_EXHAUSTED, now, row["job_id"]),
+        )
+        record = store.load_record(row["comic_id"])
+        if record is not None:
+            store.update_stage(
+                record, ProcessingStage.failed, record.progress_pct, _LEASE_EXHAUSTED
+            )
+    conn.execute(
+        "UPDATE jobs SET status = ?, lease_owner = NULL, updated_at = ?"
+        " WHERE status = ? AND lease_expires <= ?",
+        (JobStatus.queued.value, now, JobStatus.running.value, now),
+    )
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+
+def enqueue(
+    comic_id: str,
+    pdf_path: str,
+    title: str = "",
+    normalization_enabled: bool = False,
+    page_range: tuple[int, int] | None = None,
+    priority: int = 0,
+) -> Job:
+    """Add a pipeline run to the queue and return the queued job."""
+    payload = {
+        "pdf_path": pdf_path,
+        "title": title,
+        "normalization_enabled": normalization_enabled,
+        "page_range": list(page_range) if page_range else None,
+    }
+    now = time.time()
+    with connect(_db_path(), _SCHEMA) as conn:
+        cur = conn.execute(
+            "INSERT INTO jobs (comic_id, payload, priority, status, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (comic_id, json.dumps(payload), priority, JobStatus.queued.value, now, now),
+        )
+        row = conn.execute(
+            "SELECT * FROM jobs WHERE job_id = ?", (cur.lastrowid,)
+        ).fetchone()
+    return _row_to_job(row)
+
+
+def claim(worker_id: str) -> Job | None:
+    """
+    Lease the next runnable job for *worker_id*, or return None.
+
+    Returns None when the queue is empty or ``settings.job_max_concurrent``
+    jobs already hold live leases.  The check and the claim happen in one
+    write transaction, so the limit holds across processes.
+    """
+    now = time.time()
+    with connect(_db_path(), _SCHEMA) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        _reap_expired(conn, now)
+
+        (running,) = conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = ?", (JobStatus.running.value,)
+        ).fetchone()
+        if running >= settings.job_max_concurrent:
+            return None
+
+        row = conn.execute(
+            "SELECT job_id FROM jobs WHERE status = ?"
+            " ORDER BY priority DESC, job_id LIMIT 1",
+            (JobStatus.queued.value,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        conn.execute(
+            "UPDATE jobs SET status = ?, attempts = attempts + 1, lease_owner = ?,"
+            " lease_expires = ?, updated_at = ? WHERE job_id = ?",
+            (JobStatus.running.value, worker_id, now + settings.job_lease_seconds,
+             now, row["job_id"]),
+        )
+        claimed = conn.execute(
+            "SELECT * FROM jobs WHERE job_id = ?", (row["job_id"],)
+        ).fetchone()
+    return _row_to_job(claimed)
+
+
+def renew(job_id: int, worker_id: str) -> bool:
+    """Extend the lease on a running job.  Returns False if the lease was lost."""
+    now = time.time()
+    with connect(_db_path(), _SCHEMA) as conn:
+        cur = conn.execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ?"
+            " WHERE job_id = ? AND lease_owner = ? AND status = ?",
+            (now + settings.job_lease_seconds, now, job_id, worker_id,
+             JobStatus.running.value),
+        )
+    return cur.rowcount == 1
+
+
+def complete(job_id: int, worker_id: str) -> None:
+    """Mark a job as successfully finished."""
+    _finish(job_id, worker_id, JobStatus.done, None)
+
+
+def fail(job_id: int, worker_id: str, error: str) -> None:
+    """Mark a job as failed with *error*."""
+    _finish(job_id, worker_id, JobStatus.failed, error)
+
+
+def release(job_id: int, worker_id: str) -> None:
+    """
+    Hand a running job back to the queue without counting the attempt.
+
+    Used on graceful shutdown so another worker picks the job up immediately.
+    """
+    now = time.time()
+    with connect(_db_path(), _SCHEMA) as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0),"
+            " lease_owner = NULL, lease_expires = 0, updated_at = ?"
+            " WHERE job_id = ? AND lease_owner = ?",
+            (JobStatus.queued.value, now, job_id, worker_id),
+        )
+
+
+def _finish(job_id: int, worker_id: str, status: JobStatus, error: str | None) -> None:
+    now = time.time()
+    with connect(_db_path(), _SCHEMA) as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, error_message = ?, lease_owner = NULL,"
+            " updated_at = ? WHERE job_id = ? AND lease_owner = ?",
+            (status.value, error, now, job_id, worker_id),
+        )
+
+
+def is_active(comic_id: str) -> bool:
+    """Return True if *comic_id* has a queued or running job."""
+    with connect(_db_path(), _SCHEMA) as conn:
+        row = conn.execute(
+            "SELECT 1 FROM jobs WHERE comic_id = ? AND status IN (?, ?) LIMIT 1",
+            (comic_id, JobStatus.queued.value, JobStatus.running.value),
+        ).fetchone()
+    return row is not None
+
+
+def queue_position(comic_id: str) -> int | None:
+    """
+    Return how many queued jobs will be claimed before *comic_id*'s job.
+
+    Returns None if the comic has no queued job.
+    """
+    with connect(_db_path(), _SCHEMA) as conn:
+        row = conn.execute(
+            "SELECT job_id, priority FROM jobs WHERE comic_id = ? AND status = ?"
+            " ORDER BY job_id DESC LIMIT 1",
+            (comic_id, JobStatus.queued.value),
+        ).fetchone()
+        if row is None:
+            return None
+        (ahead,) = conn.execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = ?"
+            " AND (priority > ? OR (priority = ? AND job_id < ?))",
+            (JobStatus.queued.value, row["priority"], row["priority"], row["job_id"]),
+        ).fetchone()
+    return ahead
+
+
+def get_job(job_id: int) -> Job | None:
+    """Load a job by id, or None if not found."""
+    with connect(_db_path(), _SCHEMA) as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    return _row_to_job(row) if row else None
@@ -9,8 +9,11 @@ Responsibilities:
 
 Layout on disk:
   storage/
-    index.json                       ← maps pdf_hash → comic_id
+    index.db                         ← SQLite index: pdf_hash / token → comic_id
+    jobs.db                          ← persistent job queue (see jobs.py)
+    uploads/                         ← in-flight upload spool files
     {comic_id}/
+      source.pdf                     ← the uploaded PDF
       cache_record.json              ← CacheRecord for this comic
       manifest.json                  ← Comic (full data model)
       pages/                         ← rendered page PNGs
@@ -19,24 +22,60 @@ Layout on disk:
       audio/
         voice/                       ← per-bubble MP3s
         sfx/                         ← per-panel SFX MP3s
+
+The cache_record.json files stay the source of truth for a comic's full
+record; index.db holds just enough (hash, token, stage, timestamps) to
+resolve lookups with an index seek instead of scanning every record.  Older
+installs that used storage/index.json are migrated automatically, once, the
+first time the index is opened.
 """
 
 from __future__ import annotations
 
+import asyncio
 import hashlib
-import json
+import sqlite3
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import AsyncIterator, Iterator
 
 try:
     from python_ulid import ULID  # type: ignore[import]
 except ModuleNotFoundError:
     from ulid import ULID  # python-ulid >= 3.x uses the 'ulid' package name
 
+from backend.cache.db import connect
 from backend.config import settings
 from backend.models import CacheRecord, Comic, ProcessingStage
 
-_INDEX_FILE = Path(settings.storage_root) / "index.json"
+_INDEX_DB = Path(settings.storage_root) / "index.db"
+_LEGACY_INDEX_FILE = Path(settings.storage_root) / "index.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS comics (
+    comic_id          TEXT PRIMARY KEY,
+    pdf_hash          TEXT NOT NULL,
+    playback_token    TEXT NOT NULL UNIQUE,
+    processing_stage  TEXT NOT NULL,
+    created_at        TEXT NOT NULL,
+    updated_at        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS comics_by_hash ON comics (pdf_hash, comic_id);
+"""
+
+_UPSERT = """
+INSERT INTO comics
+    (comic_id, pdf_hash, playback_token, processing_stage, created_at, updated_at)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (comic_id) DO UPDATE SET
+    playback_token   = excluded.playback_token,
+    processing_stage = excluded.processing_stage,
+    updated_at       = excluded.updated_at
+"""
+
+# Index paths already checked for a legacy index.json in this process
+_migration_checked: set[str] = set()
 
 
 # ── Helpers ───────────────────────────────────────────────────────────────────
@@ -45,16 +84,27 @@ def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def _load_index() -> dict[str, str]:
-    """Load the pdf_hash → comic_id index from disk."""
-    if _INDEX_FILE.exists():
-        return json.loads(_INDEX_FILE.read_text())
-    return {}
-
-
-def _save_index(index: dict[str, str]) -> None:
-    _INDEX_FILE.parent.mkdir(parents=True, exist_ok=True)
-    _INDEX_FILE.write_text(json.dumps(index, indent=2))
+@contextmanager
+def _index() -> Iterator[sqlite3.Connection]:
+    """Open the SQLite index, migrating a legacy index.json on first use."""
+    key = str(_INDEX_DB)
+    if key not in _migration_checked:
+        _migration_checked.add(key)
+        if _LEGACY_INDEX_FILE.exists():
+            migrate_json_index()
+    with connect(_INDEX_DB, _SCHEMA) as conn:
+        yield conn
+
+
+def _index_row(record: CacheRecord) -> tuple:
+    return (
+        record.comic_id,
+        record.pdf_hash,
+        record.playback_token,
+        record.processing_stage.value,
+        record.created_at,
+        record.updated_at,
+    )
 
 
 def _comic_dir(comic_id: str) -> Path:
@@ -69,6 +119,10 @@ def _manifest_path(comic_id: str) -> Path:
     return _comic_dir(comic_id) / "manifest.json"
 
 
+def _upload_dir() -> Path:
+    return Path(settings.storage_root) / "uploads"
+
+
 # ── Public API ────────────────────────────────────────────────────────────────
 
 def hash_pdf(pdf_bytes: bytes) -> str:
@@ -76,9 +130,51 @@ def hash_pdf(pdf_bytes: bytes) -> str:
     return hashlib.sha256(pdf_bytes).hexdigest()
 
 
+async def spool_pdf(chunks: AsyncIterator[bytes]) -> tuple[Path, str]:
+    """
+    Stream an uploaded PDF to a spool file while hashing it incrementally.
+
+    Peak memory is one chunk regardless of the PDF size.  The spool file
+    lives on the storage volume so ``adopt_source_pdf`` can move it into the
+    comic folder with a rename instead of a copy.
+
+    Returns ``(spool_path, sha256_hex)``.  The caller owns the spool file and
+    must either adopt it or delete it.
+    """
+    spool_dir = _upload_dir()
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    spool_path = spool_dir / f"{ULID()}.pdf.part"
+    digest = hashlib.sha256()
+    try:
+        with open(spool_path, "wb") as out:
+            async for chunk in chunks:
+                digest.update(chunk)
+                # Keep disk writes off the event loop
+                await asyncio.to_thread(out.write, chunk)
+    except BaseException:
+        spool_path.unlink(missing_ok=True)
+        raise
+    return spool_path, digest.hexdigest()
+
+
+def adopt_source_pdf(spool_path: Path, comic_id: str) -> Path:
+    """Move a spooled upload to ``storage/{comic_id}/source.pdf`` and return it."""
+    dest = _comic_dir(comic_id) / "source.pdf"
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    spool_path.replace(dest)
+    return dest
+
+
 def lookup_by_hash(pdf_hash: str) -> str | None:
-    """Return the comic_id for a PDF hash, or None if not cached."""
-    return _load_index().get(pdf_hash)
+    """Return the newest comic_id for a PDF hash, or None if not cached."""
+    with _index() as conn:
+        # ULIDs sort by creation time, so the max comic_id is the latest run
+        row = conn.execute(
+            "SELECT comic_id FROM comics WHERE pdf_hash = ?"
+            " ORDER BY comic_id DESC LIMIT 1",
+            (pdf_hash,),
+        ).fetchone()
+    return row["comic_id"] if row else None
 
 
 def create_record(pdf_hash: str, title: str = "") -> CacheRecord:
@@ -102,19 +198,20 @@ def create_record(pdf_hash: str, title: str = "") -> CacheRecord:
     )
 
     # Register in index
-    index = _load_index()
-    index[pdf_hash] = comic_id
-    _save_index(index)
+    with _index() as conn:
+        conn.execute(_UPSERT, _index_row(record))
 
     return record
 
 
 def save_record(record: CacheRecord) -> None:
-    """Persist a CacheRecord to disk."""
+    """Persist a CacheRecord to disk and refresh its index entry."""
     record.updated_at = _now_iso()
     path = _record_path(record.comic_id)
     path.parent.mkdir(parents=True, exist_ok=True)
     path.write_text(record.model_dump_json(indent=2))
+    with _index() as conn:
+        conn.execute(_UPSERT, _index_row(record))
 
 
 def load_record(comic_id: str) -> CacheRecord | None:
@@ -126,13 +223,47 @@ def load_record(comic_id: str) -> CacheRecord | None:
 
 
 def load_record_by_token(token: str) -> CacheRecord | None:
-    """Find a CacheRecord by its playback token (linear scan over index)."""
-    index = _load_index()
-    for comic_id in index.values():
-        record = load_record(comic_id)
-        if record and record.playback_token == token:
-            return record
-    return None
+    """Find a CacheRecord by its playback token (indexed lookup)."""
+    with _index() as conn:
+        row = conn.execute(
+            "SELECT comic_id FROM comics WHERE playback_token = ?", (token,)
+        ).fetchone()
+    if row is None:
+        return None
+    return load_record(row["comic_id"])
+
+
+def migrate_json_index() -> int:
+    """
+    One-shot migration from the legacy JSON layout to index.db.
+
+    Indexes every ``{comic_id}/cache_record.json`` under the storage root,
+    then renames ``index.json`` to ``index.json.migrated`` so the migration
+    never runs again.  Safe to call concurrently from several processes: the
+    inserts are idempotent and run in one write transaction.
+
+    Returns the number of records indexed.
+    """
+    root = Path(settings.storage_root)
+    migrated = 0
+    with connect(_INDEX_DB, _SCHEMA) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if not _LEGACY_INDEX_FILE.exists():
+            return 0  # another process got here first
+        for record_path in root.glob("*/cache_record.json"):
+            try:
+                record = CacheRecord.model_validate_json(record_path.read_text())
+            except ValueError:
+                continue  # unreadable record — nothing to index
+            conn.execute(
+                "INSERT OR IGNORE INTO comics VALUES (?, ?, ?, ?, ?, ?)",
+                _index_row(record),
+            )
+            migrated += 1
+        _LEGACY_INDEX_FILE.rename(
+            _LEGACY_INDEX_FILE.with_name(_LEGACY_INDEX_FILE.name + ".migrated")
+        )
+    return migrated
 
 
 def save_manifest(comic: Comic) -> None:
@@ -33,12 +33,37 @@ class Settings(BaseSettings):
     # ── Audiocraft (SFX) ──────────────────────────────────────────────────────
     # "cpu" for the web/local instance; set to "cuda" in Colab (T4 GPU).
     audiocraft_device: str = "cpu"
+    # Prompts per AudioGen forward pass; lower it if inference runs out of memory
+    sfx_batch_size: int = 8
+    # Threads encoding generated clips to MP3 (lameenc, else ffmpeg)
+    sfx_transcode_workers: int = 4
 
     # ── SFX API proxy (optional) ──────────────────────────────────────────────
     # If set, SFX generation will POST to this URL instead of running AudioGen
     # locally. Use the optional Colab SFX server cell to get this URL.
     # Example: SFX_API_URL=https://xxxx-colab-tunnel.ngrok.io
     sfx_api_url: str = ""
+    # The SFX API client keeps up to sfx_api_concurrency pooled connections
+    # (and requests in flight), sends sfx_batch_size prompts per batch request
+    # when the server supports it, and routes to local AudioGen for
+    # sfx_breaker_cooldown_sec after sfx_breaker_failures consecutive failures
+    # or a failed /health probe.
+    sfx_api_concurrency: int = 8
+    sfx_api_batch: bool = True
+    sfx_breaker_failures: int = 3
+    sfx_breaker_cooldown_sec: float = 30.0
+
+    # ── Local SFX daemon (python -m backend.sfx_daemon) ───────────────────────
+    # One AudioGen model for all workers, batching requests across comics.
+    # Point SFX_API_URL at it, e.g. http://127.0.0.1:8001.  A batch closes
+    # after sfx_batch_size prompts or sfx_daemon_max_wait_ms; requests beyond
+    # sfx_daemon_queue_size waiting get 503 + Retry-After.  Requested clip
+    # durations are clamped to 1..sfx_daemon_max_duration_sec seconds.
+    sfx_daemon_host: str = "127.0.0.1"
+    sfx_daemon_port: int = 8001
+    sfx_daemon_max_wait_ms: int = 50
+    sfx_daemon_queue_size: int = 64
+    sfx_daemon_max_duration_sec: int = 10
 
     # ── Gemini Files API (optional, opt-in) ───────────────────────────────────
     # When use_gemini_files_api=True, page images are uploaded once to the
@@ -47,16 +72,115 @@ class Settings(BaseSettings):
     google_ai_api_key: str = ""
     use_gemini_files_api: bool = False
 
+    # ── Panel detection ───────────────────────────────────────────────────────
+    # Segment pages with clean gutters locally (NumPy XY-cut) and only ask the
+    # vision model when the local result's confidence is below the threshold.
+    # Off by default: local reading order is left-to-right, which is wrong for
+    # right-to-left manga.  Enable only for libraries of Western comics.
+    local_panel_detection: bool = False
+    local_panel_min_confidence: float = 0.75
+    # "per_panel": panel detection, then one OCR call per panel (1 + P calls).
+    # "combined": one page-level call returns panels and their bubbles; local
+    # panel detection is not used in this mode.
+    page_analysis_mode: str = "per_panel"
+
+    # ── Speaker attribution ───────────────────────────────────────────────────
+    # "per_panel": one request per panel, in reading order, against the
+    # growing speaker registry.  "windowed": one request per window of pages,
+    # windows in parallel, then a deterministic merge of speaker ids
+    # (overlap pages, story-bible profiles, labels).
+    attribution_mode: str = "per_panel"
+    attribution_window_pages: int = 4
+    attribution_window_overlap: int = 1
+    attribution_window_concurrency: int = 4
+
+    # ── Emotion tagging ───────────────────────────────────────────────────────
+    # Bubbles are packed into requests of up to this many (estimated) input
+    # tokens, system prompt included; batches run concurrently.
+    emotion_batch_token_budget: int = 3000
+    emotion_batch_concurrency: int = 4
+
     # ── Panel normalisation ───────────────────────────────────────────────────
     panel_target_width: int = 1280
     panel_target_height: int = 720
+    # Panels normalised at once (each may make an image-generation call)
+    normalization_concurrency: int = 4
+    # Letterbox margins up to this fraction of the canvas are filled locally
+    # (edge extension / blurred mirror); larger ones are outpainted by the
+    # image-generation models
+    normalization_local_fill_max_margin: float = 0.15
+    # AI fills are cached (storage/cache/fills/) by source panel hash,
+    # target size and model
+    fill_cache_enabled: bool = True
+    fill_cache_max_mb: int = 1024
 
     # ── PDF rendering ─────────────────────────────────────────────────────────
     pdf_render_dpi: int = 150
     # Batched parallel rendering settings (Task 4-7)
     pdf_render_batch_size: int = 3
+    # Extract full-page JPEGs from scanned PDFs instead of rasterizing them
+    pdf_extract_embedded_images: bool = True
+    # Size of the shared render pool: the cap on batches rendering at once
+    # in one process, across all comics
     pdf_render_max_workers: int = 8
 
+    # ── Retries (all OpenRouter and Gemini calls) ─────────────────────────────
+    # Exponential backoff with jitter; Retry-After headers take precedence.
+    retry_max_attempts: int = 5
+    retry_base_delay: float = 1.0
+    retry_max_delay: float = 60.0
+
+    # ── Adaptive concurrency governor ─────────────────────────────────────────
+    # In-flight model calls per model adapt with AIMD: +1 per window of
+    # successes, halved on a 429 or a call slower than the latency threshold.
+    governor_enabled: bool = True
+    governor_initial_limit: int = 8
+    governor_min_limit: int = 1
+    governor_max_limit: int = 64
+    governor_latency_threshold_sec: float = 90.0
+    governor_cooldown_sec: float = 5.0
+
+    # ── LLM response cache ────────────────────────────────────────────────────
+    # chat_completion responses are cached on disk (storage/cache/llm/) keyed
+    # by a digest of the request, so re-runs of the same PDF are near free.
+    llm_cache_enabled: bool = True
+    llm_cache_max_mb: int = 512
+
+    # ── TTS audio cache ───────────────────────────────────────────────────────
+    # Synthesised lines are shared across bubbles and comics (storage/cache/tts/)
+    # keyed by model, voice, emotion instruction and normalised text.
+    tts_cache_enabled: bool = True
+    tts_cache_max_mb: int = 1024
+
+    # ── SFX prompt cache ──────────────────────────────────────────────────────
+    # Panels whose normalised SFX prompts match share one generated clip, in a
+    # comic and across comics (storage/cache/sfx/).
+    sfx_cache_enabled: bool = True
+    sfx_cache_max_mb: int = 512
+
+    # ── Pipeline streaming ────────────────────────────────────────────────────
+    # Capacity of the queue in front of each per-page stage; bounds how many
+    # pages can be waiting between two stages at once.
+    pipeline_queue_size: int = 4
+    # Maximum in-flight vision calls per stage.  Panel detection runs this
+    # many pages at once; bubble OCR runs this many panels at once across
+    # all pages of a comic.  Result order is unaffected.  The governor above
+    # may hold actual concurrency lower when the provider pushes back.
+    panel_detection_concurrency: int = 4
+    bubble_ocr_concurrency: int = 8
+    # Maximum in-flight TTS requests across all pages of a comic
+    tts_concurrency: int = 6
+
+    # ── Job queue ─────────────────────────────────────────────────────────────
+    # Pipeline runs are queued in storage/jobs.db and executed by worker loops
+    # in every uvicorn process.  job_max_concurrent caps running pipelines
+    # across all processes sharing the storage volume.
+    job_max_concurrent: int = 2
+    job_workers_per_process: int = 1
+    job_lease_seconds: int = 120
+    job_poll_interval: float = 1.0
+    job_max_attempts: int = 3
+
     # ── Storage ───────────────────────────────────────────────────────────────
     storage_root: str = "storage"
 
@@ -7,17 +7,35 @@ Run with:
 
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
+from backend import worker
 from backend.api.routes import router
 from backend.config import settings
+from backend.pipeline.render_pool import shutdown_render_pool
+from backend.pipeline.sfx_client import sfx_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Job queue workers live for the lifetime of the process; the render
+    # pool and SFX API connections start lazily and are closed after them
+    worker.start_workers()
+    yield
+    await worker.stop_workers()
+    await shutdown_render_pool()
+    await sfx_client.aclose()
+
 
 app = FastAPI(
     title="Comikry",
     description="Comic text-to-speech reader API",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Allow the frontend (served separately in dev) to call the API
@@ -123,6 +123,31 @@ class CacheRecord(BaseModel):
     story_bible_path: Optional[str] = None         # relative path to story_bible.json (Track B)
 
 
+# ── Job queue ─────────────────────────────────────────────────────────────────
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+class Job(BaseModel):
+    """One pipeline run in the persistent job queue (storage/jobs.db)."""
+    job_id: int
+    comic_id: str
+    pdf_path: str
+    title: str = ""
+    normalization_enabled: bool = False
+    page_range: Optional[tuple[int, int]] = None
+    priority: int = 0                       # higher runs first
+    status: JobStatus = JobStatus.queued
+    attempts: int = 0                       # incremented on every claim
+    lease_owner: Optional[str] = None      # worker_id holding the lease
+    lease_expires: float = 0.0             # epoch seconds
+    error_message: Optional[str] = None
+
+
 # ── Playback state (frontend uses this; not persisted) ───────────────────────
 
 class PlaybackState(BaseModel):
@@ -11,11 +11,14 @@ import asyncio
 import logging
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import AsyncIterator, Optional
 
-from backend.agents.character_agent import attribute_speakers
+from backend.agents.character_agent import (
+    attribute_speakers,
+    attribute_speakers_windowed,
+)
 from backend.agents.sound_director_agent import generate_sfx_prompts
-from backend.agents.voice_tone_agent import run_voice_tone_agent
+from backend.agents.voice_tone_agent import run_voice_tone_agent_for_page
 from backend.cache import store
 from backend.config import settings
 from backend.models import (
@@ -27,15 +30,29 @@ from backend.models import (
     StoryBible,
 )
 from backend.pipeline.bubble_ocr import detect_bubbles
+from backend.pipeline.concurrency import gather_bounded
+from backend.pipeline.dataflow import Stage, run_stages
 from backend.pipeline.normalizer import normalise_comic_panels
+from backend.pipeline.page_analysis import analyse_page
 from backend.pipeline.panel_detection import detect_panels
-from backend.pipeline.pdf_to_images import render_pdf
+from backend.pipeline.pdf_to_images import render_pdf_stream, resolve_page_range
 from backend.pipeline.sfx_generation import generate_sfx_for_comic
-from backend.pipeline.tts_generation import generate_tts_for_comic
+from backend.pipeline.tts_generation import generate_tts_for_page
 
 logger = logging.getLogger(__name__)
 
 
+def _poll_track_b(track_b_task: Optional[asyncio.Task]) -> Optional[StoryBible]:
+    """Return the Track B story bible if it has already finished, else None."""
+    if track_b_task is None or not track_b_task.done():
+        return None
+    try:
+        return track_b_task.result()
+    except Exception as exc:
+        logger.warning("Track B failed: %s; continuing with cold inference", exc)
+        return None
+
+
 async def run_pipeline(
     pdf_path: str,
     comic_id: str,
@@ -45,23 +62,35 @@ async def run_pipeline(
     page_range: Optional[tuple[int, int]] = None,
 ) -> Comic:
     """
-    Execute all pipeline stages in order, updating cache record progress.
+    Execute all pipeline stages, updating cache record progress.
 
     Stages and their progress checkpoints:
-      pdf_to_images        10 %
-      panel_detection      25 %
-      bubble_ocr           40 %
-      speaker_attribution  55 %
-      voice_assignment     65 %
-      tts_generation       80 %
+      pdf_to_images         0 → 10 %
+      panel_detection …
+        tts_generation     10 → 80 %   (streamed page by page)
       sfx_generation       90 %
       normalization        95 %   (skipped if not enabled)
       done                100 %
 
-    Track B (story analysis) runs concurrently with Track A starting after
-    PDF rendering.  Its results are used opportunistically — if it finishes
-    before speaker attribution / SFX generation the pipeline uses its output;
-    otherwise cold per-panel inference is used instead.
+    Stages 2–6 are per-page and run as a streaming pipeline (see
+    ``backend.pipeline.dataflow``): a page moves on to the next stage as soon
+    as it is done, so different pages are in different stages at the same
+    time.  Rendering is the source of that pipeline: pages enter panel
+    detection as soon as their render batch finishes, and the render itself
+    runs off the event loop in its own task, never held back by the stage
+    queues.  Attribution is an ordered stage because the
+    speaker registry is built up in reading order.  While streaming, the
+    reported stage is the earliest one that still has pages outstanding.
+    With ``PAGE_ANALYSIS_MODE=combined`` panel detection also returns the
+    bubbles (one vision call per page) and the OCR stage passes pages through.
+    With ``ATTRIBUTION_MODE=windowed`` attribution runs between two streams,
+    as parallel page-window requests followed by a speaker merge.
+
+    Track B (story analysis) runs concurrently with Track A, starting as
+    soon as the last page is rendered.  Its results are used
+    opportunistically — pages attributed after it finishes use its character
+    profiles, and SFX generation uses its per-panel prompts; otherwise cold
+    per-panel inference is used instead.
 
     Parameters
     ----------
@@ -82,21 +111,14 @@ async def run_pipeline(
     story_bible: Optional[StoryBible] = None
 
     try:
-        # ── Stage 1: PDF → images ──────────────────────────────────────────
+        # ── Stage 1: PDF → images (streamed) ──────────────────────────────
         advance(ProcessingStage.pdf_to_images, 0)
-        page_paths = render_pdf(pdf_path, comic_id, page_range=page_range)
-        advance(ProcessingStage.pdf_to_images, 10)
-
-        # ── Launch Track B concurrently (non-blocking) ─────────────────────
-        try:
-            track_b_task = asyncio.create_task(
-                run_track_b(page_paths, comic_id)
-            )
-        except Exception as exc:
-            logger.warning("Track B failed to start: %s; continuing with cold inference", exc)
-            track_b_task = None
+        first_page, last_page = await asyncio.to_thread(
+            resolve_page_range, pdf_path, page_range
+        )
+        page_count = max(0, last_page - first_page + 1)
 
-        # Build initial Comic shell
+        # Build initial Comic shell; pages are appended as they are rendered
         comic = Comic(
             comic_id=comic_id,
             title=title,
@@ -105,44 +127,83 @@ async def run_pipeline(
             created_at=datetime.now(timezone.utc).isoformat(),
         )
 
-        pages: list[Page] = []
-        # page_range may start from a page > 1 — use actual filenames to derive numbers
-        for page_path in page_paths:
-            stem = Path(page_path).stem            # e.g. "page_0003"
-            page_num = int(stem.split("_")[-1])    # e.g. 3
-            page_id = f"{comic_id}_pg{page_num:04d}"
-            pages.append(
-                Page(page_id=page_id, page_number=page_num, image_path=page_path)
-            )
-        comic.pages = pages
-
-        # ── Stage 2: Panel detection ──────────────────────────────────────
-        advance(ProcessingStage.panel_detection, 10)
-        for page in comic.pages:
-            page.panels = await detect_panels(page.image_path, page.page_id, comic_id)
-        advance(ProcessingStage.panel_detection, 25)
-
-        # ── Stage 3: Bubble OCR ───────────────────────────────────────────
-        advance(ProcessingStage.bubble_ocr, 25)
-        for page in comic.pages:
-            for panel in page.panels:
-                panel.bubbles = await detect_bubbles(panel)
-        advance(ProcessingStage.bubble_ocr, 40)
+        # Rendering runs in its own task and is never throttled by the stage
+        # queues: pages pile up in an unbounded queue, so Track B starts (and
+        # render progress completes) as soon as the last page is rendered,
+        # not when the first stage catches up.
+        render_queue: asyncio.Queue = asyncio.Queue()
+        render_done = object()
 
-        # ── Attempt to get Track B story bible before attribution ─────────
-        if track_b_task is not None and track_b_task.done():
+        async def render_all() -> None:
+            nonlocal track_b_task
             try:
-                story_bible = track_b_task.result()
+                async for page_path in render_pdf_stream(
+                    pdf_path, comic_id, page_range=(first_page, last_page)
+                ):
+                    # page_range may start from a page > 1 — use actual filenames
+                    stem = Path(page_path).stem            # e.g. "page_0003"
+                    page_num = int(stem.split("_")[-1])    # e.g. 3
+                    page = Page(
+                        page_id=f"{comic_id}_pg{page_num:04d}",
+                        page_number=page_num,
+                        image_path=page_path,
+                    )
+                    comic.pages.append(page)
+                    report_progress()
+                    render_queue.put_nowait(page)
             except Exception as exc:
-                logger.warning(
-                    "Track B failed: %s; continuing with cold inference", exc
-                )
-                story_bible = None
+                render_queue.put_nowait(exc)
+                return
 
-        # ── Stage 4: Speaker attribution ──────────────────────────────────
-        advance(ProcessingStage.speaker_attribution, 40)
+            # ── Launch Track B once every page exists (non-blocking) ──────
+            try:
+                track_b_task = asyncio.create_task(
+                    run_track_b([p.image_path for p in comic.pages], comic_id)
+                )
+            except Exception as exc:
+                logger.warning("Track B failed to start: %s; continuing with cold inference", exc)
+                track_b_task = None
+            render_queue.put_nowait(render_done)
+
+        async def rendered_pages() -> AsyncIterator[Page]:
+            while (item := await render_queue.get()) is not render_done:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+
+        # ── Stages 2–6: per-page streaming (panels → TTS) ─────────────────
+        # Each page flows through the stage chain independently; bounded
+        # queues between stages keep the number of pages in flight small.
         known_speakers: list[Speaker] = []
-        for page in comic.pages:
+        comic.speakers = known_speakers
+
+        combined = settings.page_analysis_mode == "combined"
+
+        async def panel_stage(page: Page) -> None:
+            if combined:
+                # One call per page returns panels with their bubbles
+                page.panels = await analyse_page(page.image_path, page.page_id, comic_id)
+            else:
+                page.panels = await detect_panels(page.image_path, page.page_id, comic_id)
+
+        # One semaphore for the whole comic: OCR calls from every page in the
+        # stage share the same in-flight limit.
+        ocr_semaphore = asyncio.Semaphore(max(1, settings.bubble_ocr_concurrency))
+
+        async def ocr_stage(page: Page) -> None:
+            if combined:
+                return  # bubbles already came back with the panels
+            results = await gather_bounded(
+                (detect_bubbles(panel) for panel in page.panels), ocr_semaphore
+            )
+            for panel, bubbles in zip(page.panels, results):
+                panel.bubbles = bubbles
+
+        async def attribution_stage(page: Page) -> None:
+            # Ordered stage: known_speakers grows in reading order
+            nonlocal story_bible
+            if story_bible is None:
+                story_bible = _poll_track_b(track_b_task)
             for panel in page.panels:
                 panel.bubbles, new_speakers = await attribute_speakers(
                     panel,
@@ -157,30 +218,105 @@ async def run_pipeline(
                 for ns in new_speakers:
                     if ns.speaker_id not in existing_ids:
                         known_speakers.append(ns)
-        comic.speakers = known_speakers
-        advance(ProcessingStage.speaker_attribution, 55)
 
-        # ── Stage 5: Voice assignment + emotion tagging ───────────────────
-        advance(ProcessingStage.voice_assignment, 55)
-        comic = await run_voice_tone_agent(comic)
-        advance(ProcessingStage.voice_assignment, 65)
+        async def voice_stage(page: Page) -> None:
+            await run_voice_tone_agent_for_page(page, known_speakers)
+
+        # Shared like the OCR semaphore: one TTS limit across all pages
+        tts_semaphore = asyncio.Semaphore(max(1, settings.tts_concurrency))
+
+        async def tts_stage(page: Page) -> None:
+            await generate_tts_for_page(page, known_speakers, comic_id, tts_semaphore)
+
+        stream_stages = [
+            Stage(
+                ProcessingStage.panel_detection.value, panel_stage,
+                workers=settings.panel_detection_concurrency,
+            ),
+            Stage(
+                ProcessingStage.bubble_ocr.value, ocr_stage,
+                workers=settings.bubble_ocr_concurrency,
+            ),
+            Stage(ProcessingStage.speaker_attribution.value, attribution_stage, ordered=True),
+            Stage(ProcessingStage.voice_assignment.value, voice_stage),
+            Stage(
+                ProcessingStage.tts_generation.value, tts_stage,
+                workers=settings.tts_concurrency,
+            ),
+        ]
+        completed = {stage.name: 0 for stage in stream_stages}
+        total_units = max(1, page_count * len(stream_stages))
+
+        def report_progress() -> None:
+            # Report the earliest stage that still has pages outstanding;
+            # rendering is worth 10%, the streamed stages 70%.
+            if len(comic.pages) < page_count:
+                current = ProcessingStage.pdf_to_images
+            else:
+                current = ProcessingStage(next(
+                    (st for st in stream_stages if completed[st.name] < page_count),
+                    stream_stages[-1],
+                ).name)
+            pct = (
+                (10 * len(comic.pages)) // max(1, page_count)
+                + (70 * sum(completed.values())) // total_units
+            )
+            advance(current, pct)
+
+        def on_page_done(stage: Stage, page: Page) -> None:
+            completed[stage.name] += 1
+            report_progress()
 
-        # ── Stage 6: TTS generation ───────────────────────────────────────
-        advance(ProcessingStage.tts_generation, 65)
-        comic = await generate_tts_for_comic(comic)
+        render_task = asyncio.create_task(render_all())
+        try:
+            if settings.attribution_mode == "windowed":
+                # Windowed attribution needs every page's bubbles, so the stream
+                # splits around it: render → OCR, parallel windows, voice → TTS.
+                head, attribution, tail = stream_stages[:2], stream_stages[2], stream_stages[3:]
+                await run_stages(
+                    rendered_pages(),
+                    head,
+                    queue_size=settings.pipeline_queue_size,
+                    on_item_done=on_page_done,
+                )
+                if story_bible is None:
+                    story_bible = _poll_track_b(track_b_task)
+                known_speakers.extend(
+                    await attribute_speakers_windowed(
+                        comic.pages,
+                        character_profiles=story_bible.characters if story_bible else None,
+                    )
+                )
+                for page in comic.pages:
+                    on_page_done(attribution, page)
+                await run_stages(
+                    comic.pages,
+                    tail,
+                    queue_size=settings.pipeline_queue_size,
+                    on_item_done=on_page_done,
+                )
+            else:
+                await run_stages(
+                    rendered_pages(),
+                    stream_stages,
+                    queue_size=settings.pipeline_queue_size,
+                    on_item_done=on_page_done,
+                )
+        finally:
+            if not render_task.done():
+                render_task.cancel()
+                try:
+                    await render_task
+                except asyncio.CancelledError:
+                    pass
         advance(ProcessingStage.tts_generation, 80)
 
         # ── Stage 7: SFX generation ───────────────────────────────────────
         advance(ProcessingStage.sfx_generation, 80)
 
         # Use Track B per_panel_sfx if available and non-empty
-        if track_b_task is not None and track_b_task.done() and story_bible is None:
-            try:
-                story_bible = track_b_task.result()
-            except Exception as exc:
-                logger.warning(
-                    "Track B failed: %s; continuing with cold inference", exc
-                )
+        if story_bible is None:
+            story_bible = _poll_track_b(track_b_task)
 
         if story_bible is not None and story_bible.per_panel_sfx:
             sfx_prompts = story_bible.per_panel_sfx
@@ -54,21 +54,15 @@ async def detect_bubbles(panel: "Panel") -> list[Bubble]:  # type: ignore[name-d
     If ``settings.use_gemini_files_api`` is True, the image is uploaded to the
     Gemini Files API and referenced by URI; otherwise base64 encoding is used.
     """
-    from backend.pipeline.gemini_files import upload_image
+    from backend.pipeline.gemini_files import generate_content, upload_image
 
     uri = await upload_image(panel.image_path)
 
     if uri:
         # ── Gemini Files API path ──────────────────────────────────────────────
-        import google.generativeai as genai  # type: ignore
-
-        genai.configure(api_key=settings.google_ai_api_key)
-        model = genai.GenerativeModel(settings.vision_model)
-        file_ref = genai.get_file(uri)
-        response = model.generate_content(
-            [_SYSTEM_PROMPT, file_ref, "Find all bubbles and extract their text."]
+        raw = await generate_content(
+            _SYSTEM_PROMPT, [uri], "Find all bubbles and extract their text."
         )
-        raw = response.text.strip()
     else:
         # ── Base64 fallback (existing OpenRouter path) ─────────────────────────
         b64 = _encode_image(panel.image_path)
@@ -96,11 +90,16 @@ async def detect_bubbles(panel: "Panel") -> list[Bubble]:  # type: ignore[name-d
             raw = raw[4:]
 
     bubble_data: list[dict] = extract_json(raw, context=f"bubble_ocr panel={panel.panel_id}")
+    return bubbles_from_json(bubble_data, panel.panel_id)
+
+
+def bubbles_from_json(bubble_data: list[dict], panel_id: str) -> list[Bubble]:
+    """Build Bubble objects (panel-local bboxes) from parsed model output."""
     bubbles: list[Bubble] = []
 
     for item in sorted(bubble_data, key=lambda d: d["order"]):
         idx = item["order"]
-        bubble_id = f"{panel.panel_id}_b{idx:03d}"
+        bubble_id = f"{panel_id}_b{idx:03d}"
 
         bubble_type = BubbleType(item.get("type", "speech"))
 
@@ -117,5 +116,4 @@ async def detect_bubbles(panel: "Panel") -> list[Bubble]:  # type: ignore[name-d
             )
         )
 
-
     return bubbles
@@ -0,0 +1,47 @@
+"""
+Concurrency helpers shared by the pipeline stages.
+
+``gather_bounded`` runs a batch of coroutines at most *N* at a time while
+returning results in submission order, so fan-out stages (e.g. one OCR call
+per panel) can run N-wide without changing the order of ``Page.panels`` or
+``Panel.bubbles``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Awaitable, Iterable, TypeVar, Union
+
+T = TypeVar("T")
+
+
+async def gather_bounded(
+    aws: Iterable[Awaitable[T]],
+    limit: Union[int, asyncio.Semaphore],
+) -> list[T]:
+    """
+    Await every awaitable in *aws* with at most *limit* running at once.
+
+    Parameters
+    ----------
+    aws:
+        Coroutines to run.  They are not started until a slot is free.
+    limit:
+        Either a maximum in-flight count, or an existing ``asyncio.Semaphore``
+        to share one limit across several calls (e.g. every page of a comic).
+
+    Returns
+    -------
+    list
+        Results in the same order as *aws*, regardless of completion order.
+    """
+    semaphore = (
+        limit if isinstance(limit, asyncio.Semaphore)
+        else asyncio.Semaphore(max(1, limit))
+    )
+
+    async def _run(aw: Awaitable[T]) -> T:
+        async with semaphore:
+            return await aw
+
+    return list(await asyncio.gather(*(_run(aw) for aw in aws)))
@@ -0,0 +1,165 @@
+"""
+Page-streaming dataflow engine.
+
+Runs a chain of per-page stages as a pipeline instead of as global barriers:
+each stage has its own workers and a bounded queue in front of it, so page N
+can be in bubble OCR while page N+1 is still in panel detection and page N-1
+is already in TTS.  Wall-clock time approaches the throughput of the slowest
+stage rather than the sum of all stages.
+
+Stages that depend on cross-page state built up in reading order (e.g. the
+speaker registry) are declared ``ordered=True``; they run on a single worker
+behind a reorder buffer so items are processed strictly in source order no
+matter which order the upstream stage finished them in.
+
+Example
+-------
+    stages = [
+        Stage("panel_detection", detect),
+        Stage("bubble_ocr", ocr),
+        Stage("speaker_attribution", attribute, ordered=True),
+    ]
+    pages = await run_stages(pages, stages, queue_size=4)
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from typing import (
+    AsyncIterable, Awaitable, Callable, Generic, Iterable, Optional, TypeVar, Union,
+)
+
+T = TypeVar("T")
+
+# Sentinel pushed through the queues once the source is exhausted
+_DONE = object()
+
+
+@dataclass
+class Stage(Generic[T]):
+    """One step of the page pipeline."""
+    name: str
+    fn: Callable[[T], Awaitable[None]]   # mutates the item in place
+    workers: int = 1                     # concurrent items inside this stage
+    ordered: bool = False                # process strictly in source order
+
+
+async def run_stages(
+    source: Union[Iterable[T], AsyncIterable[T]],
+    stages: list[Stage[T]],
+    queue_size: int = 4,
+    on_item_done: Optional[Callable[[Stage[T], T], None]] = None,
+) -> list[T]:
+    """
+    Push every item of *source* through *stages* and return them in order.
+
+    Parameters
+    ----------
+    source:
+        Items to process (e.g. ``Page`` objects), in reading order.  May be
+        an async iterable, in which case items enter the pipeline as the
+        source produces them (e.g. pages as they finish rendering).
+    stages:
+        Stage chain; each item visits every stage in list order.
+    queue_size:
+        Capacity of the queue in front of each stage.  A full queue blocks
+        the upstream stage, which bounds the number of pages in flight.
+    on_item_done:
+        Optional callback invoked after an item completes a stage (used by the
+        orchestrator for progress reporting).
+
+    Raises
+    ------
+    Exception
+        The first exception raised by any stage; all other workers are
+        cancelled before it propagates.
+    """
+    items: list[T] = []
+    queues: list[asyncio.Queue] = [
+        asyncio.Queue(maxsize=max(1, queue_size)) for _ in stages
+    ]
+    sink: asyncio.Queue = asyncio.Queue()
+
+    def _next_queue(i: int) -> asyncio.Queue:
+        return queues[i + 1] if i + 1 < len(stages) else sink
+
+    def _worker_count(stage: Stage[T]) -> int:
+        return 1 if stage.ordered else max(1, stage.workers)
+
+    async def _push(item: T) -> None:
+        items.append(item)
+        if stages:
+            await queues[0].put((len(items) - 1, item))
+
+    async def _feed() -> None:
+        if isinstance(source, AsyncIterable):
+            try:
+                async for item in source:
+                    await _push(item)
+            finally:
+                aclose = getattr(source, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+        else:
+            for item in source:
+                await _push(item)
+        if stages:
+            for _ in range(_worker_count(stages[0])):
+                await queues[0].put(_DONE)
+
+    async def _run_unordered(i: int) -> None:
+        stage = stages[i]
+        while True:
+            entry = await queues[i].get()
+            if entry is _DONE:
+                return
+            _, item = entry
+            await stage.fn(item)
+            if on_item_done is not None:
+                on_item_done(stage, item)
+            await _next_queue(i).put(entry)
+
+    async def _run_ordered(i: int) -> None:
+        stage = stages[i]
+        pending: dict[int, T] = {}
+        expected = 0
+        while True:
+            entry = await queues[i].get()
+            if entry is _DONE:
+                if pending:
+                    raise RuntimeError(
+                        f"Stage {stage.name!r} finished with "
+                        f"{len(pending)} out-of-order item(s) pending"
+                    )
+                return
+            idx, item = entry
+            pending[idx] = item
+            while expected in pending:
+                current = pending.pop(expected)
+                await stage.fn(current)
+                if on_item_done is not None:
+                    on_item_done(stage, current)
+                await _next_queue(i).put((expected, current))
+                expected += 1
+
+    async def _run_stage(i: int) -> None:
+        stage = stages[i]
+        runner = _run_ordered if stage.ordered else _run_unordered
+        await asyncio.gather(*(runner(i) for _ in range(_worker_count(stage))))
+        # Every worker of this stage has drained — release the next stage
+        if i + 1 < len(stages):
+            for _ in range(_worker_count(stages[i + 1])):
+                await queues[i + 1].put(_DONE)
+
+    tasks = [asyncio.create_task(_feed())]
+    tasks += [asyncio.create_task(_run_stage(i)) for i in range(len(stages))]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    return items
@@ -8,6 +8,11 @@ fall back to base64 encoding.
 
 Upload entries older than 47 hours are treated as stale (Gemini Files API keeps
 files for 48 hours) and a fresh upload is performed automatically.
+
+``generate_content`` is the single entry point for Gemini vision calls over
+uploaded files.  Like the uploads it runs the blocking SDK in a thread
+executor, under the shared retry policy (``backend.pipeline.retry``) and the
+model's adaptive concurrency limit (``backend.pipeline.governor``).
 """
 
 from __future__ import annotations
@@ -17,6 +22,8 @@ from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from backend.config import settings
+from backend.pipeline.governor import governed
+from backend.pipeline.retry import with_retries
 
 # Maps absolute_image_path → (file_uri, upload_time_utc)
 _uri_cache: dict[str, tuple[str, datetime]] = {}
@@ -65,12 +72,40 @@ async def upload_image(image_path: str) -> Optional[str]:
         return uploaded.uri
 
     loop = asyncio.get_event_loop()
-    uri = await loop.run_in_executor(None, _do_upload)
+    uri = await with_retries(
+        lambda: loop.run_in_executor(None, _do_upload), "gemini_upload"
+    )
 
     _uri_cache[image_path] = (uri, now)
     return uri
 
 
+async def generate_content(prompt: str, uris: list[str], text: str) -> str:
+    """
+    Run a Gemini vision call over uploaded files and return the response text.
+
+    The request is ``[prompt, *files, text]``, matching what every pipeline
+    stage sends.  Transient SDK errors (ResourceExhausted, 5xx, deadlines)
+    are retried.
+    """
+    def _do_generate() -> str:
+        import google.generativeai as genai  # type: ignore
+
+        genai.configure(api_key=settings.google_ai_api_key)
+        model = genai.GenerativeModel(settings.vision_model)
+        file_refs = [genai.get_file(uri) for uri in uris]
+        response = model.generate_content([prompt, *file_refs, text])
+        return response.text.strip()
+
+    loop = asyncio.get_event_loop()
+    return await with_retries(
+        lambda: governed(
+            settings.vision_model, lambda: loop.run_in_executor(None, _do_generate)
+        ),
+        "gemini_generate",
+    )
+
+
 def clear_cache() -> None:
     """Clear the in-memory URI cache (used in tests and between pipeline runs)."""
     _uri_cache.clear()
@@ -0,0 +1,138 @@
+"""
+Adaptive concurrency governor for model traffic.
+
+Every OpenRouter request and Gemini SDK call holds a slot from the limiter
+for its model while it is in flight.  Each limiter adapts its limit with
+AIMD (additive increase, multiplicative decrease), the same scheme TCP uses
+for congestion control:
+
+- every successful call grows the limit by ``1 / limit`` — roughly +1 per
+  "window" of successful calls — up to ``governor_max_limit``;
+- a 429 (or a call slower than ``governor_latency_threshold_sec``) halves
+  the limit, down to ``governor_min_limit``.  Decreases are rate-limited to
+  one per ``governor_cooldown_sec`` so a burst of 429s from calls that were
+  already in flight counts as a single congestion signal.
+
+The result is that the pipeline runs as wide as the provider currently
+allows, without hand-tuning the per-stage concurrency settings (which now act
+only as upper bounds).  Limiters are per process; across uvicorn workers the
+job queue's ``job_max_concurrent`` bounds the total number of comics in
+flight.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+from backend.config import settings
+from backend.pipeline.retry import classify
+
+T = TypeVar("T")
+
+
+class AIMDLimiter:
+    """Concurrency limit that adapts to congestion signals."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.limit: float = float(settings.governor_initial_limit)
+        self.in_flight = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        # Plain futures rather than asyncio.Condition: limiters are module
+        # state and must not bind to the first event loop that used them.
+        self._waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> None:
+        """Wait for a free slot."""
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif not waiter.cancelled():
+                    self._wake()  # pass our wake-up on to the next waiter
+                raise
+        self.in_flight += 1
+
+    def release(self, congested: bool | None) -> None:
+        """
+        Free a slot and feed back the outcome of the call.
+
+        *congested* is True for a congestion signal, False for a healthy
+        success, and None for an outcome that says nothing about load.
+        """
+        self.in_flight -= 1
+        if congested:
+            now = time.monotonic()
+            if now - self._last_decrease >= settings.governor_cooldown_sec:
+                self.limit = max(float(settings.governor_min_limit), self.limit / 2)
+                self.decreases += 1
+                self._last_decrease = now
+        elif congested is False:
+            self.limit = min(
+                float(settings.governor_max_limit), self.limit + 1 / self.limit
+            )
+        self._wake()
+
+    def _wake(self) -> None:
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def stats(self) -> dict:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "decreases": self.decreases,
+        }
+
+
+_limiters: dict[str, AIMDLimiter] = {}
+
+
+def limiter_for(model: str) -> AIMDLimiter:
+    """Return the process-wide limiter for *model*, creating it on first use."""
+    if model not in _limiters:
+        _limiters[model] = AIMDLimiter(model)
+    return _limiters[model]
+
+
+async def governed(model: str, call: Callable[[], Awaitable[T]]) -> T:
+    """
+    Await ``call()`` while holding a slot on *model*'s limiter.
+
+    Wrap a single attempt, not a retry loop: backoff sleeps must not hold a
+    slot.
+    """
+    if not settings.governor_enabled:
+        return await call()
+
+    limiter = limiter_for(model)
+    await limiter.acquire()
+    started = time.monotonic()
+    congested: bool | None = None
+    try:
+        result = await call()
+        congested = time.monotonic() - started > settings.governor_latency_threshold_sec
+        return result
+    except Exception as exc:
+        congested = True if classify(exc) == "rate_limited" else None
+        raise
+    finally:
+        limiter.release(congested)
+
+
+def governor_stats() -> dict:
+    """Return current limits and in-flight counts per model."""
+    return {model: limiter.stats() for model, limiter in sorted(_limiters.items())}
@@ -4,8 +4,23 @@ Stage 7 — Panel image normalisation.
 Resizes panel images to the target resolution (settings.panel_target_width ×
 settings.panel_target_height). If the panel's aspect ratio differs from the
 target, the panel is centred on a canvas and the surrounding blank area is
-filled using an AI image generation model (google/gemini-2.5-flash-image with
-a fallback to bytedance-seed/seedream-4.5, both via OpenRouter).
+filled:
+
+* locally, when the blank margin is at most
+  ``settings.normalization_local_fill_max_margin`` of the canvas — thin
+  strips by extending the edge pixels, wider ones with a blurred mirror of
+  the panel;
+* otherwise with an AI image generation model (google/gemini-2.5-flash-image
+  with a fallback to bytedance-seed/seedream-4.5, both via OpenRouter).
+
+AI fills are cached on disk (storage/cache/fills/) keyed by the SHA-256 of
+the source panel image, the target size, the model and the prompt, so
+re-normalising a comic never regenerates an identical fill.  URL results are
+streamed to disk through the shared pooled download client.
+
+Panels are normalised concurrently, at most
+``settings.normalization_concurrency`` at a time; PIL work runs in worker
+threads so it never blocks the event loop.
 
 Normalised images are saved to:
   storage/{comic_id}/panels/normalised/{panel_id}.png
@@ -13,15 +28,43 @@ Normalised images are saved to:
 
 from __future__ import annotations
 
+import asyncio
 import base64
 import io
+import logging
+import sqlite3
 from pathlib import Path
+from typing import Optional
 
+import numpy as np
 from PIL import Image as PILImage
+from PIL import ImageFilter
+
+try:
+    from python_ulid import ULID  # type: ignore[import]
+except ModuleNotFoundError:
+    from ulid import ULID  # python-ulid >= 3.x uses the 'ulid' package name
 
+from backend.cache.blobs import BlobCache, content_key, file_digest
 from backend.config import settings
 from backend.models import Comic, Panel
-from backend.pipeline.openrouter_client import image_generation
+from backend.pipeline.concurrency import gather_bounded
+from backend.pipeline.openrouter_client import download_to_file, image_generation
+
+logger = logging.getLogger(__name__)
+
+# Margins up to this many pixels on every side are filled by repeating the
+# edge pixels; wider ones get a blurred mirror of the panel
+_EDGE_EXTEND_MAX_PX = 16
+
+# Recorded in Panel.normalization_fill_model for locally filled panels
+LOCAL_FILL = "local"
+
+_fill_cache = BlobCache(
+    "fills",
+    max_bytes=lambda: settings.fill_cache_max_mb * 1024 * 1024,
+    suffix=".png",
+)
 
 
 def _build_fill_prompt(panel_image_path: str) -> str:
@@ -32,21 +75,86 @@ def _build_fill_prompt(panel_image_path: str) -> str:
     )
 
 
+def fill_key(source_hash: str, model: str, prompt: str) -> str:
+    """Cache key for a fill of one source panel at the current target size."""
+    return content_key(
+        "fill", source_hash, settings.panel_target_width, settings.panel_target_height,
+        model, prompt,
+    )
+
+
+def _open_rgba(source) -> PILImage.Image:
+    with PILImage.open(source) as img:
+        return img.convert("RGBA")
+
+
+async def _cached_fill(source_hash: str, prompt: str) -> tuple[Optional[PILImage.Image], Optional[str]]:
+    """Return a cached fill from any of the fill models, preferring the primary."""
+    for model in (settings.image_gen_model_primary, settings.image_gen_model_fallback):
+        path = await asyncio.to_thread(_fill_cache.get_path, fill_key(source_hash, model, prompt))
+        if path is not None:
+            try:
+                return await asyncio.to_thread(_open_rgba, path), model
+            except FileNotFoundError:
+                continue  # evicted between lookup and open
+    return None, None
+
+
+async def _fetch_fill(img_data: dict, scratch: Path) -> tuple[PILImage.Image, Optional[bytes]]:
+    """
+    Decode a generated fill.
+
+    base64 results are decoded in memory and their bytes returned; URL
+    results are streamed to *scratch* (bytes None) through the pooled
+    download client.
+    """
+    if "b64_json" in img_data:
+        raw = base64.b64decode(img_data["b64_json"])
+        return await asyncio.to_thread(_open_rgba, io.BytesIO(raw)), raw
+    scratch.parent.mkdir(parents=True, exist_ok=True)
+    await download_to_file(img_data["url"], scratch, "image_download")
+    return await asyncio.to_thread(_open_rgba, scratch), None
+
+
+async def _store_fill(key: str, raw: Optional[bytes], scratch: Path) -> None:
+    """Add a decoded fill to the cache; storage errors only cost the cache entry."""
+    try:
+        if raw is not None:
+            await asyncio.to_thread(_fill_cache.put_bytes, key, raw)
+        else:
+            await asyncio.to_thread(_fill_cache.put_file, key, scratch)
+    except (OSError, sqlite3.Error) as exc:
+        logger.warning("Could not cache fill %s: %s", key[:12], exc)
+
+
 async def _ai_fill(
     panel_img: PILImage.Image,
     canvas: PILImage.Image,
     prompt: str,
-) -> PILImage.Image:
+    source_hash: Optional[str] = None,
+    scratch: Optional[Path] = None,
+) -> tuple[PILImage.Image, Optional[str]]:
     """
     Ask the image generation model to outpaint the blank canvas areas.
 
-    Falls back to the secondary model if the primary fails.
-    For MVP, if both fail, the plain canvas (letterboxed) is returned.
+    Falls back to the secondary model if the primary fails.  Returns the
+    filled image and the model that produced it; if both fail, the plain
+    canvas (letterboxed) and None.
+
+    URL results are streamed to *scratch* (a temporary file by default).
+    With *source_hash* (the SHA-256 of the source panel image), fills are
+    served from and saved to the fill cache.
     """
+    use_cache = source_hash is not None and settings.fill_cache_enabled
+    if use_cache:
+        cached, model = await _cached_fill(source_hash, prompt)
+        if cached is not None:
+            return cached, model
+
+    scratch = scratch or Path(settings.storage_root) / "tmp" / f"{ULID()}.fill"
+
     # Encode composite as base64 for the prompt (used as reference image context)
-    buf = io.BytesIO()
-    canvas.save(buf, format="PNG")
-    b64 = base64.b64encode(buf.getvalue()).decode()
+    b64 = await asyncio.to_thread(_encode_png, canvas)
 
     for model in (settings.image_gen_model_primary, settings.image_gen_model_fallback):
         try:
@@ -58,61 +166,127 @@ async def _ai_fill(
                 # Pass the composite as a reference where the API supports it
                 image=f"data:image/png;base64,{b64}",
             )
-            img_data = result["data"][0]
-            if "b64_json" in img_data:
-                raw = base64.b64decode(img_data["b64_json"])
-            else:
-                import httpx
-                raw = httpx.get(img_data["url"]).content
-            return PILImage.open(io.BytesIO(raw)).convert("RGBA")
+            image, raw = await _fetch_fill(result["data"][0], scratch)
         except Exception:
             continue  # try fallback model
 
+        try:
+            if use_cache:
+                await _store_fill(fill_key(source_hash, model, prompt), raw, scratch)
+        finally:
+            scratch.unlink(missing_ok=True)
+        return image, model
+
     # Both models failed — return plain letterboxed canvas
-    return canvas
+    scratch.unlink(missing_ok=True)
+    return canvas, None
 
 
-async def normalise_panel(panel: Panel, comic_id: str) -> str:
-    """
-    Normalise a single panel image to the target resolution.
+def _encode_png(image: PILImage.Image) -> str:
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    return base64.b64encode(buf.getvalue()).decode()
 
-    Returns the path of the normalised image.
-    """
-    tw = settings.panel_target_width
-    th = settings.panel_target_height
 
-    src = PILImage.open(panel.image_path).convert("RGBA")
+def _letterbox(image_path: str, tw: int, th: int) -> tuple[PILImage.Image, PILImage.Image, int, int]:
+    """Fit the panel inside the target size; return (panel, black canvas with it, x, y)."""
+    src = PILImage.open(image_path).convert("RGBA")
     src.thumbnail((tw, th), PILImage.LANCZOS)
 
     canvas = PILImage.new("RGBA", (tw, th), (0, 0, 0, 255))
     x_off = (tw - src.width) // 2
     y_off = (th - src.height) // 2
     canvas.paste(src, (x_off, y_off))
+    return src, canvas, x_off, y_off
+
+
+def margin_fraction(panel_w: int, panel_h: int, tw: int, th: int) -> float:
+    """Fraction of the target canvas left blank by a letterboxed panel."""
+    return 1.0 - (panel_w * panel_h) / float(tw * th)
+
 
-    needs_fill = src.width < tw or src.height < th
-    if needs_fill:
-        prompt = _build_fill_prompt(panel.image_path)
-        canvas = await _ai_fill(src, canvas, prompt)
+def _local_fill(src: PILImage.Image, tw: int, th: int, x_off: int, y_off: int) -> PILImage.Image:
+    """Fill the letterbox margins from the panel itself (edge extension or blurred mirror)."""
+    rgb = src.convert("RGB")
+    pads = (
+        (y_off, th - src.height - y_off),
+        (x_off, tw - src.width - x_off),
+        (0, 0),
+    )
+    widest = max(max(pad) for pad in pads)
+    if widest <= _EDGE_EXTEND_MAX_PX:
+        return PILImage.fromarray(np.pad(np.asarray(rgb), pads, mode="edge"))
+
+    mirrored = PILImage.fromarray(np.pad(np.asarray(rgb), pads, mode="symmetric"))
+    filled = mirrored.filter(ImageFilter.GaussianBlur(radius=max(4, widest // 6)))
+    filled.paste(rgb, (x_off, y_off))  # keep the panel itself sharp
+    return filled
+
+
+def _save_png(image: PILImage.Image, out_path: Path) -> None:
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    image.convert("RGB").save(str(out_path), "PNG")
 
-    out_dir = Path(settings.storage_root) / comic_id / "panels" / "normalised"
-    out_dir.mkdir(parents=True, exist_ok=True)
-    out_path = out_dir / f"{panel.panel_id}.png"
-    canvas.convert("RGB").save(str(out_path), "PNG")
 
-    return str(out_path)
+async def _normalise(panel: Panel, comic_id: str) -> tuple[str, Optional[str]]:
+    """Normalise one panel; return (path, fill used: LOCAL_FILL, a model id, or None)."""
+    tw = settings.panel_target_width
+    th = settings.panel_target_height
+
+    out_path = Path(settings.storage_root) / comic_id / "panels" / "normalised" / f"{panel.panel_id}.png"
+    src, canvas, x_off, y_off = await asyncio.to_thread(_letterbox, panel.image_path, tw, th)
+
+    fill_model: Optional[str] = None
+    margin = margin_fraction(src.width, src.height, tw, th)
+    if margin > 0:
+        if margin <= settings.normalization_local_fill_max_margin:
+            canvas = await asyncio.to_thread(_local_fill, src, tw, th, x_off, y_off)
+            fill_model = LOCAL_FILL
+        else:
+            prompt = _build_fill_prompt(panel.image_path)
+            source_hash = await asyncio.to_thread(file_digest, panel.image_path)
+            canvas, fill_model = await _ai_fill(
+                src, canvas, prompt, source_hash, out_path.with_suffix(".fill")
+            )
+
+    await asyncio.to_thread(_save_png, canvas, out_path)
+
+    return str(out_path), fill_model
+
+
+async def normalise_panel(panel: Panel, comic_id: str) -> str:
+    """
+    Normalise a single panel image to the target resolution.
+
+    Returns the path of the normalised image.
+    """
+    path, _ = await _normalise(panel, comic_id)
+    return path
 
 
 async def normalise_comic_panels(comic: Comic) -> Comic:
     """
     Normalise all panel images in the comic if normalization is enabled.
+
+    Panels run concurrently (``settings.normalization_concurrency``).
+    ``normalization_fill_model`` records how each panel was filled:
+    ``"local"``, the image model that outpainted it, or None.
     """
     if not comic.normalization_enabled:
         return comic
 
-    for page in comic.pages:
-        for panel in page.panels:
-            norm_path = await normalise_panel(panel, comic.comic_id)
-            panel.normalized_image_path = norm_path
-            panel.normalization_fill_model = settings.image_gen_model_primary
+    panels = [panel for page in comic.pages for panel in page.panels]
+    results = await gather_bounded(
+        (_normalise(panel, comic.comic_id) for panel in panels),
+        settings.normalization_concurrency,
+    )
+    for panel, (norm_path, fill_model) in zip(panels, results):
+        panel.normalized_image_path = norm_path
+        panel.normalization_fill_model = fill_model
 
     return comic
+
+
+def fill_cache_stats() -> dict:
+    """Return AI-fill cache size and this process's hit/miss counters."""
+    return _fill_cache.stats()
@@ -2,18 +2,38 @@
 Shared async OpenRouter HTTP client.
 
 All pipeline stages and agents import this to make model calls, so there is a
-single place to configure auth headers, retries, and timeouts.
+single place to configure auth headers, retries, and timeouts.  Every request
+goes through ``post_json`` (or ``post_to_file`` for streamed binary bodies),
+which applies the shared retry policy from
+``backend.pipeline.retry`` (backoff with jitter, ``Retry-After``) and the
+per-model adaptive concurrency limit from ``backend.pipeline.governor``.
+
+Response cache
+--------------
+``chat_completion`` responses are memoised on disk in a content-addressed
+``BlobCache`` keyed by a digest of (model, messages, kwargs), so re-running a
+comic (``force_reprocess``, or a retry after a crash) replays identical
+panel-detection, OCR, attribution and emotion calls for free.  The cache is
+LRU-bounded by ``settings.llm_cache_max_mb``; disable it globally with
+``LLM_CACHE_ENABLED=false`` or per call with ``cache=False``.
 """
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import os
 import re
+from pathlib import Path
+from typing import Any, Callable, Optional
 
 import httpx
 
+from backend.cache.blobs import BlobCache, content_key
 from backend.config import settings
+from backend.pipeline.governor import governed
+from backend.pipeline.retry import with_retries
 
 logger = logging.getLogger(__name__)
 
@@ -32,16 +52,147 @@ openrouter_client = httpx.AsyncClient(
 )
 
 
-async def chat_completion(model: str, messages: list[dict], **kwargs) -> dict:
+async def post_json(path: str, payload: dict, operation: str) -> httpx.Response:
+    """
+    POST *payload* to an OpenRouter endpoint with the shared retry policy.
+
+    Returns the successful response; raises ``httpx.HTTPStatusError`` once
+    retries are exhausted or for a non-retryable status.
+    """
+    async def _request() -> httpx.Response:
+        response = await openrouter_client.post(path, json=payload)
+        response.raise_for_status()
+        return response
+
+    # Each attempt holds a governor slot; backoff sleeps between attempts don't
+    model = payload.get("model", "")
+    return await with_retries(lambda: governed(model, _request), operation)
+
+
+async def _stream_to_file(
+    client: httpx.AsyncClient, method: str, url: str, dest: Path, **kwargs,
+) -> Path:
+    """
+    Stream a response body into *dest* via ``{dest}.part``.
+
+    *dest* never holds a partial file; the ``.part`` file is removed if the
+    request fails or is cancelled.
+    """
+    part = dest.with_name(f"{dest.name}.part")
+    try:
+        async with client.stream(method, url, **kwargs) as response:
+            if response.is_error:
+                await response.aread()  # keep the error body for logs
+            response.raise_for_status()
+            with open(part, "wb") as out:
+                async for chunk in response.aiter_bytes():
+                    # Keep disk writes off the event loop
+                    await asyncio.to_thread(out.write, chunk)
+        os.replace(part, dest)
+    except BaseException:
+        part.unlink(missing_ok=True)
+        raise
+    return dest
+
+
+async def post_to_file(path: str, payload: dict, operation: str, dest: Path) -> Path:
+    """
+    POST *payload* and stream the response body straight into *dest*.
+
+    Same retry and governor policy as ``post_json``.  Chunks are written to
+    ``{dest}.part`` as they arrive and renamed into place once the body is
+    complete, so *dest* never holds a partial file; the ``.part`` file is
+    removed if the request fails or is cancelled.
+    """
+    async def _request() -> Path:
+        return await _stream_to_file(openrouter_client, "POST", path, dest, json=payload)
+
+    model = payload.get("model", "")
+    return await with_retries(lambda: governed(model, _request), operation)
+
+
+# Shared pooled client for fetching result URLs (e.g. generated images).
+# Separate from openrouter_client so the API key is never sent to other hosts.
+download_client = httpx.AsyncClient(timeout=120.0, follow_redirects=True)
+
+
+async def download_to_file(url: str, dest: Path, operation: str) -> Path:
+    """GET *url* and stream the body into *dest*, with the shared retry policy."""
+    return await with_retries(
+        lambda: _stream_to_file(download_client, "GET", url, dest), operation
+    )
+
+
+_response_cache = BlobCache(
+    "llm",
+    max_bytes=lambda: settings.llm_cache_max_mb * 1024 * 1024,
+    suffix=".json",
+)
+
+
+def _is_cacheable(result: dict, validate: Callable[[str], Any]) -> bool:
+    """
+    Only memoise responses whose message content passes *validate*.
+
+    A response the caller can't parse would otherwise be replayed on every
+    retry and reprocess until evicted.
+    """
+    try:
+        content = result["choices"][0]["message"]["content"].strip()
+    except (KeyError, IndexError, TypeError, AttributeError):
+        return False
+    if not content:
+        return False
+    try:
+        validate(content)
+    except Exception:
+        return False
+    return True
+
+
+async def chat_completion(
+    model: str,
+    messages: list[dict],
+    cache: bool = True,
+    validate: Optional[Callable[[str], Any]] = None,
+    **kwargs,
+) -> dict:
     """
     Call the OpenRouter chat completions endpoint.
 
     Returns the full response dict so callers can extract what they need.
+    Identical requests are served from the on-disk response cache unless
+    *cache* is False or ``settings.llm_cache_enabled`` is off.
+
+    Only responses whose message content passes *validate* (a parser that
+    raises on bad input; default ``extract_json``) are cached, and a cached
+    response that fails it is dropped and fetched again.
     """
+    validate = validate or extract_json
+    use_cache = cache and settings.llm_cache_enabled
+    if use_cache:
+        key = content_key(model, messages, kwargs)
+        cached = await asyncio.to_thread(_response_cache.get_bytes, key)
+        if cached is not None:
+            result = json.loads(cached)
+            if _is_cacheable(result, validate):
+                return result
+            await asyncio.to_thread(_response_cache.discard, key)
+
     payload = {"model": model, "messages": messages, **kwargs}
-    response = await openrouter_client.post("/chat/completions", json=payload)
-    response.raise_for_status()
-    return response.json()
+    response = await post_json("/chat/completions", payload, "chat_completion")
+    result = response.json()
+
+    if use_cache and _is_cacheable(result, validate):
+        await asyncio.to_thread(
+            _response_cache.put_bytes, key, json.dumps(result).encode()
+        )
+    return result
+
+
+def cache_stats() -> dict:
+    """Return response-cache size and this process's hit/miss counters."""
+    return _response_cache.stats()
 
 
 async def image_generation(model: str, prompt: str, **kwargs) -> dict:
@@ -51,8 +202,7 @@ async def image_generation(model: str, prompt: str, **kwargs) -> dict:
     Returns the full response dict (data[0].b64_json or data[0].url).
     """
     payload = {"model": model, "prompt": prompt, **kwargs}
-    response = await openrouter_client.post("/images/generations", json=payload)
-    response.raise_for_status()
+    response = await post_json("/images/generations", payload, "image_generation")
     return response.json()
 
 
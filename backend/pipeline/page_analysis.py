@@ -0,0 +1,131 @@
+"""
+Stages 2+3 combined — page-level panel and bubble analysis.
+
+Used when ``settings.page_analysis_mode == "combined"``.  Instead of one
+``detect_panels`` call per page plus one ``detect_bubbles`` call per panel
+(1 + P vision calls, each panel crop re-sending pixels already sent with the
+page), a single request returns every panel with its bubbles.
+
+Expected Gemini response (parsed), all coordinates in page pixels:
+[
+  {
+    "order": 1, "x": 10, "y": 10, "w": 300, "h": 200,
+    "bubbles": [
+      {"order": 1, "type": "speech", "x": 40, "y": 25, "w": 80, "h": 40,
+       "text": "Hello there!", "confidence": 0.97},
+      ...
+    ]
+  },
+  ...
+]
+
+Bubble boxes are translated into panel-local space (and clipped to the
+panel) so the resulting ``Panel``/``Bubble`` objects are identical in shape
+to the per-panel path.
+"""
+
+from __future__ import annotations
+
+import base64
+import mimetypes
+
+from backend.config import settings
+from backend.models import BBox, Panel
+from backend.pipeline.bubble_ocr import bubbles_from_json
+from backend.pipeline.openrouter_client import chat_completion, extract_json
+from backend.pipeline.panel_detection import save_panel_crops
+
+_SYSTEM_PROMPT = """\
+You are a comic page analyser. Given an image of a comic page:
+
+1. Identify every panel, in reading order (left-to-right, top-to-bottom for
+   Western comics; right-to-left for manga).
+2. Inside each panel, find every speech bubble, thought bubble, narration box
+   and sound-effect text, in reading order within the panel.
+
+Respond ONLY with a JSON array of panels. Each panel has:
+  order      – 1-based reading order on the page
+  x, y, w, h – panel bounding box in page pixels (integers)
+  bubbles    – array of bubbles, each with:
+      order      – 1-based reading order within the panel
+      type       – one of: "speech", "thought", "narration", "sfx"
+      x, y, w, h – bubble bounding box in page pixels (integers)
+      text       – the verbatim text inside the bubble (preserve punctuation)
+      confidence – float 0.0–1.0, your OCR confidence for the text
+
+No markdown, no explanation — raw JSON only.
+"""
+
+_USER_TEXT = "Find all panels and, for each panel, all bubbles with their text."
+
+
+def _encode_image(image_path: str) -> str:
+    with open(image_path, "rb") as f:
+        return base64.b64encode(f.read()).decode()
+
+
+def _to_panel_local(item: dict, panel: BBox) -> dict:
+    """Translate a page-space bubble into *panel* space, clipped to the panel."""
+    x0 = min(max(item["x"] - panel.x, 0), panel.w)
+    y0 = min(max(item["y"] - panel.y, 0), panel.h)
+    x1 = min(max(item["x"] + item["w"] - panel.x, 0), panel.w)
+    y1 = min(max(item["y"] + item["h"] - panel.y, 0), panel.h)
+    return {**item, "x": x0, "y": y0, "w": x1 - x0, "h": y1 - y0}
+
+
+async def analyse_page(
+    page_image_path: str,
+    page_id: str,
+    comic_id: str,
+) -> list[Panel]:
+    """
+    Detect panels and OCR their bubbles with one vision call.
+
+    Returns Panel objects with ``bubbles`` filled in (speaker_id not assigned
+    yet).  Cropped panel images are saved to storage/{comic_id}/panels/, as
+    with ``detect_panels``.
+
+    If ``settings.use_gemini_files_api`` is True, the image is uploaded to the
+    Gemini Files API and referenced by URI; otherwise base64 encoding is used.
+    """
+    from backend.pipeline.gemini_files import generate_content, upload_image
+
+    uri = await upload_image(page_image_path)
+
+    if uri:
+        # ── Gemini Files API path ──────────────────────────────────────────────
+        raw = await generate_content(_SYSTEM_PROMPT, [uri], _USER_TEXT)
+    else:
+        # ── Base64 fallback (OpenRouter path) ──────────────────────────────────
+        b64 = _encode_image(page_image_path)
+        mime = mimetypes.guess_type(page_image_path)[0] or "image/png"
+
+        messages = [
+            {"role": "system", "content": _SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "image_url",
+                        "image_url": {"url": f"data:{mime};base64,{b64}"},
+                    },
+                    {"type": "text", "text": _USER_TEXT},
+                ],
+            },
+        ]
+
+        result = await chat_completion(settings.vision_model, messages)
+        raw = result["choices"][0]["message"]["content"].strip()
+
+    panel_data: list[dict] = extract_json(raw, context=f"page_analysis page={page_id}")
+    panel_data = sorted(panel_data, key=lambda d: d["order"])
+
+    boxes = [BBox(x=d["x"], y=d["y"], w=d["w"], h=d["h"]) for d in panel_data]
+    panels = save_panel_crops(page_image_path, page_id, comic_id, boxes)
+
+    for panel, item in zip(panels, panel_data):
+        panel.bubbles = bubbles_from_json(
+            [_to_panel_local(b, panel.bbox) for b in item.get("bubbles", [])],
+            panel.panel_id,
+        )
+    return panels
@@ -1,8 +1,9 @@
 """
 Stage 2 — Panel detection and ordering.
 
-Sends a rendered page image to Gemini and asks it to return panel bounding
-boxes in reading order as structured JSON.
+Finds panel bounding boxes in reading order.  Pages with clean gutters are
+segmented locally (``backend.pipeline.panel_segmenter``); the rest are sent to
+Gemini, which returns the boxes as structured JSON.
 
 Expected Gemini response (parsed):
 [
@@ -13,12 +14,22 @@ Expected Gemini response (parsed):
 
 from __future__ import annotations
 
+import asyncio
 import base64
+import logging
+import mimetypes
+from collections import Counter
 from pathlib import Path
 
 from backend.config import settings
 from backend.models import BBox, Panel
 from backend.pipeline.openrouter_client import chat_completion, extract_json
+from backend.pipeline.panel_segmenter import segment_panels
+
+logger = logging.getLogger(__name__)
+
+# Pages resolved locally vs by the vision model, per process
+_detector_counts: Counter = Counter()
 
 _SYSTEM_PROMPT = """\
 You are a comic panel analyser. Given an image of a comic page, identify every
@@ -41,39 +52,22 @@ def _encode_image(image_path: str) -> str:
         return base64.b64encode(f.read()).decode()
 
 
-async def detect_panels(
-    page_image_path: str,
-    page_id: str,
-    comic_id: str,
-) -> list[Panel]:
-    """
-    Detect panels on a single page image.
-
-    Returns a list of Panel objects (without bubbles filled in yet).
-    Cropped panel images are saved to storage/{comic_id}/panels/.
-
-    If ``settings.use_gemini_files_api`` is True, the image is uploaded to the
-    Gemini Files API and referenced by URI; otherwise base64 encoding is used.
-    """
-    from backend.pipeline.gemini_files import upload_image
-    from PIL import Image as PILImage
+async def _detect_with_model(page_image_path: str, page_id: str) -> list[BBox]:
+    """Ask the vision model for panel boxes, returned in reading order."""
+    from backend.pipeline.gemini_files import generate_content, upload_image
 
     uri = await upload_image(page_image_path)
 
     if uri:
         # ── Gemini Files API path (direct google-generativeai SDK) ────────────
-        import google.generativeai as genai  # type: ignore
-
-        genai.configure(api_key=settings.google_ai_api_key)
-        model = genai.GenerativeModel(settings.vision_model)
-        file_ref = genai.get_file(uri)
-        response = model.generate_content(
-            [_SYSTEM_PROMPT, file_ref, "Detect all panels on this comic page."]
+        raw = await generate_content(
+            _SYSTEM_PROMPT, [uri], "Detect all panels on this comic page."
         )
-        raw = response.text.strip()
     else:
         # ── Base64 fallback (existing OpenRouter path) ─────────────────────────
         b64 = _encode_image(page_image_path)
+        # Pages are PNG, or JPEG when extracted from a scanned PDF
+        mime = mimetypes.guess_type(page_image_path)[0] or "image/png"
 
         messages = [
             {"role": "system", "content": _SYSTEM_PROMPT},
@@ -82,7 +76,7 @@ async def detect_panels(
                 "content": [
                     {
                         "type": "image_url",
-                        "image_url": {"url": f"data:image/png;base64,{b64}"},
+                        "image_url": {"url": f"data:{mime};base64,{b64}"},
                     },
                     {"type": "text", "text": "Detect all panels on this comic page."},
                 ],
@@ -94,6 +88,60 @@ async def detect_panels(
 
     # Strip accidental markdown fences
     panel_data: list[dict] = extract_json(raw, context=f"panel_detection page={page_id}")
+    return [
+        BBox(x=item["x"], y=item["y"], w=item["w"], h=item["h"])
+        for item in sorted(panel_data, key=lambda d: d["order"])
+    ]
+
+
+async def detect_panels(
+    page_image_path: str,
+    page_id: str,
+    comic_id: str,
+) -> list[Panel]:
+    """
+    Detect panels on a single page image.
+
+    Returns a list of Panel objects (without bubbles filled in yet).
+    Cropped panel images are saved to storage/{comic_id}/panels/.
+
+    The local segmenter (``backend.pipeline.panel_segmenter``) runs first when
+    ``settings.local_panel_detection`` is on; the vision model is only called
+    when its confidence is below ``settings.local_panel_min_confidence``.
+
+    If ``settings.use_gemini_files_api`` is True, the image is uploaded to the
+    Gemini Files API and referenced by URI; otherwise base64 encoding is used.
+    """
+    boxes: list[BBox] | None = None
+    if settings.local_panel_detection:
+        local_boxes, confidence = await asyncio.to_thread(segment_panels, page_image_path)
+        if confidence >= settings.local_panel_min_confidence:
+            boxes = local_boxes
+            _detector_counts["local"] += 1
+        else:
+            logger.debug(
+                "Local panel detection unsure on %s (%.2f); asking the model",
+                page_id, confidence,
+            )
+    if boxes is None:
+        boxes = await _detect_with_model(page_image_path, page_id)
+        _detector_counts["model"] += 1
+
+    return save_panel_crops(page_image_path, page_id, comic_id, boxes)
+
+
+def save_panel_crops(
+    page_image_path: str,
+    page_id: str,
+    comic_id: str,
+    boxes: list[BBox],
+) -> list[Panel]:
+    """
+    Crop *boxes* (in reading order) out of the page and build Panel objects.
+
+    Crops are saved to storage/{comic_id}/panels/{panel_id}.png.
+    """
+    from PIL import Image as PILImage
 
     out_dir = Path(settings.storage_root) / comic_id / "panels"
     out_dir.mkdir(parents=True, exist_ok=True)
@@ -101,9 +149,7 @@ async def detect_panels(
     page_img = PILImage.open(page_image_path)
     panels: list[Panel] = []
 
-    for item in sorted(panel_data, key=lambda d: d["order"]):
-        idx = item["order"]
-        bbox = BBox(x=item["x"], y=item["y"], w=item["w"], h=item["h"])
+    for idx, bbox in enumerate(boxes, start=1):
         panel_id = f"{page_id}_p{idx:03d}"
 
         # Crop and save panel image
@@ -121,3 +167,14 @@ async def detect_panels(
         )
 
     return panels
+
+
+def panel_detection_stats() -> dict:
+    """Return how many pages were segmented locally vs by the model."""
+    local, model = _detector_counts["local"], _detector_counts["model"]
+    total = local + model
+    return {
+        "local": local,
+        "model": model,
+        "local_rate": round(local / total, 4) if total else 0.0,
+    }
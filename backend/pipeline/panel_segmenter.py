@@ -0,0 +1,163 @@
+"""
+Local panel segmenter.
+
+Most Western comic pages separate panels with clean, straight gutters, so
+panel boxes can be found without a model call.  ``segment_panels`` does a
+recursive XY-cut on a downscaled grayscale copy of the page:
+
+1. pixels close to the page's border colour (white or black gutters) are
+   background;
+2. full-width runs of background rows split the region into tiers
+   (top → bottom), full-height runs of background columns split each tier
+   into panels (left → right), recursively;
+3. each leaf is trimmed to its content and scaled back to page pixels.
+
+It also returns a confidence in [0, 1].  Single-region pages (splash pages,
+or layouts with no straight gutters), too many fragments, poorly filled
+boxes (diagonal or borderless panels) and low page coverage all lower the
+score; ``detect_panels`` falls back to the vision model below
+``settings.local_panel_min_confidence``.  Reading order is left-to-right, so
+local detection is opt-in (``settings.local_panel_detection``) and should
+stay disabled for right-to-left (manga) pages.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+from PIL import Image
+
+from backend.models import BBox
+
+_WORK_SIZE = 1000          # longest side of the analysis image, in pixels
+_BG_TOLERANCE = 24         # grey levels from the border colour still counted as gutter
+_GUTTER_FILL = 0.985       # fraction of a row/column that must be background
+_MIN_GUTTER = 0.006        # minimum gutter thickness, fraction of the page side
+_MIN_PANEL = 0.01          # leaves smaller than this fraction of the page are noise
+_MAX_DEPTH = 4             # tiers → panels → sub-tiers → sub-panels
+_MAX_PANELS = 12
+
+
+def _runs(mask: np.ndarray) -> list[tuple[int, int]]:
+    """Return ``[start, end)`` runs of True values in a 1-D boolean array."""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+
+def _trim(bg: np.ndarray, y0: int, y1: int, x0: int, x1: int) -> tuple[int, int, int, int] | None:
+    """Shrink a region to the bounding box of its non-background pixels."""
+    content = ~bg[y0:y1, x0:x1]
+    rows = np.flatnonzero(content.any(axis=1))
+    cols = np.flatnonzero(content.any(axis=0))
+    if rows.size == 0 or cols.size == 0:
+        return None
+    return y0 + rows[0], y0 + rows[-1] + 1, x0 + cols[0], x0 + cols[-1] + 1
+
+
+def _split(bg: np.ndarray, y0: int, y1: int, x0: int, x1: int, axis: int) -> list[tuple[int, int]]:
+    """Split a region at gutters along *axis* (0 = rows, 1 = columns)."""
+    region = bg[y0:y1, x0:x1]
+    profile = region.mean(axis=1 - axis) >= _GUTTER_FILL
+    min_gap = max(2, int(_MIN_GUTTER * bg.shape[axis]))
+    start, end = (y0, y1) if axis == 0 else (x0, x1)
+
+    segments: list[tuple[int, int]] = []
+    cursor = start
+    for gap_start, gap_end in _runs(profile):
+        if gap_end - gap_start < min_gap:
+            continue
+        if gap_start > 0:
+            segments.append((cursor, start + gap_start))
+        cursor = start + gap_end
+    if cursor < end:
+        segments.append((cursor, end))
+    return segments
+
+
+def _cut(
+    bg: np.ndarray, y0: int, y1: int, x0: int, x1: int, depth: int, axis: int,
+) -> list[tuple[int, int, int, int]]:
+    trimmed = _trim(bg, y0, y1, x0, x1)
+    if trimmed is None:
+        return []
+    y0, y1, x0, x1 = trimmed
+    if depth >= _MAX_DEPTH:
+        return [(y0, y1, x0, x1)]
+
+    segments = _split(bg, y0, y1, x0, x1, axis)
+    if len(segments) <= 1:
+        # No gutter this way; try the other direction once at this level
+        other = _split(bg, y0, y1, x0, x1, 1 - axis)
+        if len(other) <= 1:
+            return [(y0, y1, x0, x1)]
+        segments, axis = other, 1 - axis
+
+    leaves: list[tuple[int, int, int, int]] = []
+    for a, b in segments:
+        if axis == 0:
+            leaves += _cut(bg, a, b, x0, x1, depth + 1, 1)
+        else:
+            leaves += _cut(bg, y0, y1, a, b, depth + 1, 0)
+    return leaves
+
+
+def _background_mask(gray: np.ndarray) -> np.ndarray:
+    """Pixels within tolerance of the page's dominant border colour."""
+    border = np.concatenate((gray[0], gray[-1], gray[:, 0], gray[:, -1]))
+    bg_level = float(np.median(border))
+    return np.abs(gray.astype(np.int16) - bg_level) <= _BG_TOLERANCE
+
+
+def segment_panels(image_path: str) -> tuple[list[BBox], float]:
+    """
+    Find panel boxes on a page image without a model call.
+
+    Returns ``(boxes, confidence)`` with boxes in page pixel coordinates and
+    in reading order (tiers top → bottom, panels left → right).
+    """
+    with Image.open(image_path) as img:
+        width, height = img.size
+        scale = min(1.0, _WORK_SIZE / max(width, height))
+        small = img.convert("L").resize(
+            (max(1, round(width * scale)), max(1, round(height * scale)))
+        )
+    gray = np.asarray(small)
+    bg = _background_mask(gray)
+    h, w = bg.shape
+
+    leaves = _cut(bg, 0, h, 0, w, depth=0, axis=0)
+    page_area = float(h * w)
+    noise = [l for l in leaves if (l[1] - l[0]) * (l[3] - l[2]) < _MIN_PANEL * page_area]
+    panels = [l for l in leaves if l not in noise]
+
+    confidence = 1.0
+    if len(panels) <= 1:
+        # Splash page or no straight gutters — can't tell locally
+        confidence = 0.3
+    if len(panels) > _MAX_PANELS:
+        confidence *= 0.5
+    if noise:
+        confidence *= 0.8
+    if panels:
+        # Rectangular bordered panels are mostly content inside their box;
+        # diagonal gutters or borderless art leave large background areas
+        fills = [float((~bg[y0:y1, x0:x1]).mean()) for y0, y1, x0, x1 in panels]
+        confidence *= min(1.0, min(fills) / 0.6)
+        content = _trim(bg, 0, h, 0, w)
+        if content is not None:
+            cy0, cy1, cx0, cx1 = content
+            covered = sum((y1 - y0) * (x1 - x0) for y0, y1, x0, x1 in panels)
+            confidence *= min(1.0, covered / max(1, (cy1 - cy0) * (cx1 - cx0)) / 0.7)
+    else:
+        confidence = 0.0
+
+    boxes = [
+        BBox(
+            x=int(x0 / scale),
+            y=int(y0 / scale),
+            w=min(width, int(round(x1 / scale))) - int(x0 / scale),
+            h=min(height, int(round(y1 / scale))) - int(y0 / scale),
+        )
+        for y0, y1, x0, x1 in panels
+    ]
+    return boxes, round(confidence, 3)
@@ -1,7 +1,7 @@
 """
 Stage 1 — PDF to images.
 
-Renders every page of a PDF to a PNG file saved under:
+Renders every page of a PDF to an image file saved under:
   storage/{comic_id}/pages/page_{n:04d}.png
 
 Returns the list of absolute file paths in page order.
@@ -9,58 +9,326 @@ Returns the list of absolute file paths in page order.
 Task 4-7: Uses concurrent.futures.ProcessPoolExecutor for parallel batched
 rendering so large PDFs are processed faster.  Each worker renders a batch of
 pages and saves them immediately; the main process collects and sorts the paths.
+
+Scanned comics are usually one full-page JPEG per page.  For such pages the
+original JPEG stream is extracted losslessly with ``pdfimages`` and saved as
+``page_{n:04d}.jpg`` instead of being rasterized — near-free and much smaller
+on disk.  A page only qualifies when the JPEG is all it draws: digital comics
+often letter a JPEG page with vector text, balloons or SFX, which the copied
+JPEG would lose.  Every other page (text or vector overlays, several images,
+masks, CMYK, …) is rasterized as before.  Set ``PDF_EXTRACT_EMBEDDED_IMAGES=false`` to always
+rasterize.
+
+``render_pdf_stream`` is the async variant used by the orchestrator: rendering
+runs on the app-wide warm render pool, entirely off the event loop, and page
+paths are yielded in page order as soon as their batch finishes, so downstream
+stages start on page 1 while later batches are still rasterizing.
 """
 
 from __future__ import annotations
 
+import asyncio
 import os
+import re
+import subprocess
 from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import AsyncIterator
 
 from pdf2image import pdfinfo_from_path
 
 from backend.config import settings
+from backend.pipeline.render_pool import get_render_pool
 
 
-# ── Module-level worker (must be picklable — no lambdas or nested functions) ──
+# ── Embedded-image fast path ─────────────────────────────────────────────────
 
-def _render_batch(
+# Displayed image size may differ from the page box by this fraction and
+# still count as covering the page (crop marks, rounding in x-ppi)
+_COVER_TOLERANCE = 0.02
+
+_PAGE_SIZE_RE = re.compile(r"^Page\s+(\d+)\s+size:\s+([\d.]+) x ([\d.]+)", re.MULTILINE)
+_PAGE_ROT_RE = re.compile(r"^Page\s+(\d+)\s+rot:\s+(-?\d+)", re.MULTILINE)
+
+# pdftocairo SVG: elements that define or clip but draw nothing by themselves
+_SVG_NON_DRAWING_RE = re.compile(r"<(defs|clipPath|mask)\b[^>]*?(?:/>|>.*?</\1>)", re.DOTALL)
+_SVG_TAG_RE = re.compile(r"<([A-Za-z][\w:-]*)([^>]*)>")
+_SVG_IMAGE_ID_RE = re.compile(r"<image\b[^>]*?\bid=\"([^\"]+)\"")
+_SVG_HREF_RE = re.compile(r"href=\"#([^\"]+)\"")
+
+
+def _page_sizes(pdf_path: str, first_page: int, last_page: int) -> dict[int, tuple[float, float]]:
+    """
+    Return ``{page: (width_pt, height_pt)}`` using ``pdfinfo -f … -l …``.
+
+    Pages with a non-zero ``/Rotate`` are left out: their embedded image is
+    shown rotated, so it can't be copied as the page.
+    """
+    out = subprocess.run(
+        ["pdfinfo", "-f", str(first_page), "-l", str(last_page), pdf_path],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    rotated = {int(m.group(1)) for m in _PAGE_ROT_RE.finditer(out) if int(m.group(2)) % 360}
+    return {
+        int(m.group(1)): (float(m.group(2)), float(m.group(3)))
+        for m in _PAGE_SIZE_RE.finditer(out)
+        if int(m.group(1)) not in rotated
+    }
+
+
+def _single_jpeg_pages(
+    image_list: str,
+    page_sizes: dict[int, tuple[float, float]],
+) -> set[int]:
+    """
+    Pick the pages that are exactly one full-page RGB/gray JPEG.
+
+    *image_list* is the output of ``pdfimages -list``; a page qualifies when
+    it lists a single entry (no soft masks or other images), that entry is a
+    DCT-encoded ``rgb`` or ``gray`` image, and its displayed size (pixels /
+    ppi) matches the page box in the same orientation.  An image whose size
+    matches with width and height swapped is drawn rotated by the page's
+    transform, so copying its JPEG would give a sideways page.
+    """
+    rows: dict[int, list[list[str]]] = {}
+    for line in image_list.splitlines()[2:]:   # skip header + rule
+        cols = line.split()
+        if len(cols) >= 14 and cols[0].isdigit():
+            rows.setdefault(int(cols[0]), []).append(cols)
+
+    def _close(a: float, b: float) -> bool:
+        return abs(a - b) <= _COVER_TOLERANCE * max(a, b)
+
+    pages: set[int] = set()
+    for page, entries in rows.items():
+        if len(entries) != 1 or page not in page_sizes:
+            continue
+        cols = entries[0]
+        kind, width, height, color, enc = cols[2], cols[3], cols[4], cols[5], cols[8]
+        if kind != "image" or enc != "jpeg" or color not in ("rgb", "gray"):
+            continue
+        try:
+            shown_w = int(width) / float(cols[12]) * 72
+            shown_h = int(height) / float(cols[13]) * 72
+        except (ValueError, ZeroDivisionError):
+            continue
+        page_w, page_h = page_sizes[page]
+        if _close(shown_w, page_w) and _close(shown_h, page_h):
+            pages.add(page)
+    return pages
+
+
+def _pages_with_text(pdf_path: str, first_page: int, last_page: int) -> set[int]:
+    """Return the pages in the range for which ``pdftotext`` finds any text."""
+    out = subprocess.run(
+        ["pdftotext", "-q", "-f", str(first_page), "-l", str(last_page), pdf_path, "-"],
+        capture_output=True, text=True, errors="replace", check=True,
+    ).stdout
+    # One form feed after every page
+    return {first_page + i for i, text in enumerate(out.split("\f")) if text.strip()}
+
+
+def _svg_draws_only_one_image(svg: str) -> bool:
+    """
+    True if the ``pdftocairo -svg`` rendering of a page draws a single image.
+
+    Definitions, clip paths and masks are ignored; any other drawing element
+    — paths, glyphs (``<use>`` of a non-image), text, shapes — disqualifies
+    the page.
+    """
+    start = svg.find("<svg")
+    if start < 0:
+        return False
+    image_ids = set(_SVG_IMAGE_ID_RE.findall(svg))
+    body = _SVG_NON_DRAWING_RE.sub("", svg[svg.find(">", start) + 1:])
+    images = 0
+    for tag, attrs in _SVG_TAG_RE.findall(body):
+        if tag == "g":
+            continue
+        href = _SVG_HREF_RE.search(attrs)
+        if tag == "image" or (tag == "use" and href and href.group(1) in image_ids):
+            images += 1
+        else:
+            return False
+    return images == 1
+
+
+def _draws_only_image(pdf_path: str, page: int) -> bool:
+    """True if *page* draws its image and nothing else (see ``_svg_draws_only_one_image``)."""
+    svg = subprocess.run(
+        ["pdftocairo", "-svg", "-f", str(page), "-l", str(page), pdf_path, "-"],
+        capture_output=True, text=True, errors="replace", check=True,
+    ).stdout
+    return _svg_draws_only_one_image(svg)
+
+
+def _extract_single_jpegs(
     pdf_path: str,
-    out_dir: str,
+    out: Path,
     first_page: int,
     last_page: int,
-    dpi: int,
-) -> list[str]:
+) -> dict[int, str]:
     """
-    Worker function: render pages *first_page*…*last_page* of *pdf_path* to PNG.
+    Losslessly extract the JPEG of every single-image page in the range.
 
-    Saves each page immediately to *out_dir* and returns the list of saved paths.
-    This function runs in a subprocess — it must not import anything that holds
-    module-level state that cannot be pickled.
+    Candidates from ``pdfimages -list`` must also have no text
+    (``pdftotext``) and draw nothing but the image (``pdftocairo -svg``), so
+    lettering or vector art over the JPEG is never dropped.
+
+    Returns ``{page: saved_path}``.  Any poppler failure (tool missing, odd
+    PDF) simply returns the pages extracted so far — the caller rasterizes
+    the rest.
     """
-    from pdf2image import convert_from_path  # local import keeps worker lean
+    saved: dict[int, str] = {}
+    try:
+        image_list = subprocess.run(
+            ["pdfimages", "-list", "-f", str(first_page), "-l", str(last_page), pdf_path],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        candidates = _single_jpeg_pages(
+            image_list, _page_sizes(pdf_path, first_page, last_page)
+        )
+        if candidates:
+            candidates -= _pages_with_text(pdf_path, first_page, last_page)
+        for page in sorted(candidates):
+            if not _draws_only_image(pdf_path, page):
+                continue
+            prefix = out / f".extract_{page:04d}"
+            # -j writes DCT streams verbatim as {prefix}-000.jpg
+            subprocess.run(
+                ["pdfimages", "-j", "-f", str(page), "-l", str(page), pdf_path, str(prefix)],
+                capture_output=True, check=True,
+            )
+            extracted = prefix.with_name(f"{prefix.name}-000.jpg")
+            if not extracted.exists():
+                continue
+            file_path = out / f"page_{page:04d}.jpg"
+            os.replace(extracted, file_path)
+            saved[page] = str(file_path)
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        pass
+    return saved
 
-    out = Path(out_dir)
-    out.mkdir(parents=True, exist_ok=True)
 
-    pages = convert_from_path(
+# ── Module-level worker (must be picklable — no lambdas or nested functions) ──
+
+def _rasterize(
+    pdf_path: str,
+    out: Path,
+    first_page: int,
+    last_page: int,
+    dpi: int,
+) -> dict[int, str]:
+    """Rasterize *first_page*…*last_page* to ``page_NNNN.png``; ``{page: path}``."""
+    from pdf2image import convert_from_path  # local import keeps worker lean
+
+    # pdftoppm names its output "{prefix}{thread:04d}-{page}.png"; the hidden
+    # per-batch prefix keeps concurrent batches from picking up each other's files
+    rendered = convert_from_path(
         pdf_path,
         dpi=dpi,
         fmt="png",
         first_page=first_page,
         last_page=last_page,
         thread_count=1,   # one thread per worker — parallelism comes from processes
+        output_folder=str(out),
+        output_file=f".batch_{first_page:04d}_",
+        paths_only=True,
     )
 
-    saved: list[str] = []
-    for page_num, page_img in enumerate(pages, start=first_page):
+    saved: dict[int, str] = {}
+    for tmp_path in rendered:
+        page_num = int(Path(tmp_path).stem.rsplit("-", 1)[-1])
         file_path = out / f"page_{page_num:04d}.png"
-        page_img.save(str(file_path), "PNG")
-        saved.append(str(file_path))
-
+        os.replace(tmp_path, file_path)  # same directory: a rename, not a copy
+        saved[page_num] = str(file_path)
     return saved
 
 
+def _render_batch(
+    pdf_path: str,
+    out_dir: str,
+    first_page: int,
+    last_page: int,
+    dpi: int,
+) -> list[str]:
+    """
+    Worker function: render pages *first_page*…*last_page* of *pdf_path*.
+
+    Single-JPEG pages are extracted as-is (see module docstring); the rest are
+    rasterized by pdftoppm straight into *out_dir* (``paths_only``) and
+    renamed to their final ``page_NNNN.png`` name, so pages are never decoded
+    into PIL images or re-encoded here, and worker memory does not grow with
+    the batch size.  Returns the saved paths in page order.
+    This function runs in a subprocess — it must not import anything that holds
+    module-level state that cannot be pickled.
+    """
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    saved: dict[int, str] = {}
+    if settings.pdf_extract_embedded_images:
+        saved.update(_extract_single_jpegs(pdf_path, out, first_page, last_page))
+
+    # Rasterize the remaining pages in contiguous runs
+    page = first_page
+    while page <= last_page:
+        if page in saved:
+            page += 1
+            continue
+        run_last = page
+        while run_last + 1 <= last_page and run_last + 1 not in saved:
+            run_last += 1
+        saved.update(_rasterize(pdf_path, out, page, run_last, dpi))
+        page = run_last + 1
+
+    return [saved[n] for n in sorted(saved)]
+
+
+def resolve_page_range(
+    pdf_path: str,
+    page_range: tuple[int, int] | None = None,
+) -> tuple[int, int]:
+    """
+    Clamp *page_range* to the pages that exist in *pdf_path*.
+
+    Returns the inclusive, 1-based ``(first_page, last_page)`` to render; the
+    whole document when *page_range* is None.
+    """
+    info = pdfinfo_from_path(pdf_path)
+    total_pages: int = info["Pages"]
+
+    if page_range is not None:
+        first_page, last_page = page_range
+        return max(1, first_page), min(total_pages, last_page)
+    return 1, total_pages
+
+
+def _plan_batches(first_page: int, last_page: int) -> list[tuple[int, int]]:
+    """Split ``first_page…last_page`` into ``pdf_render_batch_size`` batches."""
+    batch_size: int = settings.pdf_render_batch_size
+    batches: list[tuple[int, int]] = []
+    page = first_page
+    while page <= last_page:
+        batches.append((page, min(page + batch_size - 1, last_page)))
+        page += batch_size
+    return batches
+
+
+def _max_workers() -> int:
+    return min(os.cpu_count() or 1, settings.pdf_render_max_workers)
+
+
+def _pages_dir(comic_id: str) -> Path:
+    out_dir = Path(settings.storage_root) / comic_id / "pages"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    return out_dir
+
+
+def _page_number(path: str) -> int:
+    return int(Path(path).stem.split("_")[-1])
+
+
 def render_pdf(
     pdf_path: str,
     comic_id: str,
@@ -69,6 +337,9 @@ def render_pdf(
     """
     Render pages of *pdf_path* to PNG images.
 
+    Blocks until every page is rendered and uses a private process pool; the
+    app uses ``render_pdf_stream``, which shares one warm pool.
+
     Parameters
     ----------
     pdf_path:
@@ -84,33 +355,12 @@ def render_pdf(
     list[str]
         Absolute file paths, one per page, sorted by page number.
     """
-    out_dir = Path(settings.storage_root) / comic_id / "pages"
-    out_dir.mkdir(parents=True, exist_ok=True)
-
-    # Determine the effective page range
-    info = pdfinfo_from_path(pdf_path)
-    total_pages: int = info["Pages"]
-
-    if page_range is not None:
-        first_page, last_page = page_range
-        first_page = max(1, first_page)
-        last_page = min(total_pages, last_page)
-    else:
-        first_page, last_page = 1, total_pages
-
-    batch_size: int = settings.pdf_render_batch_size
-    max_workers: int = min(os.cpu_count() or 1, settings.pdf_render_max_workers)
-
-    # Build batches: [(first, last), ...]
-    batches: list[tuple[int, int]] = []
-    page = first_page
-    while page <= last_page:
-        batches.append((page, min(page + batch_size - 1, last_page)))
-        page += batch_size
+    out_dir = _pages_dir(comic_id)
+    first_page, last_page = resolve_page_range(pdf_path, page_range)
 
     all_paths: list[str] = []
 
-    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+    with ProcessPoolExecutor(max_workers=_max_workers()) as executor:
         futures = [
             executor.submit(
                 _render_batch,
@@ -120,11 +370,55 @@ def render_pdf(
                 batch_last,
                 settings.pdf_render_dpi,
             )
-            for batch_first, batch_last in batches
+            for batch_first, batch_last in _plan_batches(first_page, last_page)
         ]
         for future in futures:
             all_paths.extend(future.result())
 
     # Sort by page number (batches may finish out of order in edge cases)
-    all_paths.sort(key=lambda p: int(Path(p).stem.split("_")[-1]))
+    all_paths.sort(key=_page_number)
     return all_paths
+
+
+async def render_pdf_stream(
+    pdf_path: str,
+    comic_id: str,
+    page_range: tuple[int, int] | None = None,
+) -> AsyncIterator[str]:
+    """
+    Render pages of *pdf_path* without blocking the event loop.
+
+    Takes the same arguments as ``render_pdf`` but yields each page path, in
+    page order, as soon as the batch containing it has been rendered.  All
+    batches are queued up front on the shared render pool
+    (``backend.pipeline.render_pool``), which interleaves them fairly with
+    other comics' batches, so later batches keep rendering while the caller
+    works on earlier pages.  Closing the generator early cancels any batches
+    that have not started.
+    """
+    out_dir = await asyncio.to_thread(_pages_dir, comic_id)
+    first_page, last_page = await asyncio.to_thread(
+        resolve_page_range, pdf_path, page_range
+    )
+
+    pool = get_render_pool()
+    futures = [
+        pool.submit(
+            comic_id,
+            _render_batch,
+            pdf_path,
+            str(out_dir),
+            batch_first,
+            batch_last,
+            settings.pdf_render_dpi,
+        )
+        for batch_first, batch_last in _plan_batches(first_page, last_page)
+    ]
+    try:
+        for future in futures:
+            for path in sorted(await future, key=_page_number):
+                yield path
+    finally:
+        # Drop batches still queued if the caller stopped early
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,167 @@
+"""
+Shared PDF render pool.
+
+One ``ProcessPoolExecutor`` per uvicorn process renders pages for every
+comic, instead of a fresh pool per comic:
+
+- worker processes are started lazily on first use and stay warm (pdf2image
+  already imported) for the lifetime of the app; the FastAPI lifespan shuts
+  them down;
+- at most ``settings.pdf_render_max_workers`` batches render at once in this
+  process no matter how many comics are in flight, so concurrent comics no
+  longer oversubscribe the CPU;
+- batches wait in a per-comic queue and are dispatched round-robin across
+  comics, so a 200-page upload cannot starve a 10-page one behind it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_worker() -> None:
+    """Process initializer: pay the pdf2image import once per worker."""
+    import pdf2image  # noqa: F401
+
+
+class RenderPool:
+    """Process pool with a global worker cap and fair per-owner queues."""
+
+    def __init__(self) -> None:
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._max_workers = 1
+        self._running = 0
+        # owner → pending (future, fn, args); OrderedDict order is the
+        # round-robin order
+        self._queues: OrderedDict[str, deque] = OrderedDict()
+
+    # ── Submission ────────────────────────────────────────────────────────────
+
+    def submit(self, owner: str, fn: Callable[..., Any], *args: Any) -> asyncio.Future:
+        """
+        Queue ``fn(*args)`` to run in a worker process on behalf of *owner*.
+
+        Returns an asyncio future for the result.  Cancelling it before the
+        call is dispatched removes the call from the queue.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(owner, deque()).append((future, fn, args))
+        self._dispatch()
+        return future
+
+    def _dispatch(self) -> None:
+        while self._queues:
+            executor = self._ensure_executor()
+            if self._running >= self._max_workers:
+                return
+            job = self._next_job()
+            if job is None:
+                return
+            future, fn, args = job
+            self._running += 1
+            running = asyncio.wrap_future(executor.submit(fn, *args))
+            running.add_done_callback(
+                lambda r, f=future, e=executor: self._on_done(r, f, e)
+            )
+
+    def _next_job(self) -> Optional[tuple]:
+        """Pop the next live job, rotating owners round-robin."""
+        while self._queues:
+            owner, queue = next(iter(self._queues.items()))
+            job = queue.popleft()
+            if queue:
+                self._queues.move_to_end(owner)
+            else:
+                del self._queues[owner]
+            if not job[0].cancelled():
+                return job
+        return None
+
+    def _on_done(
+        self,
+        running: asyncio.Future,
+        future: asyncio.Future,
+        executor: ProcessPoolExecutor,
+    ) -> None:
+        if executor is self._executor:
+            # Jobs of a replaced (broken or closed) executor no longer count
+            self._running -= 1
+        if not future.done():
+            if running.cancelled():
+                future.cancel()
+            elif running.exception() is not None:
+                future.set_exception(running.exception())
+                if (
+                    isinstance(running.exception(), BrokenProcessPool)
+                    and executor is self._executor
+                ):
+                    # A worker died; start a fresh pool for the next job
+                    logger.warning("Render pool broken; restarting it")
+                    self._executor = None
+                    self._running = 0
+            else:
+                future.set_result(running.result())
+        self._dispatch()
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+
+    def _ensure_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._max_workers = max(
+                1, min(os.cpu_count() or 1, settings.pdf_render_max_workers)
+            )
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._max_workers, initializer=_warm_worker
+            )
+            logger.info("Started render pool with %d workers", self._max_workers)
+        return self._executor
+
+    def close(self) -> Optional[ProcessPoolExecutor]:
+        """
+        Cancel queued work and detach the executor.
+
+        Returns the executor (or None if it never started) so the caller can
+        shut it down without blocking the event loop.  The next ``submit``
+        starts a fresh pool.
+        """
+        for queue in self._queues.values():
+            for future, _, _ in queue:
+                future.cancel()
+        self._queues.clear()
+        executor, self._executor = self._executor, None
+        self._running = 0
+        return executor
+
+    def stats(self) -> dict:
+        return {
+            "started": self._executor is not None,
+            "max_workers": self._max_workers,
+            "running": self._running,
+            "queued": sum(len(q) for q in self._queues.values()),
+            "owners_waiting": len(self._queues),
+        }
+
+
+_pool = RenderPool()
+
+
+def get_render_pool() -> RenderPool:
+    """Return this process's shared render pool."""
+    return _pool
+
+
+async def shutdown_render_pool() -> None:
+    """Stop the shared pool's workers (called from the app lifespan)."""
+    executor = _pool.close()
+    if executor is not None:
+        await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
@@ -0,0 +1,155 @@
+"""
+Shared retry policy for model calls.
+
+Every OpenRouter request (chat, image generation, TTS) and every Gemini SDK
+call goes through ``with_retries`` so a transient 429 or 503 costs a short
+wait instead of failing a whole comic.
+
+Policy
+------
+- Exponential backoff with full jitter:
+  ``uniform(0, min(retry_max_delay, retry_base_delay * 2 ** (attempt - 1)))``.
+- A ``Retry-After`` header (seconds or HTTP date) overrides the backoff,
+  capped at ``retry_max_delay``.
+- Errors are classified; only the classes below are retried, each with its
+  own attempt budget.  Anything else (400, 401, bad JSON, …) fails at once.
+
+  ============  ===========================================  ==================
+  class         matches                                      attempts
+  ============  ===========================================  ==================
+  rate_limited  HTTP 429, Gemini ResourceExhausted           retry_max_attempts
+  server_error  HTTP 500/502/503/504, Gemini 5xx             retry_max_attempts
+  timeout       HTTP 408, httpx timeouts, DeadlineExceeded   3
+  network       connection resets / protocol errors          3
+  ============  ===========================================  ==================
+
+Retry counts per (operation, class) are kept per process and reported by
+``retry_stats()`` (exposed on ``GET /api/metrics``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+from collections import Counter
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import httpx
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Attempt budget per error class; None → settings.retry_max_attempts
+_CLASS_ATTEMPTS: dict[str, Optional[int]] = {
+    "rate_limited": None,
+    "server_error": None,
+    "timeout": 3,
+    "network": 3,
+}
+
+# google.api_core exception names, matched by name so this module does not
+# import the optional Gemini SDK
+_GOOGLE_ERROR_CLASSES = {
+    "ResourceExhausted": "rate_limited",
+    "TooManyRequests": "rate_limited",
+    "InternalServerError": "server_error",
+    "ServiceUnavailable": "server_error",
+    "BadGateway": "server_error",
+    "GatewayTimeout": "server_error",
+    "DeadlineExceeded": "timeout",
+}
+
+_retries: Counter = Counter()    # (operation, error_class) → retries
+_give_ups: Counter = Counter()   # (operation, error_class) → exhausted budgets
+
+
+def classify(exc: BaseException) -> Optional[str]:
+    """Return the retryable error class for *exc*, or None if it is permanent."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        if status == 429:
+            return "rate_limited"
+        if status in (500, 502, 503, 504):
+            return "server_error"
+        if status == 408:
+            return "timeout"
+        return None
+    if isinstance(exc, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(exc, httpx.TransportError):
+        return "network"
+    return _GOOGLE_ERROR_CLASSES.get(type(exc).__name__)
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """Parse a ``Retry-After`` header from an HTTP error, if present."""
+    response = getattr(exc, "response", None)
+    if not isinstance(response, httpx.Response):
+        return None
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def backoff_delay(attempt: int, exc: BaseException) -> float:
+    """Seconds to wait before retry number *attempt* (1-based)."""
+    retry_after = retry_after_seconds(exc)
+    if retry_after is not None:
+        return min(retry_after, settings.retry_max_delay)
+    ceiling = min(settings.retry_max_delay, settings.retry_base_delay * 2 ** (attempt - 1))
+    return random.uniform(0, ceiling)
+
+
+async def with_retries(
+    call: Callable[[], Awaitable[T]],
+    operation: str,
+) -> T:
+    """
+    Await ``call()``, retrying transient failures according to the policy.
+
+    *call* must create a fresh request on every invocation.  *operation* is a
+    short label (e.g. ``"chat_completion"``) used for logs and metrics.
+    """
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return await call()
+        except Exception as exc:
+            error_class = classify(exc)
+            if error_class is None:
+                raise
+            budget = _CLASS_ATTEMPTS[error_class] or settings.retry_max_attempts
+            if attempt >= min(budget, settings.retry_max_attempts):
+                _give_ups[(operation, error_class)] += 1
+                raise
+            delay = backoff_delay(attempt, exc)
+            _retries[(operation, error_class)] += 1
+            logger.warning(
+                "%s failed (%s: %s); retry %d in %.1fs",
+                operation, error_class, exc, attempt, delay,
+            )
+            await asyncio.sleep(delay)
+
+
+def retry_stats() -> dict:
+    """Return retry and give-up counts keyed by ``"operation/error_class"``."""
+    return {
+        "retries": {f"{op}/{cls}": n for (op, cls), n in sorted(_retries.items())},
+        "give_ups": {f"{op}/{cls}": n for (op, cls), n in sorted(_give_ups.items())},
+    }
@@ -0,0 +1,217 @@
+"""
+Pooled client for the remote SFX API (Colab SFX server or local SFX daemon).
+
+One long-lived ``httpx.AsyncClient`` per process keeps connections to
+``settings.sfx_api_url`` alive, so clips no longer pay a TCP/TLS handshake
+(through an ngrok tunnel) each.  At most ``settings.sfx_api_concurrency``
+requests are in flight at once, and every request goes through the shared
+retry policy (``backend.pipeline.retry``), which also waits out the SFX
+daemon's ``503`` + ``Retry-After`` backpressure.
+
+Circuit breaker
+---------------
+Before first use, and again ``settings.sfx_breaker_cooldown_sec`` after the
+breaker opens, the client probes ``GET {sfx_api_url}/health``; any HTTP
+response counts as "up".  ``settings.sfx_breaker_failures`` consecutive
+failed requests (after retries) open the breaker.  While it is open
+``available()`` is False and callers use local AudioGen; while it is closed
+a failed clip is simply reported as missing.
+
+Batch mode
+----------
+``generate_many`` sends up to ``settings.sfx_batch_size`` prompts per
+``POST /generate-sfx-batch`` request (served by ``backend.sfx_daemon``).
+Servers without that endpoint (the Colab notebook) answer 404/405, after
+which the client sends concurrent single-prompt requests instead.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import logging
+import time
+from typing import Optional
+
+import httpx
+
+from backend.config import settings
+from backend.pipeline.concurrency import gather_bounded
+from backend.pipeline.retry import with_retries
+
+logger = logging.getLogger(__name__)
+
+
+class SFXUnavailable(Exception):
+    """The remote SFX API could not produce a clip."""
+
+
+class SFXClient:
+    """Keep-alive SFX API client with bounded concurrency and a circuit breaker."""
+
+    def __init__(self) -> None:
+        self._client: Optional[httpx.AsyncClient] = None
+        self._base_url = ""
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._healthy: Optional[bool] = None     # None → not probed yet
+        self._retry_at = 0.0                     # monotonic time of next probe
+        self._failures = 0                       # consecutive failed requests
+        self._batch_supported = True
+        self.requests = 0
+        self.batch_requests = 0
+        self.failed = 0
+
+    # ── Connection ────────────────────────────────────────────────────────────
+
+    def _http(self) -> httpx.AsyncClient:
+        """Return the pooled client, recreating it if SFX_API_URL was hot-reloaded."""
+        base_url = settings.sfx_api_url.rstrip("/")
+        if self._client is None or base_url != self._base_url:
+            if self._client is not None:
+                # Let in-flight requests finish on the old client
+                asyncio.get_running_loop().create_task(self._client.aclose())
+            limit = max(1, settings.sfx_api_concurrency)
+            self._client = httpx.AsyncClient(
+                base_url=base_url,
+                timeout=httpx.Timeout(120.0, connect=10.0),
+                limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
+            )
+            self._semaphore = asyncio.Semaphore(limit)
+            self._base_url = base_url
+            self._healthy = None
+            self._failures = 0
+            self._batch_supported = True
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # ── Circuit breaker ───────────────────────────────────────────────────────
+
+    async def available(self) -> bool:
+        """True if an SFX API is configured and the breaker is closed."""
+        if not settings.sfx_api_url:
+            return False
+        client = self._http()
+        if self._healthy or (self._healthy is False and time.monotonic() < self._retry_at):
+            return bool(self._healthy)
+        try:
+            await client.get("/health", timeout=5.0)
+        except httpx.HTTPError as exc:
+            self._open(f"health check failed: {exc}")
+            return False
+        self._healthy = True
+        self._failures = 0
+        return True
+
+    def _open(self, reason: str) -> None:
+        if self._healthy is not False:
+            logger.warning(
+                "SFX API at %s is down (%s); using local AudioGen for %.0fs",
+                self._base_url, reason, settings.sfx_breaker_cooldown_sec,
+            )
+        self._healthy = False
+        self._retry_at = time.monotonic() + settings.sfx_breaker_cooldown_sec
+
+    def _record(self, ok: bool, error: Optional[Exception] = None) -> None:
+        if ok:
+            self._failures = 0
+            return
+        self.failed += 1
+        self._failures += 1
+        if self._failures >= max(1, settings.sfx_breaker_failures):
+            self._open(f"{self._failures} consecutive failures, last: {error}")
+
+    # ── Requests ──────────────────────────────────────────────────────────────
+
+    async def _post(self, path: str, payload: dict) -> httpx.Response:
+        client = self._http()
+
+        async def _request() -> httpx.Response:
+            async with self._semaphore:
+                response = await client.post(path, json=payload)
+            response.raise_for_status()
+            return response
+
+        return await with_retries(_request, "sfx")
+
+    async def generate(self, prompt: str, duration: int) -> bytes:
+        """Return the audio bytes for one prompt; raises ``SFXUnavailable``."""
+        self.requests += 1
+        try:
+            response = await self._post(
+                "/generate-sfx", {"prompt": prompt, "duration": duration}
+            )
+        except httpx.HTTPError as exc:
+            self._record(False, exc)
+            raise SFXUnavailable(str(exc)) from exc
+        self._record(True)
+        return response.content
+
+    async def _generate_batch(self, prompts: list[str], duration: int) -> list[bytes]:
+        self.batch_requests += 1
+        response = await self._post(
+            "/generate-sfx-batch", {"prompts": prompts, "duration": duration}
+        )
+        clips = [base64.b64decode(clip) for clip in response.json()["clips"]]
+        if len(clips) != len(prompts):
+            raise SFXUnavailable(f"expected {len(prompts)} clips, got {len(clips)}")
+        return clips
+
+    async def _generate_one(self, prompt: str, duration: int) -> Optional[bytes]:
+        try:
+            return await self.generate(prompt, duration)
+        except SFXUnavailable:
+            return None
+
+    async def generate_many(self, prompts: list[str], duration: int) -> list[Optional[bytes]]:
+        """
+        Return one clip per prompt, or None where the remote failed.
+
+        Uses batch requests of ``settings.sfx_batch_size`` prompts when the
+        server supports them, concurrent single requests otherwise.
+        """
+        size = max(1, settings.sfx_batch_size)
+        chunks = [prompts[i:i + size] for i in range(0, len(prompts), size)]
+
+        async def run_chunk(chunk: list[str]) -> list[Optional[bytes]]:
+            if self._batch_supported and settings.sfx_api_batch:
+                try:
+                    clips = await self._generate_batch(chunk, duration)
+                except httpx.HTTPStatusError as exc:
+                    if exc.response.status_code not in (404, 405):
+                        self._record(False, exc)
+                        return [None] * len(chunk)
+                    logger.info("SFX API has no batch endpoint; sending single prompts")
+                    self._batch_supported = False
+                except (httpx.HTTPError, SFXUnavailable, ValueError, KeyError) as exc:
+                    self._record(False, exc)
+                    return [None] * len(chunk)
+                else:
+                    self._record(True)
+                    return clips
+            return await asyncio.gather(*(self._generate_one(p, duration) for p in chunk))
+
+        results = await gather_bounded(
+            (run_chunk(chunk) for chunk in chunks), settings.sfx_api_concurrency
+        )
+        return [clip for chunk in results for clip in chunk]
+
+    # ── Stats ─────────────────────────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        state = {None: "unknown", True: "closed", False: "open"}[self._healthy]
+        return {
+            "url": settings.sfx_api_url,
+            "breaker": state,
+            "batch_supported": self._batch_supported,
+            "requests": self.requests,
+            "batch_requests": self.batch_requests,
+            "failed": self.failed,
+        }
+
+
+# Shared client — one connection pool per process
+sfx_client = SFXClient()
@@ -11,29 +11,44 @@ Device strategy
 * Colab prototype       → CUDA (set AUDIOCRAFT_DEVICE=cuda in the Colab config
   cell or .env).  The T4 instance handles audiogen-small with ease.
 
-The model is lazy-loaded on first use and reused across all panels. If
+The model is lazy-loaded on first use and reused across all panels.  A
+comic's prompts are generated in batches of ``settings.sfx_batch_size`` (one
+``model.generate`` call per batch) rather than one call per panel. If
 Audiocraft is not installed the module falls back to a silent placeholder so
 the rest of the pipeline still runs.
 
-Audio is saved to storage/{comic_id}/audio/sfx/{panel_id}.wav then converted
-to MP3 with ffmpeg if available (saves ~60 % disk vs WAV).
+With several uvicorn workers, run the local SFX daemon
+(``python -m backend.sfx_daemon``) and point SFX_API_URL at it so a single
+model serves every worker and batches prompts across comics.
+
+Audio is encoded straight from the generated waveforms to
+storage/{comic_id}/audio/sfx/{panel_id}.mp3 (``backend.pipeline.transcode``:
+lameenc in-process, else ffmpeg fed from a pipe) — or .wav when no MP3
+encoder is installed.
 
 Installation (Colab / local):
     pip install -q audiocraft==1.3.0
     # gradio pin only needed if you are running the AudioCraft web UI:
     # pip install -q gradio==4.44.1
     # Python 3.9 or 3.10 recommended; PyTorch >= 2.0 required.
-    # FFmpeg must be on PATH for MP3 conversion.
+    # MP3 encoding: pip install lameenc (or put FFmpeg on PATH).
 """
 
 from __future__ import annotations
 
 import asyncio
-import subprocess
+import logging
+import re
+import shutil
+from collections import OrderedDict
 from pathlib import Path
+from typing import Optional
 
+from backend.cache.blobs import BlobCache, content_key
 from backend.config import settings
 from backend.models import Comic, Panel
+from backend.pipeline.sfx_client import SFXUnavailable, sfx_client
+from backend.pipeline.transcode import encode_clips
 
 # ── Model — loaded once, reused across all panels ────────────────────────────
 # AudioGen-small is ~300 MB on disk vs ~1.5 GB for medium.
@@ -41,9 +56,57 @@ from backend.models import Comic, Panel
 # (useful in Colab where the home partition is small).
 _SFX_DURATION_SEC = 4        # keep short to save VRAM and disk
 _MODEL_ID = "facebook/audiogen-small"
+_DEFAULT_PROMPT = "soft ambient background, comic book"
+# Silent placeholder written when Audiocraft is not installed (never cached)
+_STUB_CLIP = b"\x00"
+
+logger = logging.getLogger(__name__)
 
 _sfx_model = None  # lazy-loaded on first use
 
+# ── Prompt cache — one clip per normalised prompt, shared across comics ──────
+_sfx_cache = BlobCache(
+    "sfx", max_bytes=lambda: settings.sfx_cache_max_mb * 1024 * 1024
+)
+
+# comic_id → {"hits", "misses", "hit_rate"} for the most recent comics
+_comic_stats: OrderedDict[str, dict] = OrderedDict()
+_COMIC_STATS_KEPT = 50
+
+
+def normalise_prompt(prompt: str) -> str:
+    """Lower-case, collapse whitespace and drop surrounding punctuation."""
+    return re.sub(r"\s+", " ", prompt.lower()).strip(" \t\n.,;:!")
+
+
+def sfx_clip_key(prompt: str) -> str:
+    """
+    Content key for the clip generated from *prompt*.
+
+    The key does not depend on the audio format: local and remote clips may
+    be MP3 or WAV, and the format of a cached clip is read from its header.
+    """
+    return content_key("sfx", _MODEL_ID, _SFX_DURATION_SEC, normalise_prompt(prompt))
+
+
+def _clip_suffix(head: bytes) -> str:
+    """Extension for a clip starting with *head*: ``.wav`` for RIFF, else ``.mp3``."""
+    return ".wav" if head[:4] == b"RIFF" else ".mp3"
+
+
+def _is_stub(path: Path) -> bool:
+    return path.stat().st_size == len(_STUB_CLIP) and path.read_bytes() == _STUB_CLIP
+
+
+def _link_cached_clip(key: str, out_dir: Path, panel_id: str) -> Optional[Path]:
+    """Blocking: link the cached clip for *key* to out_dir/{panel_id}.mp3|.wav, or None."""
+    linked = _sfx_cache.link_to(key, out_dir / f".{panel_id}.sfx")
+    if linked is None:
+        return None
+    with linked.open("rb") as f:
+        dest = out_dir / f"{panel_id}{_clip_suffix(f.read(4))}"
+    return linked.replace(dest)
+
 
 def _load_model():
     global _sfx_model
@@ -66,57 +129,73 @@ def _load_model():
     return _sfx_model
 
 
-def _wav_to_mp3(wav_path: Path) -> Path:
-    """Convert WAV → MP3 with ffmpeg (128 kbps). Returns the MP3 path."""
-    mp3_path = wav_path.with_suffix(".mp3")
-    try:
-        subprocess.run(
-            ["ffmpeg", "-y", "-i", str(wav_path), "-b:a", "128k", str(mp3_path)],
-            check=True, capture_output=True,
-        )
-        wav_path.unlink(missing_ok=True)  # delete WAV after conversion
-        return mp3_path
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        # ffmpeg not available — keep the WAV
-        return wav_path
+def _infer_batch(model, prompts: list[str], out_paths: list[Path]) -> list[Path]:
+    """Blocking: generate one clip per prompt in a single forward pass and save them."""
+    from audiocraft.data.audio_utils import normalize_audio  # type: ignore
+    import torch
 
+    with torch.inference_mode():
+        wavs = model.generate(prompts)  # shape: (len(prompts), 1, samples)
+
+    # Same loudness processing audio_write applied, then encode in memory
+    clips = [
+        normalize_audio(
+            wav.cpu(),
+            strategy="loudness",
+            loudness_compressor=True,
+            sample_rate=model.sample_rate,
+        ).numpy()
+        for wav in wavs
+    ]
+    return encode_clips(clips, model.sample_rate, out_paths)
 
-async def _generate_sfx_audio(prompt: str, out_path: Path) -> Path:
-    """
-    Generate SFX for one prompt. Returns the final saved file path (MP3 or WAV).
 
-    Runs the blocking Audiocraft inference in a thread executor so the async
-    event loop is not blocked.
+async def _generate_sfx_batch(prompts: list[str], out_paths: list[Path]) -> list[Path]:
+    """
+    Generate SFX for several prompts at once. Returns the saved file paths
+    (MP3 or WAV), aligned with *out_paths*.
+
+    AudioGen pads a list of prompts into one batch, which amortises the
+    per-call overhead — on CPU a batch of N clips costs far less than N
+    single-prompt calls.  Prompts are split into chunks of
+    ``settings.sfx_batch_size``; chunks run one after another in a worker
+    thread so the event loop is not blocked and only one inference uses the
+    model at a time.
     """
     model = _load_model()
 
     if model is None:
         # Stub: silent placeholder when Audiocraft is not installed
-        out_path.write_bytes(b"\x00")
-        return out_path
+        for out_path in out_paths:
+            out_path.write_bytes(_STUB_CLIP)
+        return list(out_paths)
+
+    size = max(1, settings.sfx_batch_size)
+    final_paths: list[Path] = []
+    for start in range(0, len(prompts), size):
+        final_paths += await asyncio.to_thread(
+            _infer_batch, model, prompts[start:start + size], out_paths[start:start + size]
+        )
+    return final_paths
 
-    def _infer():
-        from audiocraft.data.audio import audio_write  # type: ignore
-        import torch
 
-        with torch.inference_mode():
-            wav = model.generate([prompt])  # shape: (1, 1, samples)
+async def _generate_sfx_audio(prompt: str, out_path: Path) -> Path:
+    """Generate SFX for one prompt. Returns the final saved file path (MP3 or WAV)."""
+    (final_path,) = await _generate_sfx_batch([prompt], [out_path])
+    return final_path
 
-        # audio_write saves as WAV; stem = path without extension
-        stem = str(out_path.with_suffix(""))
-        audio_write(
-            stem,
-            wav[0].cpu(),
-            model.sample_rate,
-            strategy="loudness",
-            loudness_compressor=True,
-        )
-        saved_wav = Path(stem + ".wav")
-        return _wav_to_mp3(saved_wav)
 
-    loop = asyncio.get_event_loop()
-    final_path = await loop.run_in_executor(None, _infer)
-    return final_path
+def _sfx_dir(comic_id: str) -> Path:
+    out_dir = Path(settings.storage_root) / comic_id / "audio" / "sfx"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    return out_dir
+
+
+def _save_remote_clip(panel: Panel, clip: bytes, out_dir: Path) -> str:
+    """Write a clip returned by the SFX API (MP3, or WAV without ffmpeg)."""
+    path = out_dir / f"{panel.panel_id}{_clip_suffix(clip)}"
+    path.write_bytes(clip)
+    return str(path)
 
 
 async def generate_sfx_for_panel(
@@ -131,35 +210,22 @@ async def generate_sfx_for_panel(
     prompt to the remote Colab SFX API server.  On failure the function falls
     back to local AudioGen inference automatically.
     """
-    out_dir = Path(settings.storage_root) / comic_id / "audio" / "sfx"
-    out_dir.mkdir(parents=True, exist_ok=True)
+    out_dir = _sfx_dir(comic_id)
 
     # ── Remote SFX API proxy path ─────────────────────────────────────────────
-    if settings.sfx_api_url:
-        import logging
-        import httpx as _httpx
-
+    if await sfx_client.available():
         try:
-            async with _httpx.AsyncClient(timeout=60.0) as client:
-                resp = await client.post(
-                    f"{settings.sfx_api_url.rstrip('/')}/generate-sfx",
-                    json={"prompt": sfx_prompt, "duration": _SFX_DURATION_SEC},
-                )
-                resp.raise_for_status()
-                mp3_path = out_dir / f"{panel.panel_id}.mp3"
-                mp3_path.write_bytes(resp.content)
-                panel.sfx_audio_path = str(mp3_path)
-                return str(mp3_path)
-        except _httpx.HTTPError as exc:
-            logging.warning(
-                "SFX API unavailable, falling back to local AudioGen: %s", exc
-            )
+            clip = await sfx_client.generate(sfx_prompt, _SFX_DURATION_SEC)
+        except SFXUnavailable as exc:
+            logger.warning("SFX API failed, falling back to local AudioGen: %s", exc)
+        else:
+            panel.sfx_audio_path = await asyncio.to_thread(_save_remote_clip, panel, clip, out_dir)
+            return panel.sfx_audio_path
         # Fall through to local inference
 
-    # ── Local AudioGen path (existing behaviour) ──────────────────────────────
-    # Use a WAV stem; _generate_sfx_audio will convert to MP3 if ffmpeg is available
-    out_path = out_dir / f"{panel.panel_id}.wav"
-    final_path = await _generate_sfx_audio(sfx_prompt, out_path)
+    # ── Local AudioGen path ───────────────────────────────────────────────────
+    # The encoder picks the final extension (.mp3, or .wav without an MP3 encoder)
+    final_path = await _generate_sfx_audio(sfx_prompt, out_dir / f"{panel.panel_id}.wav")
     panel.sfx_audio_path = str(final_path)
     return str(final_path)
 
@@ -170,9 +236,109 @@ async def generate_sfx_for_comic(comic: Comic, sfx_prompts: dict[str, str]) -> C
 
     *sfx_prompts* maps panel_id → prompt string (produced by the sound director
     agent). Panels without a prompt get a generic ambient fill.
+
+    With ``settings.sfx_cache_enabled``, prompts are normalised and each
+    distinct prompt is generated once: panels sharing a prompt — in this
+    comic or any earlier one — get a hardlink to the same cached clip
+    (storage/cache/sfx/).  Remaining prompts go to the remote SFX API when
+    one is configured and its circuit breaker is closed (see
+    ``backend.pipeline.sfx_client``); the rest are generated locally in
+    batches of ``settings.sfx_batch_size`` prompts.  Stub placeholder clips
+    are never cached.
     """
+    out_dir = _sfx_dir(comic.comic_id)
+    use_cache = settings.sfx_cache_enabled
+    hits = misses = 0
+
+    # key → (prompt, panels needing that clip); one generation per key
+    pending: dict[str, tuple[str, list[Panel]]] = {}
     for page in comic.pages:
         for panel in page.panels:
-            prompt = sfx_prompts.get(panel.panel_id, "soft ambient background, comic book")
-            await generate_sfx_for_panel(panel, prompt, comic.comic_id)
+            prompt = sfx_prompts.get(panel.panel_id, _DEFAULT_PROMPT)
+            if not use_cache:
+                pending[panel.panel_id] = (prompt, [panel])
+                continue
+            key = sfx_clip_key(prompt)
+            if key in pending:
+                hits += 1
+                pending[key][1].append(panel)
+                continue
+            dest = await asyncio.to_thread(_link_cached_clip, key, out_dir, panel.panel_id)
+            if dest is not None:
+                hits += 1
+                panel.sfx_audio_path = str(dest)
+                continue
+            misses += 1
+            pending[key] = (prompt, [panel])
+
+    # ── Generate one clip per pending prompt ──────────────────────────────────
+    generated: list[tuple[str, list[Panel], str]] = []   # (prompt, panels, path)
+    local: list[tuple[str, list[Panel]]] = list(pending.values())
+    if local and await sfx_client.available():
+        clips = await sfx_client.generate_many(
+            [prompt for prompt, _ in local], _SFX_DURATION_SEC
+        )
+        for (prompt, panels), clip in zip(local, clips):
+            if clip is not None:
+                path = await asyncio.to_thread(_save_remote_clip, panels[0], clip, out_dir)
+                generated.append((prompt, panels, path))
+        local = [job for job, clip in zip(local, clips) if clip is None]
+        if local:
+            logger.warning("SFX API failed for %d prompts; generating them locally", len(local))
+
+    if local:
+        final_paths = await _generate_sfx_batch(
+            [prompt for prompt, _ in local],
+            [out_dir / f"{panels[0].panel_id}.wav" for _, panels in local],
+        )
+        generated += [
+            (prompt, panels, str(path)) for (prompt, panels), path in zip(local, final_paths)
+        ]
+
+    # ── Store in the cache and link the clip for every panel sharing it ───────
+    for prompt, panels, path in generated:
+        first, *others = panels
+        first.sfx_audio_path = path
+        source = Path(path)
+        key = sfx_clip_key(prompt)
+        cached = use_cache and not await asyncio.to_thread(_is_stub, source)
+        if cached:
+            await asyncio.to_thread(_sfx_cache.link_from, key, source)
+        for panel in others:
+            dest = out_dir / f"{panel.panel_id}{source.suffix}"
+            if not (cached and await asyncio.to_thread(_sfx_cache.link_to, key, dest)):
+                # Stub, or evicted already (tiny cache) — copy the first panel's file
+                await asyncio.to_thread(shutil.copyfile, source, dest)
+            panel.sfx_audio_path = str(dest)
+
+    if use_cache:
+        _record_comic_stats(comic.comic_id, hits, misses)
     return comic
+
+
+def _record_comic_stats(comic_id: str, hits: int, misses: int) -> None:
+    lookups = hits + misses
+    stats = {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+    }
+    _comic_stats[comic_id] = stats
+    _comic_stats.move_to_end(comic_id)
+    while len(_comic_stats) > _COMIC_STATS_KEPT:
+        _comic_stats.popitem(last=False)
+    logger.info(
+        "SFX cache for comic %s: %d hits, %d misses (hit rate %.0f%%)",
+        comic_id, hits, misses, stats["hit_rate"] * 100,
+    )
+
+
+def sfx_cache_stats() -> dict:
+    """
+    Return SFX cache size and hit/miss counters, plus the per-comic hit rate
+    of the most recent comics processed by this worker.
+
+    Per-comic counts treat panels that reuse a prompt generated earlier in
+    the same comic as hits.
+    """
+    return {**_sfx_cache.stats(), "per_comic": dict(_comic_stats)}
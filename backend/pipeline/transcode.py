@@ -0,0 +1,168 @@
+"""
+Audio encoding for generated SFX clips.
+
+AudioGen returns float waveforms; they used to be written to a WAV by
+``audio_write`` and converted by one ``ffmpeg`` subprocess per clip, which
+for short clips cost more than generating them.  ``encode_clips`` encodes the
+in-memory waveforms directly on a bounded thread pool
+(``settings.sfx_transcode_workers``), using the first available encoder:
+
+1. ``lameenc`` — in-process MP3, no subprocess and no intermediate file;
+2. ``ffmpeg`` — raw PCM piped to stdin, MP3 written by ffmpeg (no WAV on
+   disk);
+3. WAV via the standard-library ``wave`` module, when neither is installed.
+
+Clips are ``.mp3`` with an MP3 encoder and ``.wav`` otherwise; a clip whose
+MP3 encode fails is also written as WAV, so callers go by the suffix of the
+path ``encode_clip`` returns.
+"""
+
+from __future__ import annotations
+
+import logging
+import shutil
+import subprocess
+import wave
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MP3_BITRATE_KBPS = 128
+
+_pool: Optional[ThreadPoolExecutor] = None
+_encoded: Counter = Counter()   # encoder name → clips encoded
+
+
+@lru_cache(maxsize=1)
+def _encoder() -> str:
+    """Pick the best available encoder once per process."""
+    try:
+        import lameenc  # type: ignore  # noqa: F401
+        return "lameenc"
+    except ImportError:
+        pass
+    if shutil.which("ffmpeg"):
+        return "ffmpeg"
+    logger.info("Neither lameenc nor ffmpeg is available; SFX clips are saved as WAV")
+    return "wav"
+
+
+def _to_pcm16(samples: np.ndarray) -> bytes:
+    """Float ``(channels, n)`` samples in [-1, 1] → interleaved 16-bit PCM."""
+    clipped = np.clip(samples, -1.0, 1.0)
+    return (clipped.T * 32767).astype("<i2").tobytes()
+
+
+def _encode_lameenc(pcm: bytes, channels: int, sample_rate: int) -> bytes:
+    import lameenc  # type: ignore
+
+    encoder = lameenc.Encoder()
+    encoder.set_bit_rate(_MP3_BITRATE_KBPS)
+    encoder.set_in_sample_rate(sample_rate)
+    encoder.set_channels(channels)
+    encoder.set_quality(2)
+    return bytes(encoder.encode(pcm) + encoder.flush())
+
+
+def _encode_ffmpeg(pcm: bytes, channels: int, sample_rate: int, dest: Path) -> None:
+    subprocess.run(
+        [
+            "ffmpeg", "-y", "-loglevel", "error",
+            "-f", "s16le", "-ar", str(sample_rate), "-ac", str(channels), "-i", "pipe:0",
+            "-b:a", f"{_MP3_BITRATE_KBPS}k", str(dest),
+        ],
+        input=pcm, check=True, capture_output=True,
+    )
+
+
+def _write_wav(pcm: bytes, channels: int, sample_rate: int, dest: Path) -> None:
+    with wave.open(str(dest), "wb") as out:
+        out.setnchannels(channels)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        out.writeframes(pcm)
+
+
+def _encode_mp3(encoder: str, pcm: bytes, channels: int, sample_rate: int, tmp: Path) -> None:
+    if encoder == "lameenc":
+        tmp.write_bytes(_encode_lameenc(pcm, channels, sample_rate))
+    else:
+        _encode_ffmpeg(pcm, channels, sample_rate, tmp)
+
+
+def encode_clip(samples: np.ndarray, sample_rate: int, dest: Path) -> Path:
+    """
+    Encode one waveform to *dest*, with its suffix replaced by ``.mp3`` or ``.wav``.
+
+    *samples* is a float array of shape ``(channels, n)`` or ``(n,)``.
+    Returns the written path.  The file appears atomically.  The clip is
+    WAV when no MP3 encoder is installed or the MP3 encoder fails.
+    """
+    samples = np.atleast_2d(np.asarray(samples, dtype=np.float32))
+    channels = samples.shape[0]
+    pcm = _to_pcm16(samples)
+    encoder = _encoder()
+    if encoder != "wav":
+        dest = dest.with_suffix(".mp3")
+        tmp = dest.with_name(f".{dest.name}.tmp{dest.suffix}")
+        try:
+            _encode_mp3(encoder, pcm, channels, sample_rate, tmp)
+            tmp.replace(dest)
+            _encoded[encoder] += 1
+            return dest
+        except Exception as exc:
+            stderr = getattr(exc, "stderr", None)
+            logger.warning(
+                "%s failed for %s (%s%s); writing WAV", encoder, dest.name, exc,
+                f": {stderr.decode(errors='replace').strip()}" if stderr else "",
+            )
+            _encoded[f"{encoder}_failed"] += 1
+        finally:
+            tmp.unlink(missing_ok=True)
+
+    dest = dest.with_suffix(".wav")
+    tmp = dest.with_name(f".{dest.name}.tmp{dest.suffix}")
+    try:
+        _write_wav(pcm, channels, sample_rate, tmp)
+        tmp.replace(dest)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    _encoded["wav"] += 1
+    return dest
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(
+            max_workers=max(1, settings.sfx_transcode_workers),
+            thread_name_prefix="transcode",
+        )
+    return _pool
+
+
+def encode_clips(clips: list[np.ndarray], sample_rate: int, dests: list[Path]) -> list[Path]:
+    """
+    Blocking: encode several waveforms concurrently on the transcode pool.
+
+    Returns the written paths, aligned with *dests*.
+    """
+    futures = [
+        _get_pool().submit(encode_clip, samples, sample_rate, dest)
+        for samples, dest in zip(clips, dests)
+    ]
+    return [future.result() for future in futures]
+
+
+def transcode_stats() -> dict:
+    """Return the active encoder and clips encoded per encoder by this process."""
+    return {"encoder": _encoder(), "encoded": dict(_encoded)}
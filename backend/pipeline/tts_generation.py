@@ -6,21 +6,73 @@ bubble. Audio is saved to storage/{comic_id}/audio/voice/{bubble_id}.mp3.
 
 The voice_id on each bubble's speaker, plus the emotion_tag, are passed as
 instructions to the TTS model.
+
+Bubbles are synthesised concurrently, at most ``settings.tts_concurrency`` at
+a time (pass a shared semaphore to bound a whole comic).  Audio is streamed
+to disk as it arrives; each path is derived from the bubble_id, so results
+never depend on completion order.
+
+Audio cache
+-----------
+Identical utterances — same TTS model, voice, emotion instruction and
+whitespace-normalised text — are synthesised once and shared across bubbles
+and comics through a content-addressed ``BlobCache`` (storage/cache/tts/).
+A bubble's file is a hardlink to the cached clip; concurrent requests for
+the same utterance wait for a single synthesis.  Case and punctuation are
+kept in the key because they change delivery ("no." vs "NO!").
 """
 
 from __future__ import annotations
 
-import base64
+import asyncio
+import re
 from pathlib import Path
+from typing import Optional, Union
 
-import httpx
-
+from backend.cache.blobs import BlobCache, content_key
 from backend.config import settings
-from backend.models import Bubble, Comic
-from backend.pipeline.openrouter_client import openrouter_client
+from backend.models import Bubble, Comic, Page, Speaker
+from backend.pipeline.concurrency import gather_bounded
+from backend.pipeline.openrouter_client import post_to_file
 
 _TTS_ENDPOINT = "/audio/speech"
 
+_audio_cache = BlobCache(
+    "tts",
+    max_bytes=lambda: settings.tts_cache_max_mb * 1024 * 1024,
+    suffix=".mp3",
+)
+
+# Cache key → synthesis in progress, so concurrent identical lines share it
+_in_flight: dict[str, asyncio.Future] = {}
+
+
+def utterance_key(model: str, voice_id: str, instruction: str, text: str) -> str:
+    """Content key for one synthesised line (whitespace-normalised text)."""
+    return content_key("tts", model, voice_id, instruction, re.sub(r"\s+", " ", text.strip()))
+
+
+async def _synthesise_cached(key: str, payload: dict, audio_path: Path) -> None:
+    """Place the audio for *key* at *audio_path*, synthesising it at most once."""
+    if await asyncio.to_thread(_audio_cache.link_to, key, audio_path):
+        return
+
+    # Someone is already synthesising this line: wait, then reuse their clip.
+    # If they failed or were cancelled, fall through and synthesise it here.
+    while (pending := _in_flight.get(key)) is not None:
+        await asyncio.wait([pending])
+        if await asyncio.to_thread(_audio_cache.link_to, key, audio_path):
+            return
+
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[key] = future
+    try:
+        await post_to_file(_TTS_ENDPOINT, payload, "tts", audio_path)
+        await asyncio.to_thread(_audio_cache.link_from, key, audio_path)
+    finally:
+        _in_flight.pop(key, None)
+        future.set_result(None)
+
 
 async def generate_tts_for_bubble(
     bubble: Bubble,
@@ -45,33 +97,71 @@ async def generate_tts_for_bubble(
         "response_format": "mp3",
     }
 
-    response = await openrouter_client.post(_TTS_ENDPOINT, json=payload)
-    response.raise_for_status()
-
     out_dir = Path(settings.storage_root) / comic_id / "audio" / "voice"
     out_dir.mkdir(parents=True, exist_ok=True)
     audio_path = out_dir / f"{bubble.bubble_id}.mp3"
-    audio_path.write_bytes(response.content)
+    if settings.tts_cache_enabled:
+        key = utterance_key(settings.tts_model, voice_id, instruction, bubble.text)
+        await _synthesise_cached(key, payload, audio_path)
+    else:
+        await post_to_file(_TTS_ENDPOINT, payload, "tts", audio_path)
 
     return str(audio_path)
 
 
+async def generate_tts_for_page(
+    page: Page,
+    speakers: list[Speaker],
+    comic_id: str,
+    limit: Optional[Union[int, asyncio.Semaphore]] = None,
+) -> Page:
+    """
+    Run TTS for every bubble on one page.
+
+    Bubbles are synthesised concurrently, at most *limit* at a time (default
+    ``settings.tts_concurrency``; pass a semaphore to share the limit across
+    pages).  Mutates bubble.tts_audio_path in place and returns the updated
+    page.
+    """
+    # Build speaker_id → voice_id lookup
+    voice_map = {s.speaker_id: s.voice_id for s in speakers}
+
+    spoken = [
+        bubble
+        for panel in page.panels
+        for bubble in panel.bubbles
+        if bubble.bubble_type.value not in ("sfx",)  # SFX text is not spoken
+    ]
+    paths = await gather_bounded(
+        (
+            generate_tts_for_bubble(
+                bubble, voice_map.get(bubble.speaker_id or "", "alloy"), comic_id
+            )
+            for bubble in spoken
+        ),
+        limit if limit is not None else settings.tts_concurrency,
+    )
+    for bubble, path in zip(spoken, paths):
+        bubble.tts_audio_path = path
+
+    return page
+
+
 async def generate_tts_for_comic(comic: Comic) -> Comic:
     """
     Run TTS for every bubble in the comic.
 
     Mutates bubble.tts_audio_path in place and returns the updated comic.
     """
-    # Build speaker_id → voice_id lookup
-    voice_map = {s.speaker_id: s.voice_id for s in comic.speakers}
-
-    for page in comic.pages:
-        for panel in page.panels:
-            for bubble in panel.bubbles:
-                if bubble.bubble_type.value in ("sfx",):
-                    continue  # SFX text is not spoken
-                voice_id = voice_map.get(bubble.speaker_id or "", "alloy")
-                path = await generate_tts_for_bubble(bubble, voice_id, comic.comic_id)
-                bubble.tts_audio_path = path
+    semaphore = asyncio.Semaphore(max(1, settings.tts_concurrency))
+    await asyncio.gather(*(
+        generate_tts_for_page(page, comic.speakers, comic.comic_id, semaphore)
+        for page in comic.pages
+    ))
 
     return comic
+
+
+def tts_cache_stats() -> dict:
+    """Return audio-cache size and this process's hit/miss counters."""
+    return _audio_cache.stats()
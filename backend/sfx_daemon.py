@@ -0,0 +1,329 @@
+"""
+Local SFX daemon — one AudioGen model shared by every backend worker.
+
+With ``start.sh --prod`` each uvicorn worker would otherwise lazy-load its own
+AudioGen model (hundreds of MB each) and run inference on its default thread
+pool, competing with the event loop and with the other workers.  This daemon
+is a separate process serving the same ``POST /generate-sfx`` API as the
+Colab SFX server (plus ``POST /generate-sfx-batch`` for several prompts per
+request), so the backend reaches it through the existing ``SFX_API_URL``
+path:
+
+    python -m backend.sfx_daemon            # listens on SFX_DAEMON_HOST:PORT
+    SFX_API_URL=http://127.0.0.1:8001       # in the backend's .env
+
+(``start.sh --sfx-daemon`` does both, and starts the backend only once
+``GET /health`` reports the model loaded.)
+
+Startup
+-------
+The server accepts requests straight away and loads AudioGen in the
+background; requests queue until it is ready.  ``GET /health`` answers
+``503`` until then, so a supervisor can wait for it.
+
+Batching
+--------
+Requests from every worker and comic go into one bounded queue.  The batcher
+takes the oldest request, then waits up to ``settings.sfx_daemon_max_wait_ms``
+for more, up to ``settings.sfx_batch_size`` prompts of the same duration, and
+runs them through the model in a single ``generate`` call.  Identical prompts
+in a batch are generated once.  Inference runs on a dedicated single-thread
+executor, so the model is never used concurrently and the event loop stays
+responsive.
+
+Backpressure
+------------
+When ``settings.sfx_daemon_queue_size`` prompts are already waiting, new
+requests (or batch requests that do not fit whole) get ``503`` with a
+``Retry-After`` header instead of queueing without bound; the backend client
+waits and retries.  Requests set aside for a later batch (a different
+duration) still count toward the limit, and durations are clamped to
+``settings.sfx_daemon_max_duration_sec`` so one request cannot tie up the
+model for minutes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import logging
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Callable, Optional
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+
+from backend.config import settings
+from backend.pipeline import sfx_generation
+
+logger = logging.getLogger(__name__)
+
+# Seconds a client is told to wait when the queue is full
+_RETRY_AFTER_SEC = 1
+
+
+def _infer_clips(prompts: list[str], duration: int) -> list[bytes]:
+    """Blocking: generate one clip per prompt and return the encoded audio."""
+    model = sfx_generation._load_model()
+    if model is None:
+        # Stub: silent placeholder when Audiocraft is not installed
+        return [sfx_generation._STUB_CLIP for _ in prompts]
+
+    model.set_generation_params(duration=duration)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        out_paths = [Path(tmpdir) / f"sfx_{i}.wav" for i in range(len(prompts))]
+        final_paths = sfx_generation._infer_batch(model, prompts, out_paths)
+        return [path.read_bytes() for path in final_paths]
+
+
+class _Request:
+    __slots__ = ("prompt", "duration", "future")
+
+    def __init__(self, prompt: str, duration: int, future: asyncio.Future) -> None:
+        self.prompt = prompt
+        self.duration = duration
+        self.future = future
+
+
+class SFXBatcher:
+    """Bounded request queue feeding dynamically sized AudioGen batches."""
+
+    def __init__(
+        self,
+        infer: Callable[[list[str], int], list[bytes]] = _infer_clips,
+    ) -> None:
+        self._infer = infer
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._held: deque[_Request] = deque()
+        # One thread: the model is not safe to call concurrently
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audiogen")
+        self.ready = False    # set once the model has loaded
+        self.batches = 0
+        self.clips = 0
+        self.rejected = 0
+
+    # ── Lifecycle ─────────────────────────────────────────────────────────────
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue(maxsize=max(1, settings.sfx_daemon_queue_size))
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ── Submission ────────────────────────────────────────────────────────────
+
+    def _reserve(self, n: int) -> None:
+        """Raise ``asyncio.QueueFull`` unless *n* more prompts fit, counting held requests."""
+        waiting = self._queue.qsize() + len(self._held)
+        if max(1, settings.sfx_daemon_queue_size) - waiting < n:
+            self.rejected += 1
+            raise asyncio.QueueFull
+
+    @staticmethod
+    def _clamp(duration: int) -> int:
+        return min(max(1, duration), max(1, settings.sfx_daemon_max_duration_sec))
+
+    async def generate(self, prompt: str, duration: int) -> bytes:
+        """
+        Queue one prompt and wait for its clip.
+
+        Raises ``asyncio.QueueFull`` when the queue is at capacity.
+        """
+        self._reserve(1)
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_Request(prompt, self._clamp(duration), future))
+        return await future
+
+    async def generate_many(self, prompts: list[str], duration: int) -> list[bytes]:
+        """
+        Queue several prompts at once and wait for all their clips.
+
+        All or nothing: raises ``asyncio.QueueFull`` unless every prompt fits.
+        """
+        self._reserve(len(prompts))
+        duration = self._clamp(duration)
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in prompts]
+        for prompt, future in zip(prompts, futures):
+            self._queue.put_nowait(_Request(prompt, duration, future))
+        return list(await asyncio.gather(*futures))
+
+    # ── Batching loop ─────────────────────────────────────────────────────────
+
+    async def _collect(self) -> list[_Request]:
+        """Wait for one request, then gather more until the batch is full or the window closes."""
+        first = self._held.popleft() if self._held else await self._queue.get()
+        batch = [first]
+        limit = max(1, settings.sfx_batch_size)
+
+        # Requests set aside by earlier batches go first
+        for request in list(self._held):
+            if len(batch) < limit and request.duration == first.duration:
+                self._held.remove(request)
+                batch.append(request)
+
+        deadline = time.monotonic() + settings.sfx_daemon_max_wait_ms / 1000
+        while len(batch) < limit:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if request.duration == first.duration:
+                batch.append(request)
+            else:
+                # A different duration needs its own generate() call
+                self._held.append(request)
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [r for r in await self._collect() if not r.future.done()]
+            if not batch:
+                continue
+            prompts = list(dict.fromkeys(r.prompt for r in batch))
+            try:
+                clips = await loop.run_in_executor(
+                    self._executor, self._infer, prompts, batch[0].duration
+                )
+            except asyncio.CancelledError:
+                for request in batch:
+                    request.future.cancel()
+                raise
+            except Exception as exc:
+                logger.exception("SFX batch of %d prompts failed", len(prompts))
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(exc)
+                continue
+
+            self.batches += 1
+            self.clips += len(prompts)
+            by_prompt = dict(zip(prompts, clips))
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_result(by_prompt[request.prompt])
+
+    # ── Stats ─────────────────────────────────────────────────────────────────
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "queued": (self._queue.qsize() if self._queue is not None else 0) + len(self._held),
+            "queue_size": settings.sfx_daemon_queue_size,
+            "batches": self.batches,
+            "clips": self.clips,
+            "avg_batch": round(self.clips / self.batches, 2) if self.batches else 0.0,
+            "rejected": self.rejected,
+        }
+
+
+# ── HTTP API ──────────────────────────────────────────────────────────────────
+
+batcher = SFXBatcher()
+
+
+class SFXRequest(BaseModel):
+    prompt: str = "ambient background"
+    duration: int = sfx_generation._SFX_DURATION_SEC
+
+
+async def _load_model() -> None:
+    """Load the model on the inference thread, ahead of any queued batch."""
+    try:
+        await asyncio.get_running_loop().run_in_executor(
+            batcher._executor, sfx_generation._load_model
+        )
+    except Exception:
+        logger.exception("Loading AudioGen failed")
+        return
+    batcher.ready = True
+    logger.info("SFX daemon ready")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    batcher.start()
+    # Load the model up front so the first request does not pay for it
+    loading = asyncio.create_task(_load_model())
+    yield
+    loading.cancel()
+    await batcher.stop()
+
+
+app = FastAPI(title="Comikry SFX daemon", lifespan=lifespan)
+
+
+@app.post("/generate-sfx")
+async def generate_sfx(body: SFXRequest):
+    """Generate one SFX clip and return the audio bytes (MP3, or WAV without ffmpeg)."""
+    try:
+        audio = await batcher.generate(body.prompt, body.duration)
+    except asyncio.QueueFull:
+        return JSONResponse(
+            {"detail": "SFX queue is full"},
+            status_code=503,
+            headers={"Retry-After": str(_RETRY_AFTER_SEC)},
+        )
+    media_type = "audio/wav" if audio[:4] == b"RIFF" else "audio/mpeg"
+    return Response(content=audio, media_type=media_type)
+
+
+class SFXBatchRequest(BaseModel):
+    prompts: list[str]
+    duration: int = sfx_generation._SFX_DURATION_SEC
+
+
+@app.post("/generate-sfx-batch")
+async def generate_sfx_batch(body: SFXBatchRequest):
+    """Generate several clips; returns ``{"clips": [base64 audio, ...]}`` in prompt order."""
+    try:
+        clips = await batcher.generate_many(body.prompts, body.duration)
+    except asyncio.QueueFull:
+        return JSONResponse(
+            {"detail": "SFX queue is full"},
+            status_code=503,
+            headers={"Retry-After": str(_RETRY_AFTER_SEC)},
+        )
+    return {"clips": [base64.b64encode(clip).decode() for clip in clips]}
+
+
+@app.get("/health")
+async def health():
+    """200 once the model is loaded; 503 while it is still loading."""
+    if not batcher.ready:
+        return JSONResponse(
+            {"ok": False, "detail": "loading model"},
+            status_code=503,
+            headers={"Retry-After": str(_RETRY_AFTER_SEC)},
+        )
+    return {"ok": True}
+
+
+@app.get("/stats")
+async def stats():
+    return batcher.stats()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    uvicorn.run(app, host=settings.sfx_daemon_host, port=settings.sfx_daemon_port)
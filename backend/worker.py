@@ -0,0 +1,110 @@
+"""
+Job queue workers.
+
+Each uvicorn process starts ``settings.job_workers_per_process`` worker loops
+from the FastAPI lifespan.  A loop polls the persistent queue
+(``backend.cache.jobs``), runs the claimed pipeline, and keeps its lease alive
+with a heartbeat while it runs.  The global ``settings.job_max_concurrent``
+limit is enforced by ``jobs.claim`` across every process sharing the storage
+volume.
+
+On shutdown running jobs are cancelled and released back to the queue so a
+surviving (or restarted) worker resumes them.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+
+from backend.cache import jobs, store
+from backend.config import settings
+from backend.models import Job
+from backend.orchestrator import run_pipeline
+
+logger = logging.getLogger(__name__)
+
+_worker_tasks: list[asyncio.Task] = []
+
+
+async def _heartbeat(job: Job, worker_id: str, pipeline: asyncio.Task) -> None:
+    """Renew the lease until cancelled; cancel the pipeline if it is lost."""
+    interval = max(1.0, settings.job_lease_seconds / 3)
+    while True:
+        await asyncio.sleep(interval)
+        if not await asyncio.to_thread(jobs.renew, job.job_id, worker_id):
+            logger.warning("Lost lease on job %s; cancelling pipeline", job.job_id)
+            pipeline.cancel()
+            return
+
+
+async def run_job(job: Job, worker_id: str) -> None:
+    """Run one claimed job to completion and record the outcome."""
+    record = store.load_record(job.comic_id)
+    if record is None:
+        await asyncio.to_thread(jobs.fail, job.job_id, worker_id, "Cache record not found")
+        return
+
+    pipeline = asyncio.create_task(
+        run_pipeline(
+            job.pdf_path,
+            job.comic_id,
+            record,
+            job.normalization_enabled,
+            job.title,
+            page_range=job.page_range,
+        )
+    )
+    heartbeat = asyncio.create_task(_heartbeat(job, worker_id, pipeline))
+    try:
+        await pipeline
+    except asyncio.CancelledError:
+        if heartbeat.done():
+            # Lease lost — another worker owns the job now
+            return
+        # Worker shutdown — hand the job back without burning an attempt
+        await asyncio.to_thread(jobs.release, job.job_id, worker_id)
+        raise
+    except Exception as exc:
+        logger.exception("Job %s (%s) failed", job.job_id, job.comic_id)
+        await asyncio.to_thread(jobs.fail, job.job_id, worker_id, str(exc))
+    else:
+        await asyncio.to_thread(jobs.complete, job.job_id, worker_id)
+    finally:
+        heartbeat.cancel()
+        if not pipeline.done():
+            pipeline.cancel()
+
+
+async def worker_loop(worker_id: str) -> None:
+    """Claim and run jobs until cancelled."""
+    while True:
+        try:
+            job = await asyncio.to_thread(jobs.claim, worker_id)
+        except Exception:
+            logger.exception("Worker %s failed to poll the job queue", worker_id)
+            job = None
+
+        if job is None:
+            await asyncio.sleep(settings.job_poll_interval)
+            continue
+
+        logger.info("Worker %s claimed job %s (%s)", worker_id, job.job_id, job.comic_id)
+        await run_job(job, worker_id)
+
+
+def start_workers() -> None:
+    """Start this process's worker loops (called from the app lifespan)."""
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    for n in range(settings.job_workers_per_process):
+        _worker_tasks.append(asyncio.create_task(worker_loop(f"{prefix}:{n}")))
+
+
+async def stop_workers() -> None:
+    """Cancel the worker loops, releasing any job they are running."""
+    for task in _worker_tasks:
+        task.cancel()
+    await asyncio.gather(*_worker_tasks, return_exceptions=True)
+    _worker_tasks.clear()
@@ -1,10 +1,14 @@
 #!/usr/bin/env bash
 # ─────────────────────────────────────────────────────────────
 #  Comikry — start script
-#  Usage: ./start.sh [--prod] [--host HOST] [--port PORT]
+#  Usage: ./start.sh [--prod] [--sfx-daemon] [--host HOST] [--port PORT]
 #
 #  Defaults: development mode on 0.0.0.0:8000
 #  Pass --prod for production (no auto-reload, 4 workers).
+#  Pass --sfx-daemon to run one shared AudioGen process for all workers
+#  (backend/sfx_daemon.py on 127.0.0.1:${SFX_DAEMON_PORT:-8001}); the
+#  backend starts once the daemon has loaded its model (at most
+#  ${SFX_DAEMON_START_TIMEOUT:-600} seconds).
 # ─────────────────────────────────────────────────────────────
 set -euo pipefail
 
@@ -15,11 +19,13 @@ cd "$SCRIPT_DIR"
 MODE="dev"
 HOST="0.0.0.0"
 PORT="8000"
+SFX_DAEMON="no"
 
 # ── Parse args ──────────────────────────────────────────────
 while [[ $# -gt 0 ]]; do
   case "$1" in
     --prod)   MODE="prod"; shift ;;
+    --sfx-daemon) SFX_DAEMON="yes"; shift ;;
     --host)   HOST="$2";   shift 2 ;;
     --port)   PORT="$2";   shift 2 ;;
     *)        echo "Unknown option: $1"; exit 1 ;;
@@ -66,18 +72,52 @@ fi
 # ── Storage dir ──────────────────────────────────────────────
 mkdir -p "$SCRIPT_DIR/storage"
 
+# ── Local SFX daemon (optional) ─────────────────────────────
+# Without the daemon the server replaces this shell; with it the shell stays
+# so the EXIT trap can stop the daemon when the server exits.
+EXEC="exec"
+if [[ "$SFX_DAEMON" == "yes" ]]; then
+  SFX_DAEMON_PORT="${SFX_DAEMON_PORT:-8001}"
+  echo "► Starting SFX daemon on 127.0.0.1:$SFX_DAEMON_PORT …"
+  SFX_DAEMON_HOST=127.0.0.1 SFX_DAEMON_PORT="$SFX_DAEMON_PORT" \
+    "$PYTHON" -m backend.sfx_daemon &
+  SFX_DAEMON_PID=$!
+  trap 'kill "$SFX_DAEMON_PID" 2>/dev/null || true' EXIT
+  EXEC=""
+
+  # Wait for /health → 200: if the backend probed the daemon while AudioGen
+  # was still loading, its circuit breaker would route SFX to a local model
+  # in every worker — exactly what the daemon is there to prevent.
+  echo "► Waiting for the SFX daemon to load its model …"
+  DEADLINE=$((SECONDS + ${SFX_DAEMON_START_TIMEOUT:-600}))
+  until "$PYTHON" -c "import sys, urllib.request; urllib.request.urlopen(sys.argv[1], timeout=2)" \
+      "http://127.0.0.1:$SFX_DAEMON_PORT/health" 2>/dev/null; do
+    if ! kill -0 "$SFX_DAEMON_PID" 2>/dev/null; then
+      echo "⚠️  The SFX daemon exited during startup."
+      exit 1
+    fi
+    if (( SECONDS >= DEADLINE )); then
+      echo "⚠️  The SFX daemon was not ready after ${SFX_DAEMON_START_TIMEOUT:-600}s."
+      exit 1
+    fi
+    sleep 1
+  done
+  # The environment takes precedence over .env
+  export SFX_API_URL="http://127.0.0.1:$SFX_DAEMON_PORT"
+fi
+
 # ── Launch ───────────────────────────────────────────────────
 echo ""
 if [[ "$MODE" == "prod" ]]; then
   echo "🚀  Starting Comikry in PRODUCTION mode on http://$HOST:$PORT"
-  exec "$UVICORN" backend.main:app \
+  $EXEC "$UVICORN" backend.main:app \
     --host "$HOST" \
     --port "$PORT" \
     --workers 4
 else
   echo "🚀  Starting Comikry in DEVELOPMENT mode on http://$HOST:$PORT"
   echo "    (auto-reload enabled — do not use in production)"
-  exec "$UVICORN" backend.main:app \
+  $EXEC "$UVICORN" backend.main:app \
     --host "$HOST" \
     --port "$PORT" \
     --reload
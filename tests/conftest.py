@@ -18,4 +18,8 @@ def tmp_storage(tmp_path, monkeypatch):
     importlib.reload(cfg)
     import backend.cache.store as cs
     importlib.reload(cs)
+    import backend.cache.jobs as cj
+    importlib.reload(cj)
+    import backend.cache.blobs as cb
+    importlib.reload(cb)
     yield tmp_path / "storage"
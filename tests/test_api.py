@@ -2,7 +2,9 @@
 API integration tests.
 
 Uses FastAPI's TestClient (sync) so no real HTTP calls or OpenRouter
-calls are made — pipeline stages are mocked out.
+calls are made.  The client is not used as a context manager, so the app
+lifespan (and with it the job queue workers) never starts — uploads stay
+queued.
 """
 
 from __future__ import annotations
@@ -22,10 +24,7 @@ def _fake_pdf_bytes() -> bytes:
     return b"%PDF-1.4 fake content for testing"
 
 
-@patch("backend.api.routes.asyncio.create_task")
-def test_upload_new_comic(mock_task, tmp_storage):
-    mock_task.return_value = AsyncMock()
-
+def test_upload_new_comic(tmp_storage):
     response = client.post(
         "/comics",
         files={"file": ("test.pdf", _fake_pdf_bytes(), "application/pdf")},
@@ -35,11 +34,16 @@ def test_upload_new_comic(mock_task, tmp_storage):
     assert "comic_id" in data
     assert data["cached"] is False
 
+    from backend.cache import jobs
+    assert jobs.is_active(data["comic_id"])
+
+    # The upload is stored in the comic folder and no spool file is left behind
+    source = tmp_storage / data["comic_id"] / "source.pdf"
+    assert source.read_bytes() == _fake_pdf_bytes()
+    assert list((tmp_storage / "uploads").iterdir()) == []
 
-@patch("backend.api.routes.asyncio.create_task")
-def test_upload_same_pdf_twice_returns_cached(mock_task, tmp_storage):
-    mock_task.return_value = AsyncMock()
 
+def test_upload_same_pdf_twice_returns_cached(tmp_storage):
     pdf = _fake_pdf_bytes()
 
     # First upload
@@ -59,6 +63,29 @@ def test_upload_same_pdf_twice_returns_cached(mock_task, tmp_storage):
     assert r2.status_code == 202
     assert r2.json()["cached"] is True
     assert r2.json()["comic_id"] == comic_id
+    assert list((tmp_storage / "uploads").iterdir()) == []
+
+
+def test_upload_rejects_out_of_range_priority(tmp_storage):
+    for priority in (-1, 11, 1_000_000):
+        r = client.post(
+            f"/comics?priority={priority}",
+            files={"file": ("a.pdf", _fake_pdf_bytes(), "application/pdf")},
+        )
+        assert r.status_code == 422
+    assert list((tmp_storage / "uploads").glob("*")) == []
+
+    r = client.post("/comics?priority=10", files={"file": ("a.pdf", _fake_pdf_bytes(), "application/pdf")})
+    assert r.status_code == 202
+
+
+def test_upload_removes_spool_when_record_creation_fails(tmp_storage):
+    from backend.cache import store
+
+    with patch.object(store, "create_record", side_effect=OSError("disk full")):
+        r = client.post("/comics", files={"file": ("a.pdf", _fake_pdf_bytes(), "application/pdf")})
+    assert r.status_code == 500
+    assert list((tmp_storage / "uploads").iterdir()) == []
 
 
 def test_status_not_found(tmp_storage):
@@ -66,10 +93,7 @@ def test_status_not_found(tmp_storage):
     assert r.status_code == 404
 
 
-@patch("backend.api.routes.asyncio.create_task")
-def test_status_returns_stage(mock_task, tmp_storage):
-    mock_task.return_value = AsyncMock()
-
+def test_status_returns_stage(tmp_storage):
     r = client.post("/comics", files={"file": ("b.pdf", _fake_pdf_bytes(), "application/pdf")})
     comic_id = r.json()["comic_id"]
 
@@ -77,6 +101,7 @@ def test_status_returns_stage(mock_task, tmp_storage):
     assert status.status_code == 200
     assert "stage" in status.json()
     assert "progress_pct" in status.json()
+    assert status.json()["queue_position"] == 0
 
 
 def test_manifest_before_done_returns_409(tmp_storage):
@@ -4,8 +4,10 @@ from __future__ import annotations
 
 from pathlib import Path
 
-from backend.cache import store
-from backend.models import ProcessingStage
+import pytest
+
+from backend.cache import jobs, store
+from backend.models import JobStatus, ProcessingStage
 
 
 def test_hash_pdf_stable():
@@ -17,6 +19,24 @@ def test_hash_pdf_differs():
     assert store.hash_pdf(b"aaa") != store.hash_pdf(b"bbb")
 
 
+@pytest.mark.asyncio
+async def test_spool_pdf_hashes_incrementally(tmp_storage):
+    data = b"%PDF-1.4 " + b"x" * 10_000
+
+    async def chunks():
+        for i in range(0, len(data), 4096):
+            yield data[i:i + 4096]
+
+    spool_path, digest = await store.spool_pdf(chunks())
+    assert digest == store.hash_pdf(data)
+    assert spool_path.read_bytes() == data
+
+    dest = store.adopt_source_pdf(spool_path, "spooled_comic")
+    assert dest == tmp_storage / "spooled_comic" / "source.pdf"
+    assert dest.read_bytes() == data
+    assert not spool_path.exists()
+
+
 def test_create_and_lookup_record(tmp_storage):
     record = store.create_record("abc123", title="My Comic")
     store.save_record(record)
@@ -59,6 +79,35 @@ def test_token_lookup(tmp_storage):
     assert found.comic_id == record.comic_id
 
 
+def test_lookup_by_hash_returns_newest_record(tmp_storage):
+    first = store.create_record("same_hash")
+    store.save_record(first)
+    second = store.create_record("same_hash")
+    store.save_record(second)
+
+    assert store.lookup_by_hash("same_hash") == second.comic_id
+
+
+def test_legacy_json_index_is_migrated_once(tmp_storage):
+    import json
+
+    # Legacy layout: index.json + cache_record.json, no index.db
+    record = store.create_record("legacy_hash")
+    store.save_record(record)
+    store._INDEX_DB.unlink()
+    for suffix in ("-wal", "-shm"):
+        Path(str(store._INDEX_DB) + suffix).unlink(missing_ok=True)
+    store._LEGACY_INDEX_FILE.write_text(json.dumps({"legacy_hash": record.comic_id}))
+    store._migration_checked.clear()
+    from backend.cache import db
+    db._initialised.clear()
+
+    assert store.lookup_by_hash("legacy_hash") == record.comic_id
+    assert store.load_record_by_token(record.playback_token).comic_id == record.comic_id
+    assert not store._LEGACY_INDEX_FILE.exists()
+    assert store._LEGACY_INDEX_FILE.with_name("index.json.migrated").exists()
+
+
 def test_save_and_load_manifest(tmp_storage):
     from backend.models import Comic
 
@@ -71,3 +120,112 @@ def test_save_and_load_manifest(tmp_storage):
     loaded = store.load_manifest(record.comic_id)
     assert loaded is not None
     assert loaded.pdf_hash == "hash4"
+
+
+# ── Job queue ─────────────────────────────────────────────────────────────────
+
+def test_job_claim_order_by_priority_then_fifo(tmp_storage, monkeypatch):
+    monkeypatch.setattr(jobs.settings, "job_max_concurrent", 10)
+    first = jobs.enqueue("c1", "/tmp/a.pdf")
+    urgent = jobs.enqueue("c2", "/tmp/b.pdf", priority=5)
+    second = jobs.enqueue("c3", "/tmp/c.pdf")
+
+    claimed = [jobs.claim("w1").job_id for _ in range(3)]
+    assert claimed == [urgent.job_id, first.job_id, second.job_id]
+    assert jobs.claim("w1") is None
+
+
+def test_job_claim_respects_max_concurrent(tmp_storage, monkeypatch):
+    monkeypatch.setattr(jobs.settings, "job_max_concurrent", 1)
+    jobs.enqueue("c1", "/tmp/a.pdf")
+    jobs.enqueue("c2", "/tmp/b.pdf")
+
+    job = jobs.claim("w1")
+    assert job is not None
+    assert jobs.claim("w2") is None  # limit reached
+
+    jobs.complete(job.job_id, "w1")
+    assert jobs.claim("w2").comic_id == "c2"
+
+
+def test_job_expired_lease_is_reclaimed(tmp_storage, monkeypatch):
+    monkeypatch.setattr(jobs.settings, "job_max_concurrent", 1)
+    monkeypatch.setattr(jobs.settings, "job_lease_seconds", -1)  # expires immediately
+    jobs.enqueue("c1", "/tmp/a.pdf", page_range=(2, 4))
+
+    lost = jobs.claim("dead-worker")
+    assert not jobs.renew(lost.job_id, "other-worker")
+
+    reclaimed = jobs.claim("w2")
+    assert reclaimed.job_id == lost.job_id
+    assert reclaimed.attempts == 2
+    assert reclaimed.page_range == (2, 4)
+
+
+def test_job_fails_after_max_attempts(tmp_storage, monkeypatch):
+    monkeypatch.setattr(jobs.settings, "job_lease_seconds", -1)
+    monkeypatch.setattr(jobs.settings, "job_max_attempts", 1)
+    record = store.create_record("hash_jobs")
+    store.save_record(record)
+    job = jobs.enqueue(record.comic_id, "/tmp/a.pdf")
+
+    jobs.claim("dead-worker")
+    assert jobs.claim("w2") is None
+
+    assert jobs.get_job(job.job_id).status == JobStatus.failed
+    assert store.load_record(record.comic_id).processing_stage == ProcessingStage.failed
+
+
+def test_job_release_returns_to_queue(tmp_storage):
+    job = jobs.enqueue("c1", "/tmp/a.pdf")
+    jobs.claim("w1")
+    assert jobs.queue_position("c1") is None
+
+    jobs.release(job.job_id, "w1")
+    assert jobs.queue_position("c1") == 0
+    assert jobs.get_job(job.job_id).attempts == 0
+
+
+# ── Content-addressed blob cache ──────────────────────────────────────────────
+
+def test_blob_cache_round_trip_and_stats(tmp_storage):
+    from backend.cache.blobs import BlobCache, content_key
+
+    cache = BlobCache("test", max_bytes=lambda: 1024)
+    key = content_key("model", [{"role": "user", "content": "hi"}], {})
+    assert key == content_key("model", [{"content": "hi", "role": "user"}], {})
+
+    assert cache.get_bytes(key) is None
+    cache.put_bytes(key, b"payload")
+    assert cache.get_bytes(key) == b"payload"
+
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_blob_cache_evicts_least_recently_used(tmp_storage):
+    from backend.cache.blobs import BlobCache
+
+    cache = BlobCache("lru", max_bytes=lambda: 20)
+    cache.put_bytes("aa01", b"x" * 8)
+    cache.put_bytes("bb02", b"x" * 8)
+    cache.get_path("aa01")              # aa01 is now more recent than bb02
+    cache.put_bytes("cc03", b"x" * 8)   # 24 bytes > 20 → evict bb02
+
+    assert cache.get_path("bb02") is None
+    assert cache.get_path("aa01") is not None
+    assert cache.get_path("cc03") is not None
+    assert not cache.path_for("bb02").exists()
+
+
+def test_file_digest_matches_sha256_of_contents(tmp_path):
+    """file_digest hashes in chunks and agrees with a one-shot SHA-256."""
+    import hashlib
+    from backend.cache.blobs import file_digest
+
+    data = bytes(range(256)) * 9000   # spans several read chunks
+    path = tmp_path / "blob.bin"
+    path.write_bytes(data)
+    assert file_digest(path) == hashlib.sha256(data).hexdigest()
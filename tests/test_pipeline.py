@@ -3,6 +3,8 @@
 from __future__ import annotations
 
 import asyncio
+import io
+import json
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, patch
@@ -48,6 +50,56 @@ def test_assign_voices_multiple():
     assert voice_ids == ["onyx", "coral", "sage"]
 
 
+# ── Batched emotion tagging tests ─────────────────────────────────────────────
+
+def test_pack_by_token_budget_respects_budget_and_order():
+    """Batches stay under the budget (prompt included) and keep bubble order."""
+    import json as _json
+    from backend.agents.voice_tone_agent import (
+        _EMOTION_SYSTEM_PROMPT, _estimate_tokens, pack_by_token_budget,
+    )
+
+    items = [{"bubble_id": f"b{n}", "text": "x" * 200, "speaker": "A"} for n in range(20)]
+    budget = _estimate_tokens(_EMOTION_SYSTEM_PROMPT) + 200
+
+    batches = pack_by_token_budget(items, budget)
+
+    assert len(batches) > 1
+    assert [i for batch in batches for i in batch] == items
+    for batch in batches:
+        assert sum(_estimate_tokens(_json.dumps(i)) for i in batch) <= 200
+
+
+@pytest.mark.asyncio
+async def test_tag_emotions_batches_across_panels(monkeypatch):
+    """Bubbles from many panels share requests and are merged back by bubble_id."""
+    import json as _json
+    import backend.agents.voice_tone_agent as vta
+    from backend.models import BBox, Bubble
+
+    monkeypatch.setattr(vta.settings, "emotion_batch_token_budget", 10_000)
+    bubbles = [
+        Bubble(bubble_id=f"p{n}_b1", order_index=1, bbox=BBox(x=0, y=0, w=1, h=1), text=f"line {n}")
+        for n in range(30)
+    ]
+
+    async def fake_chat(model, messages, **kwargs):
+        sent = _json.loads(messages[1]["content"])
+        reply = [{"bubble_id": b["bubble_id"], "emotion": "happy"} for b in sent]
+        return {"choices": [{"message": {"content": _json.dumps(reply)}}]}
+
+    with patch.object(vta, "chat_completion", side_effect=fake_chat) as chat:
+        await vta.tag_emotions(bubbles, [])
+
+    assert chat.await_count == 1
+    assert {b.emotion_tag for b in bubbles} == {"happy"}
+
+    monkeypatch.setattr(vta.settings, "emotion_batch_token_budget", 400)
+    with patch.object(vta, "chat_completion", side_effect=fake_chat) as chat:
+        await vta.tag_emotions(bubbles, [])
+    assert 1 < chat.await_count < len(bubbles)
+
+
 # ── Task 2-8: Gemini Files API tests ─────────────────────────────────────────
 
 @pytest.mark.asyncio
@@ -268,6 +320,229 @@ def test_render_pdf_with_page_range(monkeypatch, tmp_path):
     assert len(result) == 4
 
 
+def test_render_batch_renames_rasterizer_output_without_pil(monkeypatch, tmp_path):
+    """_render_batch() asks for paths only and renames them to page_NNNN.png."""
+    import backend.pipeline.pdf_to_images as pdf_mod
+
+    monkeypatch.setattr(pdf_mod.settings, "pdf_extract_embedded_images", False)
+
+    def fake_convert(pdf_path, **kwargs):
+        assert kwargs["paths_only"] is True
+        assert kwargs["output_folder"] == str(tmp_path)
+        paths = []
+        for n in range(kwargs["first_page"], kwargs["last_page"] + 1):
+            p = tmp_path / f"{kwargs['output_file']}0001-{n:02d}.png"
+            p.write_bytes(b"png")
+            paths.append(str(p))
+        return paths
+
+    with patch("pdf2image.convert_from_path", side_effect=fake_convert):
+        saved = pdf_mod._render_batch("fake.pdf", str(tmp_path), 9, 11, 72)
+
+    assert [Path(p).name for p in saved] == ["page_0009.png", "page_0010.png", "page_0011.png"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [Path(p).name for p in saved]
+
+
+_PDFIMAGES_LIST = """\
+page   num  type   width height color comp bpc  enc interp  object ID x-ppi y-ppi size ratio
+--------------------------------------------------------------------------------------------
+   1     0 image    1275  1650  rgb     3   8  jpeg   no         9  0   150   150  412K 6.7%
+   2     1 image    1275  1650  rgb     3   8  jpeg   no        14  0   150   150  398K 6.5%
+   2     2 smask    1275  1650  gray    1   8  image  no        14  0   150   150   12K 0.6%
+   3     3 image     300   200  rgb     3   8  jpeg   no        19  0   150   150   20K 3.0%
+   4     4 image    1275  1650  cmyk    4   8  jpeg   no        24  0   150   150  500K 6.0%
+   5     5 image    1275  1650  rgb     3   8  image  no        29  0   150   150  2.1M  35%
+   6     6 image    1650  1275  gray    1   8  jpeg   no        34  0   150   150  300K 14%
+"""
+
+
+def test_single_jpeg_pages_accepts_only_full_page_rgb_or_gray_jpegs():
+    """Masks, small images, CMYK and non-DCT images all fall back to rasterizing."""
+    from backend.pipeline.pdf_to_images import _single_jpeg_pages
+
+    letter = (612.0, 792.0)   # 1275 px / 150 ppi * 72 = 612 pt
+    sizes = {n: letter for n in range(1, 7)}
+
+    # Page 6 is the same image placed rotated (landscape on a portrait page)
+    assert _single_jpeg_pages(_PDFIMAGES_LIST, sizes) == {1}
+
+
+def test_page_sizes_leaves_out_rotated_pages():
+    """Pages with /Rotate are not offered to the JPEG fast path."""
+    from backend.pipeline.pdf_to_images import _page_sizes
+
+    info = (
+        "Page    1 size: 612 x 792 pts (letter)\nPage    1 rot:  0\n"
+        "Page    2 size: 612 x 792 pts (letter)\nPage    2 rot:  90\n"
+    )
+    with patch("subprocess.run", return_value=MagicMock(stdout=info)):
+        assert _page_sizes("fake.pdf", 1, 2) == {1: (612.0, 792.0)}
+
+
+_SVG_IMAGE_ONLY = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="612pt" height="792pt" viewBox="0 0 612 792">
+<defs>
+<clipPath id="clip-0"><path d="M 0 0 L 612 0 L 612 792 L 0 792 Z"/></clipPath>
+<image id="source-5" x="0" y="0" width="1275" height="1650" xlink:href="data:image/jpeg;base64,/9j/"/>
+</defs>
+<g clip-path="url(#clip-0)">
+<use xlink:href="#source-5" transform="matrix(0.48,0,0,0.48,0,0)"/>
+</g>
+</svg>
+"""
+
+_SVG_IMAGE_WITH_BALLOON = _SVG_IMAGE_ONLY.replace(
+    "</g>\n</svg>",
+    '<path fill="white" stroke="black" d="M 100 100 C 150 80 200 120 100 100 Z"/>\n</g>\n</svg>',
+)
+
+
+def test_svg_draws_only_one_image_rejects_overlays():
+    """Only pages that draw their image and nothing else qualify."""
+    from backend.pipeline.pdf_to_images import _svg_draws_only_one_image
+
+    glyphs = _SVG_IMAGE_ONLY.replace(
+        "</defs>",
+        '<g><symbol id="glyph-0-1"><path d="M 1 1 L 2 2 Z"/></symbol></g>\n</defs>',
+    ).replace("</g>\n</svg>", '<use xlink:href="#glyph-0-1" x="90" y="120"/>\n</g>\n</svg>')
+
+    assert _svg_draws_only_one_image(_SVG_IMAGE_ONLY)
+    assert not _svg_draws_only_one_image(_SVG_IMAGE_WITH_BALLOON)
+    assert not _svg_draws_only_one_image(glyphs)
+
+
+def test_render_batch_rasterizes_jpeg_pages_with_overlays(monkeypatch, tmp_path):
+    """A full-page JPEG with lettering or balloons on top is rasterized, not copied."""
+    import backend.pipeline.pdf_to_images as pdf_mod
+
+    monkeypatch.setattr(pdf_mod.settings, "pdf_extract_embedded_images", True)
+    image_list = "\n".join(_PDFIMAGES_LIST.splitlines()[:3]) + "\n" + "\n".join(
+        f"   {n}     {n} image    1275  1650  rgb     3   8  jpeg   no         9  0   150   150  412K 6.7%"
+        for n in (2, 3)
+    )
+    info = "".join(f"Page    {n} size: 612 x 792 pts (letter)\nPage    {n} rot:  0\n" for n in (1, 2, 3))
+    svgs = {"1": _SVG_IMAGE_ONLY, "2": _SVG_IMAGE_ONLY, "3": _SVG_IMAGE_WITH_BALLOON}
+
+    def fake_run(cmd, **kwargs):
+        tool = cmd[0]
+        if tool == "pdfimages" and "-list" in cmd:
+            return MagicMock(stdout=image_list)
+        if tool == "pdfinfo":
+            return MagicMock(stdout=info)
+        if tool == "pdftotext":
+            # Page 2's dialogue is real text over the art
+            return MagicMock(stdout="\f WHERE IS SHE?\n\f\f")
+        if tool == "pdftocairo":
+            return MagicMock(stdout=svgs[cmd[cmd.index("-f") + 1]])
+        if tool == "pdfimages":
+            Path(f"{cmd[-1]}-000.jpg").write_bytes(b"\xff\xd8jpeg")
+            return MagicMock()
+        raise AssertionError(cmd)
+
+    rasterized: list[int] = []
+
+    def fake_rasterize(pdf_path, out, first, last, dpi):
+        rasterized.extend(range(first, last + 1))
+        return {n: str(out / f"page_{n:04d}.png") for n in range(first, last + 1)}
+
+    with patch.object(pdf_mod.subprocess, "run", side_effect=fake_run), \
+         patch.object(pdf_mod, "_rasterize", side_effect=fake_rasterize):
+        saved = pdf_mod._render_batch("fake.pdf", str(tmp_path), 1, 3, 72)
+
+    assert rasterized == [2, 3]
+    assert [Path(p).name for p in saved] == ["page_0001.jpg", "page_0002.png", "page_0003.png"]
+
+
+def test_render_batch_extracts_jpeg_pages_and_rasterizes_the_rest(monkeypatch, tmp_path):
+    """Pages not extracted are rasterized in contiguous runs; output stays in page order."""
+    import backend.pipeline.pdf_to_images as pdf_mod
+
+    monkeypatch.setattr(pdf_mod.settings, "pdf_extract_embedded_images", True)
+    runs: list[tuple[int, int]] = []
+
+    def fake_rasterize(pdf_path, out, first, last, dpi):
+        runs.append((first, last))
+        return {n: str(out / f"page_{n:04d}.png") for n in range(first, last + 1)}
+
+    extracted = {n: str(tmp_path / f"page_{n:04d}.jpg") for n in (2, 3, 6)}
+    with patch.object(pdf_mod, "_extract_single_jpegs", return_value=extracted), \
+         patch.object(pdf_mod, "_rasterize", side_effect=fake_rasterize):
+        saved = pdf_mod._render_batch("fake.pdf", str(tmp_path), 1, 7, 72)
+
+    assert runs == [(1, 1), (4, 5), (7, 7)]
+    assert [Path(p).name for p in saved] == [
+        "page_0001.png", "page_0002.jpg", "page_0003.jpg", "page_0004.png",
+        "page_0005.png", "page_0006.jpg", "page_0007.png",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_render_pdf_stream_yields_pages_in_order(monkeypatch, tmp_path):
+    """render_pdf_stream() yields every page in order, batch by batch."""
+    import backend.pipeline.pdf_to_images as pdf_mod
+
+    monkeypatch.setattr(pdf_mod.settings, "pdf_render_batch_size", 2)
+    monkeypatch.setattr(pdf_mod.settings, "storage_root", str(tmp_path))
+
+    submitted: list[tuple[int, int]] = []
+
+    def fake_submit(owner, fn, pdf_path, out_dir, first_page, last_page, dpi):
+        assert owner == "stream_comic"
+        submitted.append((first_page, last_page))
+        future = asyncio.get_running_loop().create_future()
+        # Batches return their pages out of order; the stream must sort them
+        future.set_result([
+            str(Path(out_dir) / f"page_{n:04d}.png")
+            for n in range(last_page, first_page - 1, -1)
+        ])
+        return future
+
+    fake_pool = MagicMock()
+    fake_pool.submit.side_effect = fake_submit
+
+    with patch("backend.pipeline.pdf_to_images.pdfinfo_from_path", return_value={"Pages": 10}), \
+         patch.object(pdf_mod, "get_render_pool", return_value=fake_pool):
+        result = [p async for p in pdf_mod.render_pdf_stream("fake.pdf", "stream_comic", (3, 7))]
+
+    assert submitted == [(3, 4), (5, 6), (7, 7)]
+    assert [int(Path(p).stem.split("_")[-1]) for p in result] == [3, 4, 5, 6, 7]
+
+
+@pytest.mark.asyncio
+async def test_render_pool_caps_workers_and_round_robins_owners(monkeypatch):
+    """The shared pool runs at most max_workers jobs and interleaves comics fairly."""
+    import concurrent.futures
+    import backend.pipeline.render_pool as rp
+
+    monkeypatch.setattr(rp.settings, "pdf_render_max_workers", 1)
+    started: list[str] = []
+    pending: list[concurrent.futures.Future] = []
+
+    def fake_submit(fn, *args):
+        started.append(args[0])
+        future = concurrent.futures.Future()
+        pending.append(future)
+        return future
+
+    with patch.object(rp, "ProcessPoolExecutor") as mock_executor_cls:
+        mock_executor_cls.return_value.submit.side_effect = fake_submit
+        pool = rp.RenderPool()
+        results = [pool.submit("big", str, f"big{n}") for n in range(3)]
+        results.append(pool.submit("small", str, "small0"))
+
+        while len(started) < 4:
+            assert len(pending) - sum(f.done() for f in pending) == 1  # cap of 1
+            pending[len(started) - 1].set_result(started[-1])
+            await asyncio.sleep(0.01)
+        pending[-1].set_result(started[-1])
+
+        assert await asyncio.gather(*results) == ["big0", "big1", "big2", "small0"]
+
+    # "small" is served right after the batch already running, not after all of "big"
+    assert started == ["big0", "big1", "small0", "big2"]
+    assert mock_executor_cls.call_count == 1
+
+
 # ── Task 4-6: Track B tests ───────────────────────────────────────────────────
 
 @pytest.mark.asyncio
@@ -343,12 +618,17 @@ async def test_orchestrator_continues_when_track_b_raises(monkeypatch, tmp_path)
     async def raise_always(*a, **kw):
         raise RuntimeError("Track B boom")
 
-    with patch.object(orch_mod, "render_pdf", return_value=fake_pages), \
+    async def fake_render_stream(*a, **kw):
+        for p in fake_pages:
+            yield p
+
+    with patch.object(orch_mod, "resolve_page_range", return_value=(1, 2)), \
+         patch.object(orch_mod, "render_pdf_stream", fake_render_stream), \
          patch.object(orch_mod, "detect_panels", new_callable=AsyncMock, return_value=[]), \
          patch.object(orch_mod, "detect_bubbles", new_callable=AsyncMock, return_value=[]), \
          patch.object(orch_mod, "attribute_speakers", new_callable=AsyncMock, return_value=([], [])), \
-         patch.object(orch_mod, "run_voice_tone_agent", new_callable=AsyncMock, return_value=fake_comic), \
-         patch.object(orch_mod, "generate_tts_for_comic", new_callable=AsyncMock, return_value=fake_comic), \
+         patch.object(orch_mod, "run_voice_tone_agent_for_page", new_callable=AsyncMock), \
+         patch.object(orch_mod, "generate_tts_for_page", new_callable=AsyncMock), \
          patch.object(orch_mod, "generate_sfx_prompts", new_callable=AsyncMock, return_value={}), \
          patch.object(orch_mod, "generate_sfx_for_comic", new_callable=AsyncMock, return_value=fake_comic), \
          patch.object(orch_mod, "normalise_comic_panels", new_callable=AsyncMock, return_value=fake_comic), \
@@ -367,6 +647,60 @@ async def test_orchestrator_continues_when_track_b_raises(monkeypatch, tmp_path)
     assert result is not None
 
 
+@pytest.mark.asyncio
+async def test_orchestrator_starts_track_b_when_rendering_finishes(monkeypatch, tmp_path):
+    """Track B launches after the last render, not when slow stages drain the render queue."""
+    monkeypatch.setenv("STORAGE_ROOT", str(tmp_path / "storage"))
+
+    import importlib
+    import backend.config as cfg
+    importlib.reload(cfg)
+    import backend.cache.store as cs
+    importlib.reload(cs)
+    import backend.orchestrator as orch_mod
+    importlib.reload(orch_mod)
+
+    from backend.cache.store import create_record
+    from backend.models import Comic
+
+    monkeypatch.setattr(orch_mod.settings, "pipeline_queue_size", 1)
+    monkeypatch.setattr(orch_mod.settings, "panel_detection_concurrency", 1)
+    record = create_record("ab" * 32)
+    pages = [str(tmp_path / f"page_{i:04d}.png") for i in range(1, 9)]
+    events: list[str] = []
+
+    async def fake_render_stream(*a, **kw):
+        for p in pages:
+            yield p
+        events.append("rendered")
+
+    async def slow_detect(image_path, page_id, comic_id):
+        await asyncio.sleep(0.01)
+        events.append("panels")
+        return []
+
+    async def fake_track_b(*a, **kw):
+        events.append("track_b")
+        return None
+
+    fake_comic = Comic(comic_id=record.comic_id, pdf_hash=record.pdf_hash)
+    with patch.object(orch_mod, "resolve_page_range", return_value=(1, 8)), \
+         patch.object(orch_mod, "render_pdf_stream", fake_render_stream), \
+         patch.object(orch_mod, "detect_panels", side_effect=slow_detect), \
+         patch.object(orch_mod, "detect_bubbles", new_callable=AsyncMock, return_value=[]), \
+         patch.object(orch_mod, "attribute_speakers", new_callable=AsyncMock, return_value=([], [])), \
+         patch.object(orch_mod, "run_voice_tone_agent_for_page", new_callable=AsyncMock), \
+         patch.object(orch_mod, "generate_tts_for_page", new_callable=AsyncMock), \
+         patch.object(orch_mod, "generate_sfx_prompts", new_callable=AsyncMock, return_value={}), \
+         patch.object(orch_mod, "generate_sfx_for_comic", new_callable=AsyncMock, return_value=fake_comic), \
+         patch("backend.pipeline.track_b.run_track_b", side_effect=fake_track_b), \
+         patch.object(orch_mod, "store"):
+        await orch_mod.run_pipeline("fake.pdf", record.comic_id, record)
+
+    assert events.index("track_b") < events.index("panels") + 2
+    assert events.count("panels") == 8
+
+
 @pytest.mark.asyncio
 async def test_story_bible_written_to_correct_path(monkeypatch, tmp_path):
     """story_bible.json is written to storage/{comic_id}/story_bible.json."""
@@ -412,3 +746,1113 @@ async def test_story_bible_written_to_correct_path(monkeypatch, tmp_path):
     data = _json.loads(expected_path.read_text())
     assert data["comic_id"] == comic_id
     assert result.comic_id == comic_id
+
+
+# ── Local panel segmentation tests ────────────────────────────────────────────
+
+def _draw_page(path: Path, panels: list[tuple[int, int, int, int]]) -> None:
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", (600, 900), "white")
+    draw = ImageDraw.Draw(img)
+    for box in panels:
+        draw.rectangle(box, outline="black", width=4, fill=(180, 180, 180))
+    img.save(path)
+
+
+def test_segment_panels_finds_gutter_grid_in_reading_order(tmp_path):
+    """Clean white gutters give confident boxes, tiers top→bottom, panels left→right."""
+    from backend.pipeline.panel_segmenter import segment_panels
+
+    page = tmp_path / "page.png"
+    _draw_page(page, [(20, 20, 290, 430), (310, 20, 580, 430), (20, 450, 580, 880)])
+
+    boxes, confidence = segment_panels(str(page))
+
+    assert confidence >= 0.9
+    assert [(b.x, b.y) for b in boxes] == [(20, 20), (310, 20), (20, 450)]
+    assert all(abs(b.w - 271) <= 2 for b in boxes[:2])
+
+
+def test_segment_panels_low_confidence_for_splash_page(tmp_path):
+    """A page without gutters can't be judged locally."""
+    from backend.pipeline.panel_segmenter import segment_panels
+
+    page = tmp_path / "splash.png"
+    _draw_page(page, [(20, 20, 580, 880)])
+
+    _, confidence = segment_panels(str(page))
+    assert confidence < 0.75
+
+
+@pytest.mark.asyncio
+async def test_detect_panels_uses_model_only_when_local_result_is_unsure(monkeypatch, tmp_path):
+    """detect_panels() skips the vision call for confident local results."""
+    import backend.pipeline.panel_detection as pd
+    from backend.models import BBox
+
+    monkeypatch.setattr(pd.settings, "storage_root", str(tmp_path))
+    monkeypatch.setattr(pd.settings, "local_panel_detection", True)
+    monkeypatch.setattr(pd.settings, "local_panel_min_confidence", 0.75)
+    page = tmp_path / "page.png"
+    _draw_page(page, [(20, 20, 580, 880)])
+    local = [BBox(x=0, y=0, w=300, h=450), BBox(x=300, y=0, w=300, h=450)]
+    model = AsyncMock(return_value=[BBox(x=0, y=0, w=600, h=900)])
+
+    with patch.object(pd, "segment_panels", return_value=(local, 0.9)), \
+         patch.object(pd, "_detect_with_model", model):
+        panels = await pd.detect_panels(str(page), "c_pg0001", "c")
+    assert [p.bbox for p in panels] == local
+    assert [p.order_index for p in panels] == [1, 2]
+    model.assert_not_called()
+
+    with patch.object(pd, "segment_panels", return_value=(local, 0.4)), \
+         patch.object(pd, "_detect_with_model", model):
+        panels = await pd.detect_panels(str(page), "c_pg0001", "c")
+    assert [p.bbox for p in panels] == [BBox(x=0, y=0, w=600, h=900)]
+    model.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_analyse_page_returns_panels_with_panel_local_bubbles(monkeypatch, tmp_path):
+    """Combined mode: one call, bubbles mapped into (and clipped to) panel space."""
+    import json as _json
+    import backend.pipeline.page_analysis as pa
+
+    monkeypatch.setattr(pa.settings, "storage_root", str(tmp_path))
+    monkeypatch.setattr(pa.settings, "use_gemini_files_api", False)
+    page = tmp_path / "page.png"
+    _draw_page(page, [(20, 20, 290, 430), (310, 20, 580, 430)])
+
+    response = [
+        {"order": 2, "x": 310, "y": 20, "w": 270, "h": 410, "bubbles": [
+            {"order": 1, "type": "thought", "x": 560, "y": 400, "w": 60, "h": 60,
+             "text": "Hmm...", "confidence": 0.8},
+        ]},
+        {"order": 1, "x": 20, "y": 20, "w": 270, "h": 410, "bubbles": [
+            {"order": 2, "type": "speech", "x": 100, "y": 200, "w": 50, "h": 30, "text": "B"},
+            {"order": 1, "type": "speech", "x": 40, "y": 30, "w": 80, "h": 40, "text": "A"},
+        ]},
+    ]
+    chat = AsyncMock(return_value={"choices": [{"message": {"content": _json.dumps(response)}}]})
+
+    with patch.object(pa, "chat_completion", chat):
+        panels = await pa.analyse_page(str(page), "c_pg0001", "c")
+
+    chat.assert_awaited_once()
+    assert [p.panel_id for p in panels] == ["c_pg0001_p001", "c_pg0001_p002"]
+    assert [b.text for b in panels[0].bubbles] == ["A", "B"]
+    assert panels[0].bubbles[0].bubble_id == "c_pg0001_p001_b001"
+    from backend.models import BBox
+
+    assert panels[0].bubbles[0].bbox == BBox(x=20, y=10, w=80, h=40)
+    # Overhanging bubble is clipped to the panel edge
+    assert panels[1].bubbles[0].bbox == BBox(x=250, y=380, w=20, h=30)
+    assert Path(panels[1].image_path).exists()
+
+
+# ── Windowed speaker attribution tests ────────────────────────────────────────
+
+def test_page_windows_overlap():
+    """Windows cover every page and share the configured overlap."""
+    from backend.agents.character_agent import page_windows
+
+    windows = page_windows(list(range(1, 11)), size=4, overlap=1)
+    assert windows == [[1, 2, 3, 4], [4, 5, 6, 7], [7, 8, 9, 10]]
+    assert page_windows([1, 2], size=4, overlap=1) == [[1, 2]]
+
+
+def test_merge_window_attributions_is_deterministic():
+    """Overlap bubbles, profile ids, labels and narrator reconcile to global ids."""
+    from backend.agents.character_agent import WindowAttribution, merge_window_attributions
+    from backend.models import CharacterProfile
+
+    profiles = [CharacterProfile(
+        character_id="char_007", name="Captain Haddock", description="",
+        personality="", arc_summary="", voice_tone_rules="",
+    )]
+    w1 = WindowAttribution(
+        attributions={"b1": "char_1", "b2": "char_2", "b3": "narrator", "b4": "char_1"},
+        speakers=[
+            Speaker(speaker_id="char_1", inferred_label="Tintin"),
+            Speaker(speaker_id="char_2", inferred_label="captain haddock"),
+        ],
+    )
+    # Second window numbers its speakers differently; b4 is on the overlap page
+    w2 = WindowAttribution(
+        attributions={"b4": "char_9", "b5": "char_9", "b6": "char_3", "b7": "char_4"},
+        speakers=[
+            Speaker(speaker_id="char_9", inferred_label="young reporter"),
+            Speaker(speaker_id="char_3", inferred_label="The Tintin"),
+            Speaker(speaker_id="char_4", inferred_label="Snowy"),
+        ],
+    )
+
+    assignments, speakers = merge_window_attributions([w1, w2], profiles)
+
+    assert assignments == {
+        "b1": "char_0", "b2": "char_007", "b3": "narrator", "b4": "char_0",
+        "b5": "char_0", "b6": "char_0", "b7": "char_1",
+    }
+    assert [s.speaker_id for s in speakers] == ["char_0", "char_007", "narrator", "char_1"]
+    assert merge_window_attributions([w1, w2], profiles) == (assignments, speakers)
+
+
+@pytest.mark.asyncio
+async def test_attribute_speakers_windowed_sets_global_ids(monkeypatch):
+    """All windows run, and every bubble gets its merged speaker id."""
+    import backend.agents.character_agent as ca
+    from backend.agents.character_agent import WindowAttribution
+    from backend.models import BBox, Bubble, Page, Panel
+
+    monkeypatch.setattr(ca.settings, "attribution_window_pages", 2)
+    monkeypatch.setattr(ca.settings, "attribution_window_overlap", 1)
+
+    def make_page(n: int) -> Page:
+        bubble = Bubble(bubble_id=f"pg{n}_b1", order_index=1, bbox=BBox(x=0, y=0, w=1, h=1))
+        panel = Panel(panel_id=f"pg{n}_p1", order_index=1,
+                      bbox=BBox(x=0, y=0, w=10, h=10), bubbles=[bubble])
+        return Page(page_id=f"pg{n}", page_number=n, panels=[panel])
+
+    pages = [make_page(n) for n in (1, 2, 3)]
+
+    async def fake_window(window_pages, character_profiles=None):
+        ids = [p.page_number for p in window_pages]
+        return WindowAttribution(
+            attributions={f"pg{n}_b1": f"local_{ids[0]}" for n in ids},
+            speakers=[Speaker(speaker_id=f"local_{ids[0]}", inferred_label=f"who{ids[0]}")],
+        )
+
+    with patch.object(ca, "attribute_speakers_for_window", side_effect=fake_window) as call:
+        speakers = await ca.attribute_speakers_windowed(pages)
+
+    assert call.call_count == 2
+    # Window 2 overlaps page 2, so its local speaker merges into window 1's
+    assert [p.panels[0].bubbles[0].speaker_id for p in pages] == ["char_0"] * 3
+    assert [s.speaker_id for s in speakers] == ["char_0"]
+
+
+# ── Page-streaming dataflow tests ─────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_run_stages_overlaps_pages_across_stages():
+    """A later page enters stage 1 before an earlier page has left stage 2."""
+    from backend.pipeline.dataflow import Stage, run_stages
+
+    events: list[tuple[str, int]] = []
+
+    async def first(item: int) -> None:
+        events.append(("first", item))
+
+    async def second(item: int) -> None:
+        await asyncio.sleep(0.01)
+        events.append(("second", item))
+
+    result = await run_stages(
+        [1, 2, 3], [Stage("first", first), Stage("second", second)], queue_size=2
+    )
+
+    assert result == [1, 2, 3]
+    # Page 2 finished stage 1 before page 1 finished stage 2
+    assert events.index(("first", 2)) < events.index(("second", 1))
+
+
+@pytest.mark.asyncio
+async def test_run_stages_ordered_stage_sees_source_order():
+    """An ordered stage processes items in source order even if upstream finishes out of order."""
+    from backend.pipeline.dataflow import Stage, run_stages
+
+    seen: list[int] = []
+
+    async def slow_first(item: int) -> None:
+        # Earlier items take longer, so they finish last
+        await asyncio.sleep(0.005 * (5 - item))
+
+    async def record(item: int) -> None:
+        seen.append(item)
+
+    await run_stages(
+        [1, 2, 3, 4],
+        [Stage("slow", slow_first, workers=4), Stage("record", record, ordered=True)],
+    )
+
+    assert seen == [1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_run_stages_propagates_stage_error():
+    """An exception in any stage cancels the stream and propagates."""
+    from backend.pipeline.dataflow import Stage, run_stages
+
+    async def ok(item: int) -> None:
+        pass
+
+    async def boom(item: int) -> None:
+        if item == 2:
+            raise RuntimeError("stage boom")
+
+    with pytest.raises(RuntimeError, match="stage boom"):
+        await run_stages([1, 2, 3], [Stage("ok", ok), Stage("boom", boom)])
+
+
+@pytest.mark.asyncio
+async def test_run_stages_consumes_async_source_incrementally():
+    """Items from an async source enter the stages before the source is exhausted."""
+    from backend.pipeline.dataflow import Stage, run_stages
+
+    events: list[tuple[str, int]] = []
+
+    async def source():
+        for n in (1, 2, 3):
+            events.append(("produced", n))
+            yield n
+            await asyncio.sleep(0.005)
+
+    async def stage(item: int) -> None:
+        events.append(("processed", item))
+
+    result = await run_stages(source(), [Stage("stage", stage)])
+
+    assert result == [1, 2, 3]
+    assert events.index(("processed", 1)) < events.index(("produced", 3))
+
+
+# ── Bounded fan-out tests ─────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_gather_bounded_limits_in_flight_and_keeps_order():
+    """gather_bounded() never exceeds the limit and returns results in submission order."""
+    from backend.pipeline.concurrency import gather_bounded
+
+    in_flight = 0
+    peak = 0
+
+    async def work(i: int) -> int:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.001 * (10 - i))
+        in_flight -= 1
+        return i
+
+    result = await gather_bounded((work(i) for i in range(10)), 3)
+
+    assert result == list(range(10))
+    assert peak == 3
+
+
+@pytest.mark.asyncio
+async def test_gather_bounded_shares_semaphore():
+    """Two gather_bounded() calls sharing a semaphore share one limit."""
+    from backend.pipeline.concurrency import gather_bounded
+
+    semaphore = asyncio.Semaphore(2)
+    in_flight = 0
+    peak = 0
+
+    async def work(i: int) -> int:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.002)
+        in_flight -= 1
+        return i
+
+    a, b = await asyncio.gather(
+        gather_bounded((work(i) for i in range(4)), semaphore),
+        gather_bounded((work(i) for i in range(4, 8)), semaphore),
+    )
+
+    assert a == [0, 1, 2, 3]
+    assert b == [4, 5, 6, 7]
+    assert peak == 2
+
+
+# ── Job queue worker tests ────────────────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_run_job_records_outcome(tmp_storage):
+    """run_job() completes the job on success and fails it when the pipeline raises."""
+    import backend.worker as worker_mod
+    from backend.cache import jobs, store
+    from backend.models import JobStatus
+
+    record = store.create_record("hash_worker")
+    store.save_record(record)
+
+    jobs.enqueue(record.comic_id, "/tmp/ok.pdf")
+    job = jobs.claim("w1")
+    with patch.object(worker_mod, "run_pipeline", new_callable=AsyncMock):
+        await worker_mod.run_job(job, "w1")
+    assert jobs.get_job(job.job_id).status == JobStatus.done
+
+    jobs.enqueue(record.comic_id, "/tmp/bad.pdf")
+    job = jobs.claim("w1")
+    with patch.object(
+        worker_mod, "run_pipeline", new_callable=AsyncMock, side_effect=RuntimeError("boom")
+    ):
+        await worker_mod.run_job(job, "w1")
+    failed = jobs.get_job(job.job_id)
+    assert failed.status == JobStatus.failed
+    assert failed.error_message == "boom"
+
+
+# ── LLM response cache tests ──────────────────────────────────────────────────
+
+def _fake_chat_response(content: str) -> MagicMock:
+    response = MagicMock()
+    response.raise_for_status = MagicMock()
+    response.json.return_value = {"choices": [{"message": {"content": content}}]}
+    return response
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_serves_repeat_calls_from_cache(tmp_storage):
+    """An identical chat_completion() call is answered from disk without a request."""
+    import backend.pipeline.openrouter_client as oc
+
+    messages = [{"role": "user", "content": "same prompt"}]
+    with patch.object(
+        oc.openrouter_client, "post", new_callable=AsyncMock,
+        return_value=_fake_chat_response("[]"),
+    ) as mock_post:
+        first = await oc.chat_completion("fake/model", messages, temperature=0)
+        second = await oc.chat_completion("fake/model", messages, temperature=0)
+        # Different kwargs → different key → real call
+        await oc.chat_completion("fake/model", messages, temperature=1)
+
+    assert first == second
+    assert mock_post.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_does_not_cache_unparseable_responses(tmp_storage):
+    """Malformed JSON is never replayed; a bad cached entry is dropped and refetched."""
+    import backend.pipeline.openrouter_client as oc
+    from backend.cache.blobs import content_key
+
+    messages = [{"role": "user", "content": "flaky prompt"}]
+    with patch.object(
+        oc.openrouter_client, "post", new_callable=AsyncMock,
+        side_effect=[_fake_chat_response("[{oops"), _fake_chat_response("[1]"),
+                     _fake_chat_response("[2]")],
+    ) as mock_post:
+        await oc.chat_completion("fake/model", messages)
+        good = await oc.chat_completion("fake/model", messages)
+        assert await oc.chat_completion("fake/model", messages) == good
+        assert mock_post.call_count == 2
+
+        # An entry the caller's parser rejects is discarded on read
+        strict = await oc.chat_completion("fake/model", messages, validate=lambda c: 1 / 0)
+        assert mock_post.call_count == 3
+        assert strict["choices"][0]["message"]["content"] == "[2]"
+    assert oc._response_cache.get_path(content_key("fake/model", messages, {})) is None
+
+
+@pytest.mark.asyncio
+async def test_chat_completion_cache_bypass(tmp_storage):
+    """cache=False always calls the API."""
+    import backend.pipeline.openrouter_client as oc
+
+    messages = [{"role": "user", "content": "bypass prompt"}]
+    with patch.object(
+        oc.openrouter_client, "post", new_callable=AsyncMock,
+        return_value=_fake_chat_response("[]"),
+    ) as mock_post:
+        await oc.chat_completion("fake/model", messages, cache=False)
+        await oc.chat_completion("fake/model", messages, cache=False)
+
+    assert mock_post.call_count == 2
+
+
+# ── Retry policy tests ────────────────────────────────────────────────────────
+
+def _http_error(status: int, headers: dict | None = None):
+    import httpx
+
+    request = httpx.Request("POST", "https://openrouter.test/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return httpx.HTTPStatusError(f"HTTP {status}", request=request, response=response)
+
+
+@pytest.mark.asyncio
+async def test_with_retries_honours_retry_after(monkeypatch):
+    """A 429 with Retry-After is retried after exactly that delay."""
+    import backend.pipeline.retry as retry_mod
+
+    sleeps: list[float] = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr(retry_mod.asyncio, "sleep", fake_sleep)
+    call = AsyncMock(side_effect=[_http_error(429, {"Retry-After": "7"}), "ok"])
+
+    assert await retry_mod.with_retries(call, "test_op") == "ok"
+    assert sleeps == [7.0]
+    assert retry_mod.retry_stats()["retries"]["test_op/rate_limited"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_with_retries_does_not_retry_client_errors(monkeypatch):
+    """A 400 is permanent and raised on the first attempt."""
+    import httpx
+    import backend.pipeline.retry as retry_mod
+
+    monkeypatch.setattr(retry_mod.asyncio, "sleep", AsyncMock())
+    call = AsyncMock(side_effect=_http_error(400))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await retry_mod.with_retries(call, "test_op")
+    assert call.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_with_retries_gives_up_after_budget(monkeypatch):
+    """Transient errors stop being retried once the attempt budget is spent."""
+    import httpx
+    import backend.pipeline.retry as retry_mod
+
+    monkeypatch.setattr(retry_mod.asyncio, "sleep", AsyncMock())
+    monkeypatch.setattr(retry_mod.settings, "retry_max_attempts", 3)
+    call = AsyncMock(side_effect=_http_error(503))
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await retry_mod.with_retries(call, "test_giveup")
+    assert call.call_count == 3
+    assert retry_mod.retry_stats()["give_ups"]["test_giveup/server_error"] == 1
+
+
+# ── Adaptive concurrency governor tests ───────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_governor_halves_limit_on_429_and_grows_on_success(monkeypatch):
+    """AIMD: a 429 halves the limit; successes add back ~1 per window."""
+    import backend.pipeline.governor as gov
+
+    monkeypatch.setattr(gov.settings, "governor_initial_limit", 8)
+    monkeypatch.setattr(gov.settings, "governor_cooldown_sec", 0.0)
+    limiter = gov.AIMDLimiter("test/model")
+    monkeypatch.setitem(gov._limiters, "test/model", limiter)
+
+    with pytest.raises(Exception):
+        await gov.governed("test/model", AsyncMock(side_effect=_http_error(429)))
+    assert limiter.limit == 4
+
+    ok = AsyncMock(return_value="ok")
+    for _ in range(4):
+        await gov.governed("test/model", ok)
+    assert 4.9 < limiter.limit < 5.1
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_governor_caps_in_flight_calls(monkeypatch):
+    """No more than the current limit of calls run concurrently."""
+    import backend.pipeline.governor as gov
+
+    monkeypatch.setattr(gov.settings, "governor_initial_limit", 2)
+    monkeypatch.setitem(gov._limiters, "cap/model", gov.AIMDLimiter("cap/model"))
+
+    in_flight = 0
+    peak = 0
+
+    async def call():
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.002)
+        in_flight -= 1
+
+    await asyncio.gather(*(gov.governed("cap/model", call) for _ in range(6)))
+    assert peak == 2
+
+
+# ── Concurrent / streamed TTS tests ───────────────────────────────────────────
+
+@pytest.mark.asyncio
+async def test_post_to_file_streams_body_and_cleans_up_on_failure(monkeypatch, tmp_path):
+    """The body lands at dest via a .part file; a failed request leaves nothing behind."""
+    import httpx
+    import backend.pipeline.openrouter_client as oc
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if b"bad" in request.content:
+            return httpx.Response(400, json={"error": "bad input"})
+        return httpx.Response(200, content=b"ID3" + b"\x00" * 10_000)
+
+    client = httpx.AsyncClient(base_url="https://openrouter.test", transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(oc, "openrouter_client", client)
+    monkeypatch.setattr(oc.settings, "governor_enabled", False)
+
+    dest = tmp_path / "line.mp3"
+    await oc.post_to_file("/audio/speech", {"model": "m", "input": "ok"}, "tts", dest)
+    assert dest.read_bytes().startswith(b"ID3") and dest.stat().st_size == 10_003
+
+    failed = tmp_path / "bad.mp3"
+    with pytest.raises(httpx.HTTPStatusError):
+        await oc.post_to_file("/audio/speech", {"model": "m", "input": "bad"}, "tts", failed)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["line.mp3"]
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_generate_tts_for_page_runs_concurrently_and_assigns_in_order(monkeypatch):
+    """Bubbles are synthesised N-wide; each path goes to its own bubble regardless of finish order."""
+    import backend.pipeline.tts_generation as tts
+    from backend.models import BBox, Bubble, BubbleType, Page, Panel
+
+    def bubble(n: int, kind: BubbleType = BubbleType.speech) -> Bubble:
+        return Bubble(bubble_id=f"b{n}", order_index=n, bubble_type=kind,
+                      bbox=BBox(x=0, y=0, w=1, h=1), text=f"line {n}")
+
+    page = Page(page_id="pg1", page_number=1, panels=[
+        Panel(panel_id="p1", order_index=1, bbox=BBox(x=0, y=0, w=1, h=1),
+              bubbles=[bubble(1), bubble(2), bubble(3, BubbleType.sfx)]),
+        Panel(panel_id="p2", order_index=2, bbox=BBox(x=0, y=0, w=1, h=1),
+              bubbles=[bubble(4), bubble(5)]),
+    ])
+
+    in_flight = 0
+    peak = 0
+
+    async def fake_tts(b, voice_id, comic_id):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        # Earlier bubbles finish last
+        await asyncio.sleep(0.002 * (6 - int(b.bubble_id[1:])))
+        in_flight -= 1
+        return f"{b.bubble_id}.mp3"
+
+    with patch.object(tts, "generate_tts_for_bubble", side_effect=fake_tts):
+        await tts.generate_tts_for_page(page, [], "c", limit=2)
+
+    paths = [b.tts_audio_path for p in page.panels for b in p.bubbles]
+    assert paths == ["b1.mp3", "b2.mp3", None, "b4.mp3", "b5.mp3"]
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_tts_cache_synthesises_each_utterance_once(tmp_storage, monkeypatch):
+    """Repeated lines — concurrent, and across comics — share one synthesis via hardlinks."""
+    import backend.pipeline.tts_generation as tts
+    from backend.models import BBox, Bubble, BubbleType
+
+    monkeypatch.setattr(tts.settings, "storage_root", str(tmp_storage))
+    monkeypatch.setattr(tts.settings, "tts_cache_enabled", True)
+
+    def bubble(bubble_id: str, text: str) -> Bubble:
+        return Bubble(bubble_id=bubble_id, order_index=1, bubble_type=BubbleType.speech,
+                      bbox=BBox(x=0, y=0, w=1, h=1), text=text, emotion_tag="angry")
+
+    calls = []
+
+    async def fake_post_to_file(path, payload, operation, dest):
+        calls.append(payload["input"])
+        await asyncio.sleep(0.01)
+        dest.write_bytes(b"ID3" + payload["input"].encode())
+        return dest
+
+    with patch.object(tts, "post_to_file", side_effect=fake_post_to_file):
+        a, b = await asyncio.gather(
+            tts.generate_tts_for_bubble(bubble("b1", "No way!"), "alloy", "comic-a"),
+            tts.generate_tts_for_bubble(bubble("b2", "No  way! "), "alloy", "comic-a"),
+        )
+        c = await tts.generate_tts_for_bubble(bubble("b9", "No way!"), "alloy", "comic-b")
+        # Punctuation and voice are part of the key
+        await tts.generate_tts_for_bubble(bubble("b3", "No way."), "alloy", "comic-a")
+        await tts.generate_tts_for_bubble(bubble("b4", "No way!"), "echo", "comic-a")
+
+    # One call for the shared line, one each for the different punctuation and voice
+    assert len(calls) == 3 and calls[1:] == ["No way.", "No way!"]
+    inodes = {Path(p).stat().st_ino for p in (a, b, c)}
+    assert len(inodes) == 1
+    assert "comic-b" in c
+
+
+def test_blob_cache_link_to_survives_eviction(tmp_storage):
+    """A linked copy stays valid after its cache entry is evicted."""
+    from backend.cache.blobs import BlobCache
+
+    cache = BlobCache("linktest", max_bytes=lambda: 10, suffix=".bin")
+    src = tmp_storage / "src.bin"
+    src.parent.mkdir(parents=True, exist_ok=True)
+    src.write_bytes(b"12345678")
+    cache.link_from("k1", src)
+    assert src.exists()
+
+    dest = cache.link_to("k1", tmp_storage / "out" / "a.bin")
+    assert dest is not None and dest.read_bytes() == b"12345678"
+
+    other = tmp_storage / "other.bin"
+    other.write_bytes(b"abcdefgh")
+    cache.link_from("k2", other)  # over budget → k1 evicted
+    assert cache.link_to("k1", tmp_storage / "out" / "b.bin") is None
+    assert dest.read_bytes() == b"12345678"
+
+
+@pytest.mark.asyncio
+async def test_generate_sfx_for_comic_batches_prompts(tmp_storage, monkeypatch):
+    """Local AudioGen runs once per batch of prompts, and each panel gets its own clip."""
+    import backend.pipeline.sfx_generation as sfx
+    from backend.models import BBox, Comic, Page, Panel
+
+    monkeypatch.setattr(sfx.settings, "storage_root", str(tmp_storage))
+    monkeypatch.setattr(sfx.settings, "sfx_api_url", "")
+    monkeypatch.setattr(sfx.settings, "sfx_batch_size", 2)
+    monkeypatch.setattr(sfx.settings, "sfx_cache_enabled", False)
+
+    panels = [
+        Panel(panel_id=f"p{n}", order_index=n, bbox=BBox(x=0, y=0, w=1, h=1))
+        for n in range(1, 6)
+    ]
+    comic = Comic(comic_id="c1", pdf_hash="h", pages=[
+        Page(page_id="pg1", page_number=1, panels=panels[:3]),
+        Page(page_id="pg2", page_number=2, panels=panels[3:]),
+    ])
+
+    batches = []
+
+    def fake_infer(model, prompts, out_paths):
+        batches.append(list(prompts))
+        return [p.with_suffix(".mp3") for p in out_paths]
+
+    with patch.object(sfx, "_load_model", return_value=object()), \
+         patch.object(sfx, "_infer_batch", side_effect=fake_infer):
+        await sfx.generate_sfx_for_comic(comic, {"p1": "rain", "p4": "thunder"})
+
+    assert [len(b) for b in batches] == [2, 2, 1]
+    assert batches[0][0] == "rain" and batches[1][1] == "thunder"
+    assert [Path(p.sfx_audio_path).name for p in panels] == [
+        "p1.mp3", "p2.mp3", "p3.mp3", "p4.mp3", "p5.mp3",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_sfx_prompt_cache_generates_each_prompt_once(tmp_storage, monkeypatch):
+    """Panels with matching normalised prompts share one clip, within and across comics."""
+    import backend.pipeline.sfx_generation as sfx
+    from backend.models import BBox, Comic, Page, Panel
+
+    monkeypatch.setattr(sfx.settings, "storage_root", str(tmp_storage))
+    monkeypatch.setattr(sfx.settings, "sfx_api_url", "")
+    monkeypatch.setattr(sfx.settings, "sfx_cache_enabled", True)
+
+    def comic(comic_id: str, n: int) -> Comic:
+        panels = [
+            Panel(panel_id=f"{comic_id}-p{i}", order_index=i, bbox=BBox(x=0, y=0, w=1, h=1))
+            for i in range(n)
+        ]
+        return Comic(comic_id=comic_id, pdf_hash=comic_id,
+                     pages=[Page(page_id=f"{comic_id}-pg", page_number=1, panels=panels)])
+
+    generated = []
+
+    def fake_infer(model, prompts, out_paths):
+        generated.extend(prompts)
+        for path in out_paths:
+            path.write_bytes(b"RIFF")
+        return list(out_paths)
+
+    first, second = comic("c1", 3), comic("c2", 2)
+    with patch.object(sfx, "_load_model", return_value=object()), \
+         patch.object(sfx, "_infer_batch", side_effect=fake_infer):
+        await sfx.generate_sfx_for_comic(first, {"c1-p0": "Rain on a roof.", "c1-p1": "rain on  a roof"})
+        await sfx.generate_sfx_for_comic(second, {"c2-p0": "RAIN ON A ROOF"})
+
+    # c1-p2 and c2-p1 use the default ambient prompt
+    assert generated == ["Rain on a roof.", sfx._DEFAULT_PROMPT]
+    rain = {Path(p.sfx_audio_path).stat().st_ino
+            for p in first.pages[0].panels[:2] + second.pages[0].panels[:1]}
+    assert len(rain) == 1
+
+    stats = sfx.sfx_cache_stats()["per_comic"]
+    assert stats["c1"] == {"hits": 1, "misses": 2, "hit_rate": 0.3333}
+    assert stats["c2"] == {"hits": 2, "misses": 0, "hit_rate": 1.0}
+
+
+@pytest.mark.asyncio
+async def test_sfx_cache_skips_stub_clips_and_reuses_remote_format(tmp_storage, monkeypatch):
+    """Stub placeholders are not cached; a remote MP3 clip is a hit for any later comic."""
+    import backend.pipeline.sfx_generation as sfx
+    from backend.models import BBox, Comic, Page, Panel
+
+    monkeypatch.setattr(sfx.settings, "storage_root", str(tmp_storage))
+    monkeypatch.setattr(sfx.settings, "sfx_cache_enabled", True)
+
+    def comic(comic_id: str) -> Comic:
+        panels = [
+            Panel(panel_id=f"{comic_id}-p{i}", order_index=i, bbox=BBox(x=0, y=0, w=1, h=1))
+            for i in range(2)
+        ]
+        return Comic(comic_id=comic_id, pdf_hash=comic_id,
+                     pages=[Page(page_id=f"{comic_id}-pg", page_number=1, panels=panels)])
+
+    # Stub mode: both panels get a placeholder, nothing reaches the cache
+    stub = comic("c1")
+    with patch.object(sfx.sfx_client, "available", AsyncMock(return_value=False)), \
+         patch.object(sfx, "_load_model", return_value=None):
+        await sfx.generate_sfx_for_comic(stub, {})
+    assert all(Path(p.sfx_audio_path).read_bytes() == b"\x00" for p in stub.pages[0].panels)
+    assert sfx._sfx_cache.stats()["entries"] == 0
+
+    # The daemon's stub clips are not cached either; its MP3 clips are
+    remote = AsyncMock(side_effect=[[b"\x00"], [b"ID3 rain"]])
+    with patch.object(sfx.sfx_client, "available", AsyncMock(return_value=True)), \
+         patch.object(sfx.sfx_client, "generate_many", remote):
+        await sfx.generate_sfx_for_comic(comic("c2"), {})
+        await sfx.generate_sfx_for_comic(comic("c3"), {})
+    assert remote.await_count == 2
+
+    # Local generation now writes WAV, but the cached MP3 is still a hit
+    cached = comic("c4")
+    with patch.object(sfx.sfx_client, "available", AsyncMock(return_value=False)), \
+         patch.object(sfx, "_generate_sfx_batch", AsyncMock(side_effect=AssertionError)):
+        await sfx.generate_sfx_for_comic(cached, {})
+    assert [Path(p.sfx_audio_path).name for p in cached.pages[0].panels] == ["c4-p0.mp3", "c4-p1.mp3"]
+    assert Path(cached.pages[0].panels[0].sfx_audio_path).read_bytes() == b"ID3 rain"
+    assert not list(Path(cached.pages[0].panels[0].sfx_audio_path).parent.glob(".*"))
+
+
+@pytest.mark.asyncio
+async def test_sfx_daemon_batches_across_callers_and_rejects_when_full(monkeypatch):
+    """Concurrent requests share AudioGen batches; a full queue raises QueueFull."""
+    import backend.sfx_daemon as daemon
+
+    monkeypatch.setattr(daemon.settings, "sfx_batch_size", 3)
+    monkeypatch.setattr(daemon.settings, "sfx_daemon_max_wait_ms", 50)
+    monkeypatch.setattr(daemon.settings, "sfx_daemon_queue_size", 8)
+
+    batches = []
+
+    def fake_infer(prompts, duration):
+        batches.append((list(prompts), duration))
+        return [p.encode() for p in prompts]
+
+    batcher = daemon.SFXBatcher(infer=fake_infer)
+    batcher.start()
+    try:
+        clips = await asyncio.gather(
+            batcher.generate("rain", 4),
+            batcher.generate("wind", 4),
+            batcher.generate("rain", 4),
+            batcher.generate("door", 4),
+            batcher.generate("boom", 2),
+        )
+    finally:
+        await batcher.stop()
+
+    assert clips == [b"rain", b"wind", b"rain", b"door", b"boom"]
+    # First batch: three requests, two distinct prompts; durations never mix
+    assert batches[0] == (["rain", "wind"], 4)
+    assert sorted(batches[1:]) == [(["boom"], 2), (["door"], 4)]
+    assert batcher.stats()["avg_batch"] == pytest.approx(4 / 3, abs=0.01)
+
+    monkeypatch.setattr(daemon.settings, "sfx_daemon_queue_size", 1)
+    full = daemon.SFXBatcher(infer=fake_infer)
+    full._queue = asyncio.Queue(maxsize=1)   # not started: nothing drains it
+    pending = asyncio.ensure_future(full.generate("a", 4))
+    await asyncio.sleep(0)
+    with pytest.raises(asyncio.QueueFull):
+        await full.generate("b", 4)
+    pending.cancel()
+    assert full.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_sfx_daemon_health_is_503_until_model_loads(monkeypatch):
+    """Supervisors (start.sh) can wait for /health before starting the backend."""
+    import httpx
+    import backend.sfx_daemon as daemon
+
+    monkeypatch.setattr(daemon.batcher, "ready", False)
+    transport = httpx.ASGITransport(app=daemon.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://daemon") as client:
+        loading = await client.get("/health")
+        monkeypatch.setattr(daemon.batcher, "ready", True)
+        ready = await client.get("/health")
+
+    assert loading.status_code == 503 and loading.headers["Retry-After"] == "1"
+    assert ready.status_code == 200 and ready.json() == {"ok": True}
+
+
+@pytest.mark.asyncio
+async def test_sfx_daemon_counts_held_requests_and_clamps_duration(monkeypatch):
+    """Requests held for a later batch use queue capacity; long durations are capped."""
+    import backend.sfx_daemon as daemon
+
+    monkeypatch.setattr(daemon.settings, "sfx_daemon_queue_size", 2)
+    monkeypatch.setattr(daemon.settings, "sfx_daemon_max_duration_sec", 10)
+    batcher = daemon.SFXBatcher(infer=lambda prompts, duration: [])
+    batcher._queue = asyncio.Queue(maxsize=2)   # not started: nothing drains it
+    loop = asyncio.get_running_loop()
+    batcher._held.append(daemon._Request("held", 2, loop.create_future()))
+
+    pending = asyncio.ensure_future(batcher.generate("long", 600))
+    await asyncio.sleep(0)
+    assert batcher._queue.get_nowait().duration == 10
+    with pytest.raises(asyncio.QueueFull):
+        await batcher.generate_many(["a", "b"], 4)
+    pending.cancel()
+    assert batcher.stats()["rejected"] == 1
+
+
+def _sfx_client_with(monkeypatch, handler):
+    """A fresh SFXClient whose pooled httpx client uses *handler* as transport."""
+    import httpx
+    import backend.pipeline.sfx_client as sc
+
+    monkeypatch.setattr(sc.settings, "sfx_api_url", "http://sfx.local")
+    monkeypatch.setattr(sc.settings, "retry_max_attempts", 3)
+    monkeypatch.setattr(sc.settings, "retry_base_delay", 0.0)
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        sc.httpx, "AsyncClient",
+        lambda **kw: real_client(transport=httpx.MockTransport(handler), **kw),
+    )
+    return sc.SFXClient()
+
+
+@pytest.mark.asyncio
+async def test_sfx_client_waits_out_backpressure_and_falls_back_from_batch(monkeypatch):
+    """503 + Retry-After is retried; a server without the batch endpoint gets single requests."""
+    import httpx
+
+    seen = []
+    busy = iter([True, False, False])
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.url.path)
+        if request.url.path == "/health":
+            return httpx.Response(404)   # reachable is enough
+        if request.url.path == "/generate-sfx-batch":
+            return httpx.Response(404)
+        if next(busy, False):
+            return httpx.Response(503, headers={"Retry-After": "0"})
+        prompt = json.loads(request.content)["prompt"]
+        return httpx.Response(200, content=b"ID3" + prompt.encode())
+
+    client = _sfx_client_with(monkeypatch, handler)
+    assert await client.available()
+    clips = await client.generate_many(["rain", "wind"], 4)
+    await client.generate_many(["door"], 4)
+    await client.aclose()
+
+    assert clips == [b"ID3rain", b"ID3wind"]
+    assert seen.count("/generate-sfx-batch") == 1   # not retried once unsupported
+    assert seen.count("/generate-sfx") == 4          # 3 prompts + 1 retry after 503
+    assert client.stats()["breaker"] == "closed"
+
+
+@pytest.mark.asyncio
+async def test_sfx_client_breaker_routes_comic_to_local(tmp_storage, monkeypatch):
+    """When the SFX API is down, the whole comic goes to local AudioGen after one probe."""
+    import httpx
+    import backend.pipeline.sfx_generation as sfx
+    from backend.models import BBox, Comic, Page, Panel
+
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        raise httpx.ConnectError("tunnel closed")
+
+    client = _sfx_client_with(monkeypatch, handler)
+    monkeypatch.setattr(sfx, "sfx_client", client)
+    monkeypatch.setattr(sfx.settings, "storage_root", str(tmp_storage))
+    monkeypatch.setattr(sfx.settings, "sfx_cache_enabled", False)
+
+    panels = [Panel(panel_id=f"p{n}", order_index=n, bbox=BBox(x=0, y=0, w=1, h=1))
+              for n in range(3)]
+    comic = Comic(comic_id="c1", pdf_hash="h",
+                  pages=[Page(page_id="pg", page_number=1, panels=panels)])
+
+    def fake_infer(model, prompts, out_paths):
+        return list(out_paths)
+
+    with patch.object(sfx, "_load_model", return_value=object()), \
+         patch.object(sfx, "_infer_batch", side_effect=fake_infer):
+        await sfx.generate_sfx_for_comic(comic, {})
+
+    assert calls == ["/health"]
+    assert client.stats()["breaker"] == "open"
+    assert all(p.sfx_audio_path.endswith(".wav") for p in panels)
+
+
+def test_encode_clips_without_mp3_encoder_writes_wav(tmp_path, monkeypatch):
+    """Waveforms are encoded from memory; with no MP3 encoder they become 16-bit WAVs."""
+    import wave
+    import numpy as np
+    import backend.pipeline.transcode as tc
+
+    monkeypatch.setattr(tc, "_encoder", lambda: "wav")
+    tone = np.sin(np.linspace(0, 200 * np.pi, 16000, dtype=np.float32))[None, :] * 2
+    paths = tc.encode_clips([tone, tone[:, :8000]], 16000,
+                            [tmp_path / "a.wav", tmp_path / "b.wav"])
+
+    assert [p.name for p in paths] == ["a.wav", "b.wav"]
+    with wave.open(str(paths[1])) as clip:
+        assert (clip.getnchannels(), clip.getsampwidth(), clip.getframerate()) == (1, 2, 16000)
+        frames = np.frombuffer(clip.readframes(clip.getnframes()), dtype="<i2")
+    assert frames.size == 8000 and frames.max() == 32767   # clipped, not wrapped
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.wav", "b.wav"]
+
+
+def test_encode_clip_uses_lameenc_in_process(tmp_path, monkeypatch):
+    """With lameenc available, clips become MP3s without a subprocess."""
+    import sys
+    import types
+    import numpy as np
+    import backend.pipeline.transcode as tc
+
+    class FakeEncoder:
+        def set_bit_rate(self, kbps): self.kbps = kbps
+        def set_in_sample_rate(self, rate): self.rate = rate
+        def set_channels(self, n): self.channels = n
+        def set_quality(self, q): pass
+        def encode(self, pcm): return bytearray(b"ID3" + len(pcm).to_bytes(4, "big"))
+        def flush(self): return bytearray(b"!")
+
+    monkeypatch.setitem(sys.modules, "lameenc", types.SimpleNamespace(Encoder=FakeEncoder))
+    monkeypatch.setattr(tc, "_encoder", lambda: "lameenc")
+    monkeypatch.setattr(tc.subprocess, "run", MagicMock(side_effect=AssertionError("forked")))
+
+    path = tc.encode_clip(np.zeros((1, 100), dtype=np.float32), 16000, tmp_path / "x.wav")
+    assert path.name == "x.mp3"
+    assert path.read_bytes() == b"ID3" + (200).to_bytes(4, "big") + b"!"
+
+
+def test_encode_clip_falls_back_to_wav_when_encoder_fails(tmp_path, monkeypatch):
+    """An ffmpeg or lameenc error leaves a WAV clip instead of failing the batch."""
+    import subprocess
+    import numpy as np
+    import backend.pipeline.transcode as tc
+
+    monkeypatch.setattr(tc, "_encoder", lambda: "ffmpeg")
+    failure = subprocess.CalledProcessError(1, ["ffmpeg"], stderr=b"Unknown encoder 'libmp3lame'")
+    monkeypatch.setattr(tc.subprocess, "run", MagicMock(side_effect=failure))
+    path = tc.encode_clip(np.zeros((1, 100), dtype=np.float32), 16000, tmp_path / "x.mp3")
+    assert path.name == "x.wav" and path.read_bytes()[:4] == b"RIFF"
+
+    monkeypatch.setattr(tc, "_encoder", lambda: "lameenc")
+    monkeypatch.setattr(tc, "_encode_lameenc", MagicMock(side_effect=RuntimeError("lame")))
+    path = tc.encode_clip(np.zeros((1, 100), dtype=np.float32), 16000, tmp_path / "y.mp3")
+    assert path.name == "y.wav"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["x.wav", "y.wav"]
+
+
+@pytest.mark.asyncio
+async def test_normalise_comic_panels_fills_small_margins_locally(tmp_storage, monkeypatch):
+    """Near-target panels are filled locally; only wide letterboxes reach the image model."""
+    from PIL import Image
+    import backend.pipeline.normalizer as norm
+    from backend.models import BBox, Comic, Page, Panel
+
+    monkeypatch.setattr(norm.settings, "storage_root", str(tmp_storage))
+    monkeypatch.setattr(norm.settings, "panel_target_width", 320)
+    monkeypatch.setattr(norm.settings, "panel_target_height", 180)
+    monkeypatch.setattr(norm.settings, "normalization_local_fill_max_margin", 0.15)
+    monkeypatch.setattr(norm.settings, "normalization_concurrency", 2)
+
+    # thin: 2 px strips (edge extension); mirror: 20 px strips; tall: 44 % margin
+    sizes = {"exact": (640, 360), "thin": (320, 176), "mirror": (280, 180), "tall": (180, 180)}
+    panels = []
+    for name, size in sizes.items():
+        path = tmp_storage / f"{name}.png"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        Image.new("RGB", size, (200, 30, 30)).save(path)
+        panels.append(Panel(panel_id=name, order_index=len(panels), image_path=str(path),
+                            bbox=BBox(x=0, y=0, w=1, h=1)))
+    comic = Comic(comic_id="c1", pdf_hash="h", normalization_enabled=True,
+                  pages=[Page(page_id="pg", page_number=1, panels=panels)])
+
+    async def fake_ai_fill(src, canvas, prompt, *cache_args):
+        return canvas, "fake/image-model"
+
+    with patch.object(norm, "_ai_fill", side_effect=fake_ai_fill) as ai_fill:
+        await norm.normalise_comic_panels(comic)
+
+    assert ai_fill.call_count == 1
+    assert [p.normalization_fill_model for p in panels] == [
+        None, norm.LOCAL_FILL, norm.LOCAL_FILL, "fake/image-model",
+    ]
+    for panel in panels[:3]:
+        with Image.open(panel.normalized_image_path) as out:
+            assert out.size == (320, 180)
+            # Margins were filled from the panel, not left black
+            assert out.getpixel((0, 0)) == (200, 30, 30)
+
+
+@pytest.mark.asyncio
+async def test_ai_fill_streams_url_results_into_fill_cache(tmp_storage, monkeypatch):
+    """URL fills are downloaded asynchronously once; re-normalising reuses the cached fill."""
+    import httpx
+    from PIL import Image
+    import backend.pipeline.normalizer as norm
+    import backend.pipeline.openrouter_client as oc
+    from backend.models import BBox, Panel
+
+    monkeypatch.setattr(norm.settings, "storage_root", str(tmp_storage))
+    monkeypatch.setattr(norm.settings, "panel_target_width", 64)
+    monkeypatch.setattr(norm.settings, "panel_target_height", 36)
+    monkeypatch.setattr(norm.settings, "fill_cache_enabled", True)
+
+    fill = io.BytesIO()
+    Image.new("RGB", (64, 36), (0, 90, 200)).save(fill, format="PNG")
+    downloads = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        downloads.append(str(request.url))
+        return httpx.Response(200, content=fill.getvalue())
+
+    monkeypatch.setattr(oc, "download_client", httpx.AsyncClient(transport=httpx.MockTransport(handler)))
+
+    src = tmp_storage / "square.png"
+    src.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", (36, 36), (250, 250, 250)).save(src)
+    panel = Panel(panel_id="p1", order_index=1, image_path=str(src), bbox=BBox(x=0, y=0, w=1, h=1))
+
+    generate = AsyncMock(return_value={"data": [{"url": "https://cdn.example/fill.png"}]})
+    with patch.object(norm, "image_generation", generate):
+        first, model = await norm._normalise(panel, "c1")
+        second, _ = await norm._normalise(panel, "c2")
+
+    assert generate.await_count == 1 and downloads == ["https://cdn.example/fill.png"]
+    assert model == norm.settings.image_gen_model_primary
+    for path in (first, second):
+        with Image.open(path) as out:
+            assert out.getpixel((0, 0)) == (0, 90, 200)
+    assert not list((tmp_storage / "c1" / "panels" / "normalised").glob("*.fill*"))
+
+
+@pytest.mark.asyncio
+async def test_ai_fill_streams_uncached_fills_and_survives_cache_errors(tmp_storage, monkeypatch):
+    """Uncached URL fills are streamed; a failed cache write does not re-generate."""
+    from PIL import Image
+    import backend.pipeline.normalizer as norm
+
+    monkeypatch.setattr(norm.settings, "storage_root", str(tmp_storage))
+    monkeypatch.setattr(norm.settings, "panel_target_width", 64)
+    monkeypatch.setattr(norm.settings, "panel_target_height", 36)
+    canvas = Image.new("RGBA", (64, 36), (0, 0, 0, 255))
+
+    async def fake_download(url, dest, operation):
+        Image.new("RGB", (64, 36), (0, 90, 200)).save(dest, format="PNG")
+
+    generate = AsyncMock(return_value={"data": [{"url": "https://cdn.example/fill.png"}]})
+    download = AsyncMock(side_effect=fake_download)
+    monkeypatch.setattr(norm.settings, "fill_cache_enabled", False)
+    with patch.object(norm, "image_generation", generate), patch.object(norm, "download_to_file", download):
+        image, model = await norm._ai_fill(canvas, canvas, "prompt", "a" * 64)
+    assert download.await_count == 1 and model == norm.settings.image_gen_model_primary
+    assert image.getpixel((0, 0))[:3] == (0, 90, 200)
+    assert not list((tmp_storage / "tmp").glob("*.fill"))
+
+    monkeypatch.setattr(norm.settings, "fill_cache_enabled", True)
+    broken = patch.object(norm._fill_cache, "put_file", side_effect=OSError("disk full"))
+    with patch.object(norm, "image_generation", generate), patch.object(norm, "download_to_file", download), broken:
+        image, model = await norm._ai_fill(canvas, canvas, "prompt", "b" * 64)
+    assert generate.await_count == 2  # one per call, no fallback generation
+    assert model == norm.settings.image_gen_model_primary
+    assert image.getpixel((0, 0))[:3] == (0, 90, 200)